@@ -1,6 +1,11 @@
-from rets.client import RetsClient
-from rets.http.client import RetsHttpClient
-from rets.http.data import Metadata, Object, SearchResult, SystemMetadata
+from typing import TYPE_CHECKING
+
+from rets.lazy import lazy_import
+
+if TYPE_CHECKING:
+    from rets.client import RetsClient
+    from rets.http.client import RetsHttpClient
+    from rets.http.data import Metadata, Object, SearchResult, SystemMetadata
 
 __title__ = 'rets'
 __version__ = '0.4.12'
@@ -15,3 +20,12 @@ __all__ = [
     'SearchResult',
     'SystemMetadata',
 ]
+
+__getattr__, __dir__ = lazy_import(globals(), {
+    'RetsClient': 'rets.client',
+    'RetsHttpClient': 'rets.http.client',
+    'Metadata': 'rets.http.data',
+    'Object': 'rets.http.data',
+    'SearchResult': 'rets.http.data',
+    'SystemMetadata': 'rets.http.data',
+})
@@ -1,5 +1,67 @@
-from rets.client.client import RetsClient
+from typing import TYPE_CHECKING
+
+from rets.lazy import lazy_import
+
+if TYPE_CHECKING:
+    from rets.client.client import RetsClient
+    from rets.client.hash_store import DbmHashStore, HashStore, MemoryHashStore
+    from rets.client.local_index import LocalIndex
+    from rets.client.metadata import MetadataDiff
+    from rets.client.object_type import ObjectBatch
+    from rets.client.projection import AdaptiveProjection, JsonProjectionStore, MemoryProjectionStore, ProjectionStore
+    from rets.client.query import QueryBuilder, Range
+    from rets.client.session import SessionBroker
+    from rets.client.sync import ObjectPage, PhotoManifest, PhotoSync, search_with_objects
+    from rets.client.tuning import BatchSizer, JsonTuningStore, MemoryTuningStore, PageSizer, TuningStore
 
 __all__ = [
+    'AdaptiveProjection',
+    'BatchSizer',
+    'DbmHashStore',
+    'HashStore',
+    'JsonProjectionStore',
+    'JsonTuningStore',
+    'LocalIndex',
+    'MemoryHashStore',
+    'MemoryProjectionStore',
+    'MemoryTuningStore',
+    'MetadataDiff',
+    'ObjectBatch',
+    'ObjectPage',
+    'PageSizer',
+    'PhotoManifest',
+    'PhotoSync',
+    'ProjectionStore',
+    'QueryBuilder',
+    'Range',
     'RetsClient',
+    'SessionBroker',
+    'TuningStore',
+    'search_with_objects',
 ]
+
+__getattr__, __dir__ = lazy_import(globals(), {
+    'AdaptiveProjection': 'rets.client.projection',
+    'BatchSizer': 'rets.client.tuning',
+    'DbmHashStore': 'rets.client.hash_store',
+    'HashStore': 'rets.client.hash_store',
+    'JsonProjectionStore': 'rets.client.projection',
+    'JsonTuningStore': 'rets.client.tuning',
+    'LocalIndex': 'rets.client.local_index',
+    'MemoryHashStore': 'rets.client.hash_store',
+    'MemoryProjectionStore': 'rets.client.projection',
+    'MemoryTuningStore': 'rets.client.tuning',
+    'MetadataDiff': 'rets.client.metadata',
+    'ObjectBatch': 'rets.client.object_type',
+    'ObjectPage': 'rets.client.sync',
+    'PageSizer': 'rets.client.tuning',
+    'PhotoManifest': 'rets.client.sync',
+    'PhotoSync': 'rets.client.sync',
+    'ProjectionStore': 'rets.client.projection',
+    'QueryBuilder': 'rets.client.query',
+    'Range': 'rets.client.query',
+    'RetsClient': 'rets.client.client',
+    'SessionBroker': 'rets.client.session',
+    'TuningStore': 'rets.client.tuning',
+    'search_with_objects': 'rets.client.sync',
+})
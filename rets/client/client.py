@@ -1,8 +1,11 @@
-from typing import Optional, Sequence
+from typing import TYPE_CHECKING, Mapping, Optional, Sequence
 
+from rets.client.metadata import MetadataDiff
 from rets.client.resource import Resource
 from rets.client.utils import get_metadata_data
-from rets.http import RetsHttpClient
+
+if TYPE_CHECKING:
+    from rets.http.client import RetsHttpClient
 
 """
 Example of metadata dict:
@@ -40,15 +43,19 @@ class RetsClient:
 
     def __init__(self,
                  *args,
-                 http_client: RetsHttpClient = None,
+                 http_client: 'RetsHttpClient' = None,
                  metadata: Sequence[dict] = (),
                  capability_urls: dict = None,
                  cookie_dict: dict = None,
                  **kwargs):
-        self.http = http_client or RetsHttpClient(*args,
-                                                  capability_urls=capability_urls, cookie_dict=cookie_dict,
-                                                  **kwargs)
-        if not (capability_urls and cookie_dict):
+        if http_client is None:
+            # requests is only loaded once a client needs to send transactions
+            from rets.http.client import RetsHttpClient
+            http_client = RetsHttpClient(*args, capability_urls=capability_urls, cookie_dict=cookie_dict, **kwargs)
+        self.http = http_client
+        # An empty cookie_dict with the capability urls resumes a session that has no cookies,
+        # e.g. one shared by a SessionBroker
+        if not capability_urls or cookie_dict is None:
             self.http.login()
         self._resources = self._resources_from_metadata(metadata)
 
@@ -70,6 +77,19 @@ class RetsClient:
                 return resource
         raise KeyError('unknown resource %s' % name)
 
+    def refresh_metadata(self) -> Mapping[str, MetadataDiff]:
+        """
+        Refreshes the classes of every resource whose classes are loaded, e.g. after the
+        MetadataVersion of the server changed, and returns the differences by resource name.
+        Only the tables of classes that were added or changed are fetched again, see
+        Resource.refresh_classes.
+        """
+        return {
+            resource.name: resource.refresh_classes()
+            for resource in self._resources
+            if resource._classes
+        }
+
     def _fetch_resources(self) -> Sequence[Resource]:
         metadata = get_metadata_data(self.http, 'resource')
         return self._resources_from_metadata(metadata)
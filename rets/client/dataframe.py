@@ -0,0 +1,130 @@
+"""
+Builds pandas DataFrames straight from the DATA lines of search responses. This module requires
+the optional pandas dependency, version 2.0 or later, which is installed with
+`pip install rets-python[pandas]`.
+
+The lines are split into columns of raw strings, which are converted by pandas according to the
+METADATA-TABLE types of the fields, without building a Record or dict per row:
+
+    ==================  ==============================
+    Lookup              category
+    LookupMulti         object, lists of values
+    Tiny .. Number      Int64
+    Decimal             float64
+    Boolean             boolean
+    DateTime, Date      datetime64, UTC
+    Time                object, datetime.time
+    Character           object, str
+    ==================  ==============================
+
+Empty values are missing values in every column.
+"""
+from typing import Any, Mapping, Sequence, Union
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from rets.client.decoder import LOOKUP_MULTI_TYPES, LOOKUP_TYPE, decode_time, lookup_multi_decoder
+from rets.http.data import SearchBatch
+from rets.http.parsers.parse import split_data_line
+
+_INTEGER_TYPES = frozenset(('Tiny', 'Small', 'Int', 'Long', 'Number'))
+
+
+def search_dataframe(resource_class,
+                     query: Union[str, Mapping[str, Any]],
+                     fields: Sequence[str] = None,
+                     include_tz: bool = False,
+                     expand_lookups: bool = False,
+                     batch_size: int = 100000,
+                     **kwargs) -> pd.DataFrame:
+    """
+    Streams the response of a single Search transaction and converts it into a DataFrame with
+    one column per returned field. The DATA lines are split in batches of batch_size, which
+    bounds the memory held by raw strings while the response is being read.
+
+    If include_tz is set, date and time columns are timezone-aware UTC, otherwise naive UTC
+    like the values of RecordDecoder. If expand_lookups is set, Lookup values are expanded to
+    their LongValue.
+    """
+    lookups = resource_class.resource.lookups if expand_lookups else None
+    batches = resource_class.search_raw_batches(query, fields, batch_size, **kwargs)
+    frames = [batch_dataframe(batch, resource_class.table, include_tz, lookups) for batch in batches]
+    if not frames:
+        columns = fields or tuple(field['SystemName'] for field in resource_class.table)
+        return to_dataframe({field: () for field in columns}, resource_class.table, include_tz, lookups)
+    if len(frames) == 1:
+        return frames[0]
+    # Categories of the same column differ between batches, union them to keep the category dtype
+    frame = pd.concat(frames, ignore_index=True)
+    for field, column in frames[0].items():
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            frame[field] = pd.Series(union_categoricals([f[field] for f in frames]))
+    return frame
+
+
+def batch_dataframe(batch: SearchBatch,
+                    table: Sequence[dict],
+                    include_tz: bool = False,
+                    lookups: Mapping[str, Mapping[str, str]] = None) -> pd.DataFrame:
+    """ Splits the DATA lines of a batch into columns and converts them into a DataFrame. """
+    rows = [split_data_line(line, batch.delimiter) for line in batch.lines]
+    values = zip(*rows) if rows else ((),) * len(batch.columns)
+    return to_dataframe(dict(zip(batch.columns, values)), table, include_tz, lookups)
+
+
+def to_dataframe(columns: Mapping[str, Sequence[str]],
+                 table: Sequence[dict],
+                 include_tz: bool = False,
+                 lookups: Mapping[str, Mapping[str, str]] = None) -> pd.DataFrame:
+    """
+    Converts a mapping of field to its raw string values, e.g. the rows of search_raw_pages
+    split into columns, into a DataFrame typed by the METADATA-TABLE of the fields.
+    """
+    metadata_map = {field['SystemName']: field for field in table}
+    lookups = lookups or {}
+    return pd.DataFrame({
+        field: _to_series(values, metadata_map.get(field, {'DataType': 'Character'}), include_tz, lookups)
+        for field, values in columns.items()
+    })
+
+
+def _to_series(values: Sequence[str],
+               field_metadata: dict,
+               include_tz: bool,
+               lookups: Mapping[str, Mapping[str, str]]) -> pd.Series:
+    strings = pd.Series(values, dtype='string').replace('', pd.NA)
+    interpretation = field_metadata.get('Interpretation', '')
+    data_type = field_metadata['DataType']
+    lookup = lookups.get(field_metadata.get('LookupName'))
+
+    if interpretation == LOOKUP_TYPE:
+        return _to_categorical(strings, lookup)
+    elif interpretation in LOOKUP_MULTI_TYPES:
+        split = lookup_multi_decoder(lookup)
+        return pd.Series([split(value) if value else None for value in values], dtype=object)
+
+    if data_type in _INTEGER_TYPES:
+        return strings.astype('Int64')
+    elif data_type == 'Decimal':
+        return pd.to_numeric(strings).astype('float64')
+    elif data_type == 'Boolean':
+        return (strings == '1').astype('boolean')
+    elif data_type in ('DateTime', 'Date'):
+        # Values without an offset are UTC, as with the RecordDecoder
+        timestamps = pd.to_datetime(strings.astype(object), utc=True, format='ISO8601')
+        return timestamps if include_tz else timestamps.dt.tz_localize(None)
+    elif data_type == 'Time':
+        return pd.Series([decode_time(value, include_tz) if value else None for value in values], dtype=object)
+    return pd.Series([value or None for value in values], dtype=object)
+
+
+def _to_categorical(strings: pd.Series, lookup: Mapping[str, str] = None) -> pd.Series:
+    categorical = strings.astype(object).astype('category')
+    if not lookup:
+        return categorical
+    # Expand the categories rather than the values, which maps each distinct value only once
+    expanded = [lookup.get(value, value) for value in categorical.cat.categories]
+    if len(set(expanded)) == len(expanded):
+        return categorical.cat.rename_categories(expanded)
+    return categorical.map(dict(zip(categorical.cat.categories, expanded))).astype('category')
@@ -2,11 +2,9 @@ import logging
 import re
 from collections import OrderedDict
 from datetime import datetime, time, timezone
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
 from functools import partial
-from typing import Any, Sequence
-
-import udatetime
+from typing import AbstractSet, Any, Callable, Iterable, Mapping, Sequence, Union
 
 from rets.errors import RetsParseError
 
@@ -15,11 +13,39 @@ logger = logging.getLogger('rets')
 
 class RecordDecoder:
 
-    def __init__(self, table: Sequence[dict], include_tz: bool = False):
+    def __init__(self,
+                 table: Sequence[dict],
+                 include_tz: bool = False,
+                 lookups: Mapping[str, Mapping[str, str]] = None,
+                 numeric: Union[str, Mapping[str, str]] = 'decimal',
+                 intern: Union[bool, AbstractSet[str]] = False):
+        """
+        :param lookups: An optional mapping of LookupName to a dict of lookup Value to LongValue,
+            see Resource.lookups. If given, the values of Lookup fields are expanded to their
+            LongValue, which decodes a COMPACT response like a COMPACT-DECODED one.
+        :param numeric: How Decimal fields are decoded: 'decimal' to an exact decimal.Decimal,
+            'float' to a float, or 'scaled' to the int of the value times 10 ** Precision, e.g.
+            cents for a Precision of 2. A mapping of SystemName or DataType to one of these sets
+            it per field, and fields missing from it are decoded to Decimal.
+        :param intern: If set, the values of Lookup and LookupMulti fields are interned, so that
+            equal values share a single object. A set of SystemNames interns exactly those fields
+            instead, which allows leaving out high-cardinality lookups or adding repetitive
+            Character fields. Interned LookupMulti values are tuples rather than lists, since
+            they are shared between rows. The interning tables live as long as the decoder.
+        """
         self._metadata_map = {field['SystemName']: field for field in table}
         self._include_tz = include_tz
+        self._lookups = lookups or {}
+        self._numeric = numeric
+        self._intern = intern
+        # Maps each interned field to a dict of raw value to its shared decoded value
+        self._intern_tables = {}
 
-    def decode(self, rows: Sequence[dict]) -> Sequence[dict]:
+    def decode(self, rows: Sequence[dict], row_type: Callable[[Iterable], dict] = OrderedDict) -> Sequence[dict]:
+        """
+        Decodes the rows into rows of row_type, which is called with the decoded (field, value)
+        pairs of each row, e.g. a row type of AdaptiveProjection.
+        """
         if not rows:
             return ()
 
@@ -34,9 +60,28 @@ class RecordDecoder:
             except Exception as e:
                 raise ValueError(f"Error decoding field {field} with value {value}. Error: {e}") from e
 
-        return tuple(OrderedDict((field, decode_field(field, value)) for field, value in row.items())
+        return tuple(row_type((field, decode_field(field, value)) for field, value in row.items())
                      for row in rows)
 
+    def decode_columns(self, rows: Sequence[dict]) -> Mapping[str, list]:
+        """
+        Decodes the rows into an ordered mapping of each field to the list of its decoded values,
+        without building a dict per row. This is the cheaper path for columnar consumers.
+        """
+        if not rows:
+            return OrderedDict()
+
+        fields = tuple(rows[0].keys())
+        return self.decode_column_values(OrderedDict((field, [row[field] for row in rows]) for field in fields))
+
+    def decode_column_values(self, columns: Mapping[str, Sequence[str]]) -> Mapping[str, list]:
+        """
+        Decodes an ordered mapping of each field to the list of its raw values, e.g. the split
+        DATA lines of a SearchBatch transposed into columns, like decode_columns.
+        """
+        decoders = self._build_decoders(tuple(columns))
+        return OrderedDict((field, _decode_column(field, decoders[field], values)) for field, values in columns.items())
+
     def _build_decoders(self, fields: Sequence[str]) -> dict:
         decoders = {}
         for field in fields:
@@ -46,30 +91,129 @@ class RecordDecoder:
                 logger.warning('field %s not found in table metadata', field)
                 field_metadata = {'DataType': 'Character'}
 
-            decoders[field] = _get_decoder(
+            interpretation = field_metadata.get('Interpretation', '')
+            intern = self._should_intern(field, interpretation)
+            decoder = _get_decoder(
                 data_type=field_metadata['DataType'],
-                interpretation=field_metadata.get('Interpretation', ''),
+                interpretation=interpretation,
                 include_tz=self._include_tz,
+                lookup=self._lookups.get(field_metadata.get('LookupName')),
+                numeric=numeric_policy(self._numeric, field, field_metadata['DataType']),
+                precision=field_metadata.get('Precision'),
+                immutable=intern,
             )
+            if intern:
+                decoder = partial(_decode_interned, decoder, self._intern_tables.setdefault(field, {}))
+            decoders[field] = decoder
 
         return decoders
 
+    def _should_intern(self, field: str, interpretation: str) -> bool:
+        if isinstance(self._intern, bool):
+            return self._intern and (interpretation == LOOKUP_TYPE or interpretation in LOOKUP_MULTI_TYPES)
+        return field in self._intern
+
+
+def _decode_column(field: str, decoder, values: Sequence[str]) -> list:
+    try:
+        if '' not in values:
+            # Columns without empty values are decoded in a single pass of the C-level map
+            return list(map(decoder, values))
+        return [decoder(value) if value else None for value in values]
+    except Exception as e:
+        raise ValueError(f"Error decoding field {field}. Error: {e}") from e
+
 
-def _get_decoder(data_type: str, interpretation: str, include_tz: bool = False):
-    if interpretation == _LOOKUP_TYPE:
+def _get_decoder(data_type: str,
+                 interpretation: str,
+                 include_tz: bool = False,
+                 lookup: Mapping[str, str] = None,
+                 numeric: str = 'decimal',
+                 precision: str = None,
+                 immutable: bool = False):
+    if interpretation == LOOKUP_TYPE:
+        if lookup:
+            return partial(_decode_lookup, lookup.get)
         return str
-    elif interpretation in _LOOKUP_MULTI_TYPES:
-        return lambda value: value.split(',')
+    elif interpretation in LOOKUP_MULTI_TYPES:
+        decoder = lookup_multi_decoder(lookup)
+        if immutable:
+            return lambda value: tuple(decoder(value))
+        return decoder
 
     if data_type in _TIMEZONE_AWARE_DECODERS:
         return partial(_TIMEZONE_AWARE_DECODERS[data_type], include_tz=include_tz)
 
+    if data_type == 'Decimal':
+        return _get_numeric_decoder(numeric, precision)
+
     try:
         return _DECODERS[data_type]
     except KeyError:
         raise RetsParseError('unknown data type %s' % data_type) from None
 
 
+def numeric_policy(numeric: Union[str, Mapping[str, str]], field: str, data_type: str) -> str:
+    """ Returns the numeric policy of a field, see RecordDecoder. """
+    if isinstance(numeric, str):
+        return numeric
+    return numeric.get(field) or numeric.get(data_type) or 'decimal'
+
+
+def _get_numeric_decoder(numeric: str, precision: str = None):
+    if numeric == 'decimal':
+        return Decimal
+    elif numeric == 'float':
+        return float
+    elif numeric == 'scaled':
+        if not precision:
+            raise RetsParseError('scaled decoding requires the Precision of the field')
+        return partial(_decode_scaled, int(precision))
+    raise RetsParseError('unknown numeric policy %s' % numeric)
+
+
+def _decode_scaled(scale: int, value: str) -> int:
+    whole, _, fraction = value.partition('.')
+    if len(fraction) <= scale:
+        try:
+            return int(whole + fraction.ljust(scale, '0'))
+        except ValueError:
+            pass
+    # Values with more digits than the Precision or with an exponent are rounded exactly
+    return int(Decimal(value).scaleb(scale).to_integral_value(ROUND_HALF_UP))
+
+
+def _decode_interned(decoder: Callable[[str], Any], table: dict, value: str) -> Any:
+    try:
+        return table[value]
+    except KeyError:
+        decoded = table[value] = decoder(value)
+        return decoded
+
+
+def _decode_lookup(lookup_get, value: str) -> str:
+    # Values missing from the lookup metadata are passed through unchanged.
+    return lookup_get(value, value)
+
+
+def lookup_multi_decoder(lookup: Mapping[str, str] = None) -> Callable[[str], Sequence[str]]:
+    """
+    Returns a function that splits a LookupMulti value into its values, expanded with the
+    lookup if one is given.
+    """
+    if lookup:
+        return partial(_decode_lookup_multi, lookup.get)
+    return _split_lookup_multi
+
+
+def _decode_lookup_multi(lookup_get, value: str) -> Sequence[str]:
+    return [lookup_get(v, v) for v in value.split(',')]
+
+
+def _split_lookup_multi(value: str) -> Sequence[str]:
+    return value.split(',')
+
+
 def _decode_datetime(value: str, include_tz: bool) -> datetime:
     # Correct `0000-00-00` to `0000-00-00T00:00:00`
     if len(value) == 10:
@@ -78,13 +222,22 @@ def _decode_datetime(value: str, include_tz: bool) -> datetime:
     elif value[10] == ' ':
         value = '%sT%s' % (value[0:10], value[11:])
 
-    decoded = udatetime.from_string(value)
+    decoded = _udatetime_from_string(value)
     if not include_tz:
         return decoded.astimezone(timezone.utc).replace(tzinfo=None)
     return decoded
 
 
-def _decode_time(value: str, include_tz: bool) -> time:
+def _udatetime_from_string(value: str) -> datetime:
+    # Imports udatetime on the first decoded datetime and replaces this function with its parser
+    global _udatetime_from_string
+    import udatetime
+    _udatetime_from_string = udatetime.from_string
+    return _udatetime_from_string(value)
+
+
+def decode_time(value: str, include_tz: bool) -> time:
+    """ Decodes the value of a Time field, like the RecordDecoder. """
     decoded = _decode_datetime('1970-01-01T' + value, include_tz)
     return decoded.time().replace(tzinfo=decoded.tzinfo)
 
@@ -97,13 +250,15 @@ def _decode_date(value: str, include_tz: bool) -> datetime:
         return _decode_datetime(value, include_tz)
 
 
-_LOOKUP_TYPE = 'Lookup'
+# The Interpretations of fields whose values are codes of a lookup, and of fields whose values
+# are comma-separated lists of such codes
+LOOKUP_TYPE = 'Lookup'
 
-_LOOKUP_MULTI_TYPES = frozenset(('LookupMulti', 'LookupBitstring', 'LookupBitmask'))
+LOOKUP_MULTI_TYPES = frozenset(('LookupMulti', 'LookupBitstring', 'LookupBitmask'))
 
 _TIMEZONE_AWARE_DECODERS = {
     'DateTime': _decode_datetime,
-    'Time': _decode_time,
+    'Time': decode_time,
     'Date': _decode_date,
 }
 
@@ -114,7 +269,6 @@ _DECODERS = {
     'Small': int,
     'Int': int,
     'Long': int,
-    'Decimal': Decimal,
     'Number': int,
     # Point is new "Edm.GeographyPoint" from RESO, look online for spec. Can store as Postgres Point, see https://bit.ly/2BDPgUS
     'Point': str,
@@ -0,0 +1,63 @@
+import dbm
+from typing import Iterable, Mapping
+
+from rets.http.data import SearchResult
+
+
+class HashStore:
+    """
+    Stores the content hash of the last seen version of each record, keyed by the KeyField
+    value of the record. Subclasses can back this with any key-value store.
+    """
+
+    def get_many(self, keys: Iterable[str]) -> Mapping[str, str]:
+        """ Returns the known hashes of the given keys. Unknown keys are omitted. """
+        raise NotImplementedError
+
+    def set_many(self, hashes: Mapping[str, str]) -> None:
+        raise NotImplementedError
+
+    def commit(self, result: SearchResult) -> None:
+        """
+        Saves the hashes of the records of a search result that was filtered by this store, once
+        the caller has stored them, see ResourceClass.search. Results that were not filtered by
+        a store have no hashes to save.
+        """
+        self.set_many(getattr(result, 'pending_hashes', None) or {})
+
+
+class MemoryHashStore(HashStore):
+
+    def __init__(self, hashes: Mapping[str, str] = None):
+        self._hashes = dict(hashes or {})
+
+    def get_many(self, keys: Iterable[str]) -> Mapping[str, str]:
+        return {key: self._hashes[key] for key in keys if key in self._hashes}
+
+    def set_many(self, hashes: Mapping[str, str]) -> None:
+        self._hashes.update(hashes)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+
+class DbmHashStore(HashStore):
+    """ Persists the hashes in a dbm database so that they survive between runs. """
+
+    def __init__(self, path: str):
+        self._db = dbm.open(path, 'c')
+
+    def get_many(self, keys: Iterable[str]) -> Mapping[str, str]:
+        hashes = {}
+        for key in keys:
+            value = self._db.get(key.encode())
+            if value is not None:
+                hashes[key] = value.decode()
+        return hashes
+
+    def set_many(self, hashes: Mapping[str, str]) -> None:
+        for key, value in hashes.items():
+            self._db[key.encode()] = value.encode()
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,265 @@
+"""
+Keeps a local SQLite copy of the records of a class, fed from its search pages, so that
+frequent lookups by key or by selected fields are answered locally instead of by the server:
+
+    with LocalIndex('listings.sqlite', resource_class, indexed_fields=('LIST_15', 'LIST_22')) as index:
+        index.sync('(LIST_87=2017-01-01T00:00:00+)')
+        result = index.query_local({'LIST_15': ['Active', 'Pending'], 'LIST_22': Range(100000, None)})
+
+The rows are stored as returned by the server, in columns typed by the METADATA-TABLE, and are
+decoded on the way out like the rows of a search.
+"""
+import sqlite3
+import threading
+from typing import Any, AbstractSet, Iterable, List, Mapping, Sequence, Tuple, Union
+
+from rets.client.decoder import LOOKUP_MULTI_TYPES
+from rets.client.query import value_formatter, value_kind
+from rets.client.record import Record
+from rets.errors import RetsClientError
+from rets.http.data import SearchResult
+
+_COLUMN_TYPES = {
+    'Boolean': 'INTEGER',
+    'Tiny': 'INTEGER',
+    'Small': 'INTEGER',
+    'Int': 'INTEGER',
+    'Long': 'INTEGER',
+    'Number': 'INTEGER',
+}
+
+
+class LocalIndex:
+    """
+    A local store of the records of a resource class in an SQLite database at path, with one
+    row per value of the key field of the resource. Records synced again replace the values of
+    their synced fields.
+
+    :param indexed_fields: The SystemNames of the fields to create an index on, e.g. the fields
+        that query_local is commonly called with. The key field is always indexed.
+    :param full_text_fields: The SystemNames of the fields to index for full text search with
+        the text argument of query_local, e.g. remarks and addresses. Requires the FTS5
+        extension of SQLite.
+    """
+
+    def __init__(self,
+                 path: str,
+                 resource_class,
+                 indexed_fields: Sequence[str] = (),
+                 full_text_fields: Sequence[str] = ()):
+        self.resource_class = resource_class
+        self._metadata_map = {field['SystemName']: field for field in resource_class.table}
+        self._key_field = resource_class.resource.key_field
+        self._assert_fields((self._key_field,) + tuple(indexed_fields) + tuple(full_text_fields))
+        self._table = '%s_%s' % (resource_class.resource.name, resource_class.name)
+        self._full_text_fields = tuple(full_text_fields)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._create_tables(indexed_fields)
+
+    def update(self, rows: Iterable[Mapping[str, str]]) -> int:
+        """
+        Upserts undecoded rows, e.g. the data of search_raw_pages, by the key field and returns
+        the number of rows. Empty values are stored as NULL.
+        """
+        count = 0
+        with self._lock, self._db:
+            statements = {}
+            for row in rows:
+                fields = tuple(row)
+                if fields not in statements:
+                    self._assert_fields(fields)
+                    if self._key_field not in fields:
+                        raise RetsClientError('rows must include the key field %s' % self._key_field)
+                    statements[fields] = self._upsert_statement(fields)
+                self._db.execute(statements[fields], tuple(value if value != '' else None for value in row.values()))
+                count += 1
+        return count
+
+    def sync(self,
+             query: Union[str, Mapping[str, Any]],
+             fields: Sequence[str] = None,
+             page_size: int = None,
+             **kwargs) -> int:
+        """
+        Searches the resource class page by page, see search_raw_pages, upserts every page into
+        the index and returns the number of upserted rows.
+        """
+        if fields and self._key_field not in fields:
+            fields = tuple(fields) + (self._key_field,)
+        pages = self.resource_class.search_raw_pages(query, fields, page_size, **kwargs)
+        return sum(self.update(page.data or ()) for page in pages)
+
+    def delete(self, keys: Iterable[str]) -> None:
+        keys = tuple(keys)
+        with self._lock, self._db:
+            self._db.executemany(
+                'DELETE FROM %s WHERE %s = ?' % (_quote(self._table), _quote(self._key_field)),
+                ((key,) for key in keys),
+            )
+
+    def query_local(self,
+                    query: Mapping[str, Any] = None,
+                    fields: Sequence[str] = None,
+                    text: str = None,
+                    limit: int = None,
+                    parse: bool = True,
+                    include_tz: bool = False,
+                    expand_lookups: bool = False,
+                    numeric: Union[str, Mapping[str, str]] = 'decimal',
+                    intern: Union[bool, AbstractSet[str]] = False) -> SearchResult:
+        """
+        Returns the local records that match the query, like search does for the server. The
+        query maps SystemNames to a value, a list of values or a Range, formatted as for the
+        mapping form of search, and all terms must match. A list matches a LookupMulti field if
+        any of its values does. Values that are str are compared as given.
+
+        :param text: An FTS5 full text query over the full_text_fields, e.g. 'pool NOT shared'.
+        """
+        query = query or {}
+        self._assert_fields(tuple(query) + tuple(fields or ()))
+        if text is not None and not self._full_text_fields:
+            raise RetsClientError('full text search requires full_text_fields')
+
+        terms = []
+        parameters = []
+        for field, value in query.items():
+            term, values = self._term(field, value)
+            terms.append(term)
+            parameters.extend(values)
+        if text is not None:
+            terms.append('rowid IN (SELECT rowid FROM %s WHERE %s MATCH ?)' % (
+                _quote(self._table + '_fts'), _quote(self._table + '_fts')))
+            parameters.append(text)
+
+        with self._lock:
+            columns = tuple(fields) if fields else tuple(self._columns())
+            sql = 'SELECT %s FROM %s' % (', '.join(_quote(c) for c in columns), _quote(self._table))
+            if terms:
+                sql += ' WHERE ' + ' AND '.join(terms)
+            if limit is not None:
+                sql += ' LIMIT %i' % limit
+            cursor = self._db.execute(sql, parameters)
+            rows = tuple(dict(zip(columns, (_to_str(value) for value in row))) for row in cursor)
+
+        if parse and rows:
+            rows = self.resource_class.decoder(include_tz, expand_lookups, numeric, intern).decode(rows)
+        return SearchResult(
+            count=len(rows),
+            max_rows=False,
+            data=tuple(Record(self.resource_class, row) for row in rows),
+        )
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM %s' % _quote(self._table)).fetchone()[0]
+
+    def __enter__(self) -> 'LocalIndex':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _create_tables(self, indexed_fields: Sequence[str]) -> None:
+        # The key is TEXT whatever its DataType, as an INTEGER PRIMARY KEY would alias the rowid and
+        # reject keys that are not integers
+        columns = ['%s %s' % (
+            _quote(field),
+            'TEXT PRIMARY KEY' if field == self._key_field else _COLUMN_TYPES.get(field_metadata['DataType'], 'TEXT'),
+        ) for field, field_metadata in self._metadata_map.items()]
+
+        with self._lock, self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS %s (%s)' % (_quote(self._table), ', '.join(columns)))
+            # Fields added to the METADATA-TABLE since the table was created
+            existing = set(self._columns())
+            for field, column in zip(self._metadata_map, columns):
+                if field not in existing:
+                    self._db.execute('ALTER TABLE %s ADD COLUMN %s' % (_quote(self._table), column))
+
+            for field in indexed_fields:
+                self._db.execute('CREATE INDEX IF NOT EXISTS %s ON %s (%s)' % (
+                    _quote('%s_%s' % (self._table, field)), _quote(self._table), _quote(field)))
+
+            if self._full_text_fields:
+                self._create_full_text()
+
+    def _create_full_text(self) -> None:
+        # An external content table, whose text is read from the table of the records and kept
+        # in sync with it by triggers
+        fts = _quote(self._table + '_fts')
+        table = _quote(self._table)
+        columns = ', '.join(_quote(f) for f in self._full_text_fields)
+        new = ', '.join('new.%s' % _quote(f) for f in self._full_text_fields)
+        old = ', '.join('old.%s' % _quote(f) for f in self._full_text_fields)
+        insert = 'INSERT INTO %s (rowid, %s) VALUES (new.rowid, %s);' % (fts, columns, new)
+        delete = "INSERT INTO %s (%s, rowid, %s) VALUES ('delete', old.rowid, %s);" % (fts, fts, columns, old)
+
+        self._db.execute('CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5(%s, content=%s)' % (fts, columns, table))
+        for event, body in (('INSERT', insert), ('DELETE', delete), ('UPDATE', delete + insert)):
+            self._db.execute('CREATE TRIGGER IF NOT EXISTS %s AFTER %s ON %s BEGIN %s END' % (
+                _quote('%s_fts_%s' % (self._table, event.lower())), event, table, body))
+
+    def _upsert_statement(self, fields: Sequence[str]) -> str:
+        columns = ', '.join(_quote(field) for field in fields)
+        updates = ', '.join('%s = excluded.%s' % (_quote(f), _quote(f)) for f in fields if f != self._key_field)
+        return 'INSERT INTO %s (%s) VALUES (%s) ON CONFLICT (%s) DO %s' % (
+            _quote(self._table),
+            columns,
+            ', '.join('?' * len(fields)),
+            _quote(self._key_field),
+            'UPDATE SET ' + updates if updates else 'NOTHING',
+        )
+
+    def _term(self, field: str, value: Any) -> Tuple[str, List[Any]]:
+        field_metadata = self._metadata_map[field]
+        format_value = value_formatter(field_metadata['DataType'])
+        column = _quote(field)
+        placeholder = '?'
+        if field_metadata['DataType'] == 'Decimal':
+            # Decimals are stored as the exact strings of the server, which a NUMERIC column would
+            # round to floats, and only compared as numbers
+            column = 'CAST(%s AS REAL)' % column
+            placeholder = 'CAST(? AS REAL)'
+        kind = value_kind(value)
+
+        if kind == 'range':
+            if value.start is None and value.end is None:
+                raise RetsClientError('range must have a start or an end')
+            elif value.end is None:
+                return '%s >= %s' % (column, placeholder), [format_value(value.start)]
+            elif value.start is None:
+                return '%s <= %s' % (column, placeholder), [format_value(value.end)]
+            return '%s BETWEEN %s AND %s' % (column, placeholder, placeholder), [
+                format_value(value.start), format_value(value.end)]
+        elif kind == 'list':
+            values = [format_value(v) for v in value]
+            if not values:
+                return '0', []
+            if field_metadata.get('Interpretation', '') in LOOKUP_MULTI_TYPES:
+                # Matches any of the values among the comma-separated values of the field
+                return '(%s)' % ' OR '.join(["(',' || %s || ',') LIKE ?" % column] * len(values)), [
+                    '%%,%s,%%' % v for v in values]
+            return '%s IN (%s)' % (column, ', '.join([placeholder] * len(values))), values
+        return '%s = %s' % (column, placeholder), [format_value(value)]
+
+    def _columns(self) -> Sequence[str]:
+        return [row[1] for row in self._db.execute('PRAGMA table_info(%s)' % _quote(self._table))]
+
+    def _assert_fields(self, fields: Sequence[str]) -> None:
+        invalid = tuple(field for field in fields if field not in self._metadata_map)
+        if invalid:
+            raise RetsClientError('invalid fields %s' % ','.join(invalid))
+
+
+def _quote(identifier: str) -> str:
+    return '"%s"' % identifier.replace('"', '""')
+
+
+def _to_str(value: Any) -> str:
+    # Rows are decoded from the strings of the server, and NULL was an empty value
+    if value is None:
+        return ''
+    return str(value)
@@ -0,0 +1,36 @@
+from collections import namedtuple
+from typing import Sequence
+
+MetadataDiff = namedtuple('MetadataDiff', (
+    'added',
+    'removed',
+    'changed',
+))
+MetadataDiff.__doc__ = """
+The names of the classes of a resource that were added, removed, or whose METADATA-TABLE
+changed, between the cached and the freshly fetched METADATA-CLASS.
+"""
+
+
+def diff_classes(cached: Sequence[dict], fetched: Sequence[dict]) -> MetadataDiff:
+    """
+    Compares two METADATA-CLASS listings of a resource. The table of a class has changed when
+    its TableVersion or TableDate differ, or when neither listing has either of them, since
+    nothing tells then that it is unchanged.
+    """
+    cached_map = {m['ClassName']: m for m in cached}
+    fetched_map = {m['ClassName']: m for m in fetched}
+    return MetadataDiff(
+        added=tuple(name for name in fetched_map if name not in cached_map),
+        removed=tuple(name for name in cached_map if name not in fetched_map),
+        changed=tuple(name for name, m in fetched_map.items()
+                      if name in cached_map and _table_changed(cached_map[name], m)),
+    )
+
+
+def _table_changed(cached: dict, fetched: dict) -> bool:
+    cached_version = (cached.get('TableVersion'), cached.get('TableDate'))
+    fetched_version = (fetched.get('TableVersion'), fetched.get('TableDate'))
+    if not any(cached_version) and not any(fetched_version):
+        return True
+    return cached_version != fetched_version
@@ -1,11 +1,25 @@
-from typing import Any, Mapping, Sequence, Union
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from typing import TYPE_CHECKING, Any, Iterator, Mapping, Sequence, Union
 
-from rets.http import Object, RetsHttpClient
+from rets.http.data import Object
+
+if TYPE_CHECKING:
+    from rets.http.client import RetsHttpClient
+
+ObjectBatch = namedtuple('ObjectBatch', (
+    'preferred',
+    'objects',
+))
+ObjectBatch.__doc__ = """
+A batch of fetched objects, as a mapping of each resource key to the sequence of its objects.
+If preferred is set, the batch holds only the preferred object of each key.
+"""
 
 
 class ObjectType:
 
-    def __init__(self, resource, metadata: dict, http_client: RetsHttpClient):
+    def __init__(self, resource, metadata: dict, http_client: 'RetsHttpClient'):
         self.resource = resource
         self._http = http_client
         self._metadata = metadata
@@ -28,5 +42,60 @@ class ObjectType:
             **kwargs) -> Sequence[Object]:
         return self._http.get_object(self.resource.name, self.name, resource_keys, **kwargs)
 
+    def invalidate(self, resource_keys: Sequence[str]) -> None:
+        """ Removes the objects of the resource keys from the ObjectCache of the client, if any. """
+        cache = self._http.object_cache
+        if cache is not None:
+            cache.invalidate(self.resource.name, self.name, resource_keys)
+
+    def get_preferred_first(self,
+                            resource_keys: Sequence[str],
+                            batch_size: int = 20,
+                            threads: int = 4,
+                            backfill_threads: int = 1,
+                            preferred_type: 'ObjectType' = None,
+                            **kwargs) -> Iterator[ObjectBatch]:
+        """
+        Fetches the objects of the resource keys in two phases and yields every batch as soon as
+        it completes. First the preferred object (object id 0) of every key is fetched in batches
+        of batch_size keys on up to threads threads. Then all objects of every key are backfilled
+        on up to backfill_threads threads, which only start once the preferred phase finished, so
+        that the backfill never delays a preferred object.
+
+        :param preferred_type: The object type of the preferred phase, e.g. a thumbnail type of
+            the resource, which makes a usable image available sooner. Defaults to this type.
+        :param kwargs: Keyword arguments of get for both phases, e.g. media_types.
+        """
+        keys = tuple(str(key) for key in resource_keys)
+        batches = [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+        preferred_type = preferred_type or self
+
+        def backfill(batch: Sequence[str]) -> Sequence[Object]:
+            wait(preferred)
+            return self.get(OrderedDict((key, '*') for key in batch), **kwargs)
+
+        with ThreadPoolExecutor(threads) as executor, ThreadPoolExecutor(backfill_threads) as backfill_executor:
+            preferred = {
+                executor.submit(preferred_type.get, OrderedDict((key, 0) for key in batch), **kwargs): batch
+                for batch in batches
+            }
+            backfilled = {backfill_executor.submit(backfill, batch): batch for batch in batches}
+            try:
+                for future in as_completed(preferred):
+                    yield ObjectBatch(True, _group_objects(preferred[future], future.result()))
+                for future in as_completed(backfilled):
+                    yield ObjectBatch(False, _group_objects(backfilled[future], future.result()))
+            finally:
+                # Stops the pending batches if the caller stopped early or a batch failed
+                for future in list(preferred) + list(backfilled):
+                    future.cancel()
+
     def __repr__(self) -> str:
         return '<Object: %s:%s>' % (self.resource.name, self.name)
+
+
+def _group_objects(keys: Sequence[str], objects: Sequence[Object]) -> Mapping[str, Sequence[Object]]:
+    grouped = OrderedDict((key, []) for key in keys)
+    for object_ in objects:
+        grouped.setdefault(object_.content_id, []).append(object_)
+    return grouped
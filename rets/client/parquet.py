@@ -0,0 +1,132 @@
+"""
+Streams search results into Parquet files. This module requires the optional pyarrow
+dependency, which is installed with `pip install rets-python[parquet]`.
+"""
+from typing import Any, Mapping, Sequence, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from rets.client.decoder import LOOKUP_MULTI_TYPES, LOOKUP_TYPE, numeric_policy
+from rets.http.parsers.parse import split_batch_columns
+
+# Integer types and the number of decimal digits they can always hold.
+_INTEGER_TYPES = {
+    'Tiny': (pa.int8(), 2),
+    'Small': (pa.int16(), 4),
+    'Int': (pa.int32(), 9),
+    'Long': (pa.int64(), 18),
+    'Number': (pa.int64(), 18),
+}
+
+_MAX_DECIMAL_DIGITS = 38
+
+
+def arrow_type(field_metadata: dict, include_tz: bool = False, numeric: str = 'decimal') -> pa.DataType:
+    """
+    Maps the METADATA-TABLE entry of a field to the Arrow type of its decoded values. Integer
+    types are widened to int64 when the MaximumLength of the field does not fit, and decimals
+    use the Precision of the field as their scale and at least MaximumLength integer digits,
+    or 38 digits without a MaximumLength. They are float64 or int64 values for the 'float' and
+    'scaled' numeric policies of the RecordDecoder.
+    """
+    interpretation = field_metadata.get('Interpretation', '')
+    if interpretation == LOOKUP_TYPE:
+        return pa.dictionary(pa.int32(), pa.string())
+    elif interpretation in LOOKUP_MULTI_TYPES:
+        return pa.list_(pa.string())
+
+    data_type = field_metadata['DataType']
+    max_length = int(field_metadata.get('MaximumLength') or 0)
+
+    if data_type in _INTEGER_TYPES:
+        type_, digits = _INTEGER_TYPES[data_type]
+        return type_ if max_length <= digits else pa.int64()
+    elif data_type == 'Decimal' and numeric == 'float':
+        return pa.float64()
+    elif data_type == 'Decimal' and numeric == 'scaled':
+        return pa.int64()
+    elif data_type == 'Decimal':
+        scale = int(field_metadata.get('Precision') or 0)
+        if not max_length:
+            return pa.decimal128(_MAX_DECIMAL_DIGITS, scale)
+        # Servers differ on whether MaximumLength counts the fraction digits, so the precision
+        # leaves room for the fraction on top of it
+        return pa.decimal128(min(max_length + scale, _MAX_DECIMAL_DIGITS), scale)
+    elif data_type == 'Boolean':
+        return pa.bool_()
+    elif data_type == 'DateTime':
+        return pa.timestamp('us', tz='UTC' if include_tz else None)
+    elif data_type == 'Date':
+        return pa.date32()
+    elif data_type == 'Time':
+        return pa.time64('us')
+    return pa.string()
+
+
+def arrow_schema(table: Sequence[dict],
+                 fields: Sequence[str] = None,
+                 include_tz: bool = False,
+                 numeric: Union[str, Mapping[str, str]] = 'decimal') -> pa.Schema:
+    """
+    Builds the Arrow schema of the given fields, or of all fields of the table. Fields missing
+    from the table metadata are typed as strings, like the RecordDecoder decodes them.
+    """
+    metadata_map = {field['SystemName']: field for field in table}
+    if fields is None:
+        fields = tuple(metadata_map)
+
+    def field_type(field: str) -> pa.DataType:
+        field_metadata = metadata_map.get(field, {'DataType': 'Character'})
+        return arrow_type(field_metadata, include_tz, numeric_policy(numeric, field, field_metadata['DataType']))
+
+    return pa.schema([pa.field(field, field_type(field)) for field in fields])
+
+
+def write_parquet(resource_class,
+                  where: Any,
+                  query: Union[str, Mapping[str, str]],
+                  fields: Sequence[str] = None,
+                  page_size: int = 10000,
+                  include_tz: bool = False,
+                  expand_lookups: bool = False,
+                  compression: str = 'snappy',
+                  numeric: Union[str, Mapping[str, str]] = 'decimal',
+                  **kwargs) -> int:
+    """
+    Searches the resource class page by page and writes the rows to the Parquet file at where,
+    which may be a path or a writable file object, in row groups of up to page_size rows. Each
+    page is streamed, and the split DATA lines of its batches are decoded column by column
+    straight into Arrow arrays, so memory use is bounded by the page size regardless of the
+    number of matching records.
+
+    The numeric policy of the RecordDecoder also sets the Arrow type of Decimal fields. Its
+    'float' and 'scaled' policies avoid building a decimal.Decimal per value.
+
+    Returns the number of rows written.
+    """
+    decoder = resource_class.decoder(include_tz, expand_lookups, numeric)
+    writer = None
+    rows_written = 0
+    try:
+        for batch in resource_class.search_raw_batch_pages(query, fields, page_size, page_size, **kwargs):
+            columns = decoder.decode_column_values(split_batch_columns(batch))
+            if writer is None:
+                schema = arrow_schema(resource_class.table, tuple(columns), include_tz, numeric)
+                writer = pq.ParquetWriter(where, schema, compression=compression)
+
+            batch = pa.record_batch([
+                pa.array(values, type=schema.field(field).type) for field, values in columns.items()
+            ], schema=schema)
+            writer.write_table(pa.Table.from_batches([batch]))
+            rows_written += batch.num_rows
+
+        if writer is None:
+            # Write an empty file with the requested schema when no records match.
+            schema = arrow_schema(resource_class.table, fields, include_tz, numeric)
+            writer = pq.ParquetWriter(where, schema, compression=compression)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return rows_written
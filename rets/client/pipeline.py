@@ -0,0 +1,90 @@
+"""
+Decodes streamed search responses in a pool of worker processes, so that splitting and
+decoding the rows of a large response no longer limits the throughput of a single core while
+the main process keeps downloading the response.
+"""
+import os
+from collections import OrderedDict, deque
+import concurrent.futures
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from itertools import zip_longest
+from typing import Iterable, Iterator, Mapping, Sequence
+
+from rets.client.decoder import RecordDecoder
+from rets.http.data import SearchBatch
+from rets.http import parsers
+
+# The decoder of a worker process, built once by _init_worker.
+_worker_decoder = None
+
+
+def decode_parallel(batches: Iterable[SearchBatch],
+                    table: Sequence[dict],
+                    include_tz: bool = False,
+                    lookups: Mapping[str, Mapping[str, str]] = None,
+                    processes: int = None,
+                    ordered: bool = True,
+                    max_pending: int = None) -> Iterator[Sequence[dict]]:
+    """
+    Splits and decodes the batches of raw DATA lines in a process pool and yields the decoded
+    rows of each batch. If ordered is set, the batches are yielded in the order of the response,
+    otherwise in the order in which the workers finish them.
+
+    At most max_pending batches, by default twice the number of processes, are submitted to the
+    pool at a time. Reading the next batch blocks until one of them is done, which bounds the
+    memory use when decoding falls behind the download.
+    """
+    processes = processes or os.cpu_count() or 1
+    max_pending = max_pending or 2 * processes
+    # concurrent.futures only loads multiprocessing when ProcessPoolExecutor is first accessed
+    executor = concurrent.futures.ProcessPoolExecutor(processes, initializer=_init_worker,
+                                                      initargs=(table, include_tz, lookups))
+    with executor:
+        if ordered:
+            yield from _decode_ordered(executor, batches, max_pending)
+        else:
+            yield from _decode_unordered(executor, batches, max_pending)
+
+
+def _decode_ordered(executor: Executor,
+                    batches: Iterable[SearchBatch],
+                    max_pending: int) -> Iterator[Sequence[dict]]:
+    pending = deque()
+    for batch in batches:
+        pending.append(executor.submit(_decode_batch, batch))
+        while pending and (len(pending) >= max_pending or pending[0].done()):
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def _decode_unordered(executor: Executor,
+                      batches: Iterable[SearchBatch],
+                      max_pending: int) -> Iterator[Sequence[dict]]:
+    pending = set()
+    for batch in batches:
+        pending.add(executor.submit(_decode_batch, batch))
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        else:
+            done = {future for future in pending if future.done()}
+            pending -= done
+        for future in done:
+            yield future.result()
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+def _init_worker(table: Sequence[dict], include_tz: bool, lookups: Mapping[str, Mapping[str, str]]) -> None:
+    global _worker_decoder
+    _worker_decoder = RecordDecoder(table, include_tz, lookups)
+
+
+def _decode_batch(batch: SearchBatch) -> Sequence[dict]:
+    columns, delimiter = batch.columns, batch.delimiter
+    rows = [OrderedDict(zip_longest(columns, parsers.split_data_line(line, delimiter))) for line in batch.lines]
+    return _worker_decoder.decode(rows)
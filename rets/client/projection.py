@@ -0,0 +1,190 @@
+import json
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from functools import partial
+from typing import AbstractSet, Callable, Iterable, Mapping, Optional, Sequence, Tuple
+
+from rets.client.utils import dump_json_atomic
+
+logger = logging.getLogger('rets')
+
+
+class ProjectionStore:
+    """
+    Stores the fields that each recurring job has read from the Records of a class, keyed by
+    the job name, resource and class. Subclasses can back this with any key-value store.
+    """
+
+    def get(self, key: str) -> AbstractSet[str]:
+        """ Returns the fields recorded for the key, or an empty set if none were recorded. """
+        raise NotImplementedError
+
+    def add(self, fields: Mapping[str, Iterable[str]]) -> None:
+        """ Adds the fields read by a run to the fields already recorded for each key. """
+        raise NotImplementedError
+
+
+class MemoryProjectionStore(ProjectionStore):
+
+    def __init__(self, fields: Mapping[str, Iterable[str]] = None):
+        self._fields = {key: frozenset(value) for key, value in (fields or {}).items()}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> AbstractSet[str]:
+        return self._fields.get(key, frozenset())
+
+    def add(self, fields: Mapping[str, Iterable[str]]) -> None:
+        with self._lock:
+            for key, value in fields.items():
+                self._fields[key] = self.get(key) | frozenset(value)
+
+
+class JsonProjectionStore(MemoryProjectionStore):
+    """ Persists the recorded fields in a JSON file so that they carry over between runs. """
+
+    def __init__(self, path: str):
+        self._path = path
+        try:
+            with open(path) as f:
+                fields = json.load(f)
+        except FileNotFoundError:
+            fields = None
+        super().__init__(fields)
+
+    def add(self, fields: Mapping[str, Iterable[str]]) -> None:
+        super().add(fields)
+        with self._lock:
+            dump_json_atomic({key: sorted(value) for key, value in self._fields.items()}, self._path)
+
+
+class AdaptiveProjection:
+    """
+    Learns which fields a named job reads from the Records of its searches, so that later runs
+    of the job only select those fields and the key field instead of every column of the class.
+
+    The first run of a job, and every run with full_rows set, fetches full rows. The fields read
+    by a run are recorded once it ends, on save() or when leaving the projection's context:
+
+        with AdaptiveProjection(store, 'daily-sync') as projection:
+            for record in resource_class.search(query, projection=projection).data:
+                ...
+
+    Reading a field that a run did not select raises a KeyError as with any other missing
+    field, and getting it with get() returns the default but logs a warning, since the value
+    would otherwise silently be missing. Either way the field is recorded, so that the following
+    runs select it.
+
+    The fields read from each row are recorded without locking, in a set per thread that is
+    merged with the others on save(). Rows stay picklable, but the fields read from a row in
+    another process are not recorded.
+    """
+
+    def __init__(self, store: ProjectionStore, job: str, full_rows: bool = False):
+        self.store = store
+        self.job = job
+        self.full_rows = full_rows
+        # The sets of fields read per key and thread, see _read_set
+        self._local = threading.local()
+        self._read = []
+        self._warned = set()
+        self._lock = threading.Lock()
+
+    def select(self, resource_class) -> Optional[Sequence[str]]:
+        """ Returns the fields to select for the class, or None to select all of them. """
+        if self.full_rows:
+            return None
+        learned = self.store.get(self._key(resource_class))
+        # Fields that were removed from the class since they were recorded are left out
+        fields = (learned | {resource_class.resource.key_field}) & resource_class.fields
+        if not learned or fields == resource_class.fields:
+            return None
+        return sorted(fields)
+
+    def row_type(self, resource_class) -> Callable[[Iterable[Tuple[str, object]]], dict]:
+        """
+        Returns the type of the rows that record the fields read from them, which the decoder
+        builds the rows of the class with instead of copying them, see RecordDecoder.decode.
+        """
+        key = self._key(resource_class)
+        return partial(_TrackingDict, self._read_set(key), partial(self._warn_missing, key))
+
+    def track(self, resource_class, row: Mapping[str, object]) -> dict:
+        """ Wraps an undecoded row to record the fields read from it. """
+        return self.row_type(resource_class)(row.items())
+
+    def save(self) -> None:
+        with self._lock:
+            sets = self._read
+            self._read = []
+            self._local = threading.local()
+        read = defaultdict(set)
+        for key, fields in sets:
+            read[key].update(fields)
+        read = {key: frozenset(fields) for key, fields in read.items() if fields}
+        if read:
+            self.store.add(read)
+
+    def _read_set(self, key: str) -> set:
+        sets = self._local.__dict__.setdefault('sets', {})
+        try:
+            return sets[key]
+        except KeyError:
+            pass
+        read = sets[key] = set()
+        with self._lock:
+            self._read.append((key, read))
+        return read
+
+    def _warn_missing(self, key: str, field: str) -> None:
+        if (key, field) not in self._warned:
+            self._warned.add((key, field))
+            logger.warning('field %s was not selected by the projection %s, it is selected from the next run',
+                           field, key)
+
+    def _key(self, resource_class) -> str:
+        return '%s:%s:%s' % (self.job, resource_class.resource.name, resource_class.name)
+
+    def __enter__(self) -> 'AdaptiveProjection':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.save()
+
+
+class _TrackingDict(OrderedDict):
+    """
+    A row that records the fields read from it. Iterating over the row reads all of its
+    fields, so consumers that do so keep receiving full rows.
+    """
+
+    def __init__(self, read: set, warn_missing: Callable[[str], None], items: Iterable[Tuple[str, object]] = ()):
+        super().__init__(items)
+        self._read = read
+        self._warn_missing = warn_missing
+
+    def __getitem__(self, field: str) -> object:
+        self._read.add(field)
+        return super().__getitem__(field)
+
+    def get(self, field: str, default: object = None) -> object:
+        self._read.add(field)
+        if field not in self:
+            self._warn_missing(field)
+        return super().get(field, default)
+
+    def __iter__(self):
+        self._read.update(super().keys())
+        return super().__iter__()
+
+    def items(self):
+        self._read.update(super().keys())
+        return super().items()
+
+    def values(self):
+        self._read.update(super().keys())
+        return super().values()
+
+    def __reduce__(self):
+        # Pickles as a plain row, without the recording state and without reading every field
+        return OrderedDict, (list(super().items()),)
@@ -0,0 +1,156 @@
+"""
+Compiles mappings of field to value into DMQL2 queries (see section 7.7 of the RETS 1.7.2
+specification), formatting Python values according to the DataType of each field:
+
+    >>> builder.compile({
+        'LIST_87': Range(datetime(2017, 1, 1), None),
+        'LIST_22': Range(100000, 250000),
+        'LIST_15': ['Active', 'Pending'],
+    })
+    '(LIST_87=2017-01-01T00:00:00+),(LIST_22=100000-250000),(LIST_15=|Active,Pending)'
+
+Values that are already str are used as given, so existing DMQL2 terms keep working.
+"""
+from collections import namedtuple
+from datetime import date, datetime, time
+from typing import Any, Callable, Mapping, Sequence, Tuple
+from urllib.parse import quote_plus
+
+from rets.client.decoder import LOOKUP_MULTI_TYPES, LOOKUP_TYPE
+from rets.errors import RetsClientError
+
+Range = namedtuple('Range', ('start', 'end'))
+Range.__doc__ = """
+An inclusive range of values. A start or end of None leaves the range open on that side.
+"""
+
+# The maximum length of the url-encoded Query argument, which keeps GET urls well below the
+# limits of common servers and proxies.
+DEFAULT_MAX_QUERY_LENGTH = 2000
+
+_DATE_FORMATS = {
+    'Date': '%Y-%m-%d',
+    'DateTime': '%Y-%m-%dT%H:%M:%S',
+    'Time': '%H:%M:%S',
+}
+
+
+class QueryBuilder:
+    """
+    Compiles DMQL2 queries for the fields of a METADATA-TABLE. The fields of a query are
+    validated once per combination of fields and value kinds, and the resulting template of
+    formatting functions is cached, so compiling many queries of the same shape only formats
+    the values.
+    """
+
+    def __init__(self, table: Sequence[dict]):
+        self._metadata_map = {field['SystemName']: field for field in table}
+        self._templates = {}
+
+    def compile(self, query: Mapping[str, Any]) -> str:
+        formatters = self._template(query)
+        return ','.join(format_term(value) for format_term, value in zip(formatters, query.values()))
+
+    def split(self, query: Mapping[str, Any], max_length: int = DEFAULT_MAX_QUERY_LENGTH) -> Sequence[str]:
+        """
+        Compiles the query into one or more queries whose url-encoded length does not exceed
+        max_length, by splitting the longest list of values among several queries. Together,
+        the queries match the same records as the full query.
+        """
+        compiled = self.compile(query)
+        if len(quote_plus(compiled)) <= max_length:
+            return (compiled,)
+
+        lists = [field for field, value in query.items() if _is_list(value)]
+        if not lists:
+            raise RetsClientError('query exceeds %i characters and has no list of values to split' % max_length)
+        split_field = max(lists, key=lambda field: len(query[field]))
+
+        queries = []
+        chunk = []
+        for value in query[split_field]:
+            candidate = self.compile({**query, split_field: chunk + [value]})
+            if chunk and len(quote_plus(candidate)) > max_length:
+                queries.append(self.compile({**query, split_field: chunk}))
+                chunk = []
+            chunk.append(value)
+        queries.append(self.compile({**query, split_field: chunk}))
+
+        if any(len(quote_plus(q)) > max_length for q in queries):
+            raise RetsClientError('query exceeds %i characters even with a single value per list' % max_length)
+        return tuple(queries)
+
+    def _template(self, query: Mapping[str, Any]) -> Tuple[Callable[[Any], str], ...]:
+        key = tuple((field, value_kind(value)) for field, value in query.items())
+        try:
+            return self._templates[key]
+        except KeyError:
+            pass
+
+        invalid = tuple(field for field in query if field not in self._metadata_map)
+        if invalid:
+            raise RetsClientError('invalid fields %s' % ','.join(invalid))
+
+        template = tuple(self._term_formatter(field, kind) for field, kind in key)
+        self._templates[key] = template
+        return template
+
+    def _term_formatter(self, field: str, kind: str) -> Callable[[Any], str]:
+        field_metadata = self._metadata_map[field]
+        format_value = value_formatter(field_metadata['DataType'])
+        prefix = '(%s=' % field
+
+        if kind == 'str':
+            return lambda value: prefix + value + ')'
+        elif kind == 'range':
+            return lambda value: prefix + _format_range(format_value, value) + ')'
+        elif kind == 'list':
+            # Lookup values are matched with the OR operator, other values with a value list
+            interpretation = field_metadata.get('Interpretation', '')
+            lookup = interpretation == LOOKUP_TYPE or interpretation in LOOKUP_MULTI_TYPES
+            list_prefix = prefix + '|' if lookup else prefix
+            return lambda value: list_prefix + ','.join(format_value(v) for v in value) + ')'
+        return lambda value: prefix + format_value(value) + ')'
+
+
+def value_kind(value: Any) -> str:
+    """ Classifies a query value as a 'str', a 'range', a 'list' of values or another 'value'. """
+    if isinstance(value, str):
+        return 'str'
+    elif isinstance(value, Range):
+        return 'range'
+    elif _is_list(value):
+        return 'list'
+    return 'value'
+
+
+def _is_list(value: Any) -> bool:
+    return isinstance(value, (list, tuple, set, frozenset)) and not isinstance(value, Range)
+
+
+def value_formatter(data_type: str) -> Callable[[Any], str]:
+    """ Returns a function that formats query values for a field of the given DataType. """
+    date_format = _DATE_FORMATS.get(data_type)
+
+    def format_value(value: Any) -> str:
+        if isinstance(value, str):
+            return value
+        elif isinstance(value, bool):
+            return '1' if value else '0'
+        elif isinstance(value, (datetime, date, time)):
+            if date_format is None:
+                raise RetsClientError('cannot query %s field with %r' % (data_type, value))
+            return value.strftime(date_format)
+        return str(value)
+
+    return format_value
+
+
+def _format_range(format_value: Callable[[Any], str], value: Range) -> str:
+    if value.start is None and value.end is None:
+        raise RetsClientError('range must have a start or an end')
+    elif value.end is None:
+        return format_value(value.start) + '+'
+    elif value.start is None:
+        return format_value(value.end) + '-'
+    return '%s-%s' % (format_value(value.start), format_value(value.end))
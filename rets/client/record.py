@@ -1,8 +1,3 @@
-from typing import Sequence
-
-from rets.http import Object
-
-
 class Record:
 
     def __init__(self, resource_class, data: dict):
@@ -1,18 +1,22 @@
-from typing import Optional, Sequence
+from typing import TYPE_CHECKING, Mapping, Optional, Sequence
 
+from rets.client.metadata import MetadataDiff, diff_classes
 from rets.client.resource_class import ResourceClass
 from rets.client.object_type import ObjectType
 from rets.client.utils import get_metadata_data
-from rets.http import RetsHttpClient
+
+if TYPE_CHECKING:
+    from rets.http.client import RetsHttpClient
 
 
 class Resource:
 
-    def __init__(self, metadata: dict, http_client: RetsHttpClient):
+    def __init__(self, metadata: dict, http_client: 'RetsHttpClient'):
         self._http = http_client
         self._metadata = metadata
         self._classes = self._classes_from_metadata(metadata.get('_classes', ()))
         self._object_types = self._object_types_from_metadata(metadata.get('_object_types', ()))
+        self._lookups = metadata.get('_lookups')
 
     @property
     def name(self) -> str:
@@ -29,6 +33,8 @@ class Resource:
             metadata['_classes'] = tuple(resource_class.metadata for resource_class in self._classes)
         if self._object_types:
             metadata['_object_types'] = tuple(object_type.metadata for object_type in self._object_types)
+        if self._lookups is not None:
+            metadata['_lookups'] = self._lookups
         return metadata
 
     @property
@@ -55,6 +61,40 @@ class Resource:
                 return resource_object
         raise KeyError('unknown object type %s' % name)
 
+    @property
+    def lookups(self) -> Mapping[str, Mapping[str, str]]:
+        """
+        A mapping of each LookupName of the resource to a dict of the lookup Value to the
+        LongValue. The lookups are fetched once with a single METADATA-LOOKUP_TYPE transaction
+        for all lookups of the resource and cached in the metadata.
+        """
+        if self._lookups is None:
+            self._lookups = self._fetch_lookups()
+        return self._lookups
+
+    def refresh_classes(self) -> MetadataDiff:
+        """
+        Fetches the METADATA-CLASS of the resource and compares it with the cached classes, see
+        diff_classes. Classes whose table changed keep their ResourceClass, but drop their
+        cached table, fields and query templates so that the table is fetched again on next
+        use. The tables of unchanged classes are kept, so after a MetadataVersion change only
+        the changed tables are fetched.
+        """
+        fetched = get_metadata_data(self._http, 'class', resource=self.name)
+        existing = {resource_class.name: resource_class for resource_class in self._classes}
+        diff = diff_classes(tuple(c.metadata for c in self._classes), fetched)
+
+        classes = []
+        for class_metadata in fetched:
+            resource_class = existing.get(class_metadata['ClassName'])
+            if resource_class is None:
+                resource_class = ResourceClass(self, class_metadata, self._http)
+            else:
+                resource_class.update_metadata(class_metadata, resource_class.name in diff.changed)
+            classes.append(resource_class)
+        self._classes = tuple(classes)
+        return diff
+
     def _fetch_classes(self) -> Sequence[ResourceClass]:
         metadata = get_metadata_data(self._http, 'class', resource=self.name)
         return self._classes_from_metadata(metadata)
@@ -63,6 +103,13 @@ class Resource:
         metadata = get_metadata_data(self._http, 'object', resource=self.name)
         return self._object_types_from_metadata(metadata)
 
+    def _fetch_lookups(self) -> Mapping[str, Mapping[str, str]]:
+        lookup_types = self._http.get_metadata('lookup_type', metadata_id='%s:*' % self.name)
+        return {
+            lookup_type.lookup: {row['Value']: row['LongValue'] for row in lookup_type.data}
+            for lookup_type in lookup_types
+        }
+
     def _classes_from_metadata(self, classes_metadata: Sequence[dict]) -> Sequence[ResourceClass]:
         return tuple(ResourceClass(self, m, self._http) for m in classes_metadata)
 
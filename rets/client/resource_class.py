@@ -1,20 +1,38 @@
-from typing import FrozenSet, Mapping, Sequence, Union
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import TYPE_CHECKING, AbstractSet, Any, FrozenSet, Iterator, Mapping, Optional, Sequence, Tuple, Union
 
 from rets.client.decoder import RecordDecoder
+from rets.client.hash_store import HashStore
+from rets.client.pipeline import decode_parallel
+from rets.client.projection import AdaptiveProjection
+from rets.client.query import DEFAULT_MAX_QUERY_LENGTH, QueryBuilder
 from rets.client.record import Record
+from rets.client.tuning import PageSizer
 from rets.client.utils import get_metadata_data
 from rets.errors import RetsClientError
-from rets.http import RetsHttpClient, SearchResult
+from rets.http import parsers
+from rets.http.data import HashedSearchResult, SearchBatch, SearchResult
+
+if TYPE_CHECKING:
+    import pandas
+
+    from rets.http.client import RetsHttpClient
 
 
 class ResourceClass:
 
-    def __init__(self, resource, metadata: dict, http_client: RetsHttpClient):
+    def __init__(self, resource, metadata: dict, http_client: 'RetsHttpClient'):
         self.resource = resource
         self._http = http_client
         self._metadata = metadata
         self._table = metadata.get('_table')
         self._fields = None
+        self._query_builder = None
+        # Maps a count query to its count and the monotonic times at which it was fetched and expires
+        self._counts = {}
 
     @property
     def name(self) -> str:
@@ -43,41 +61,397 @@ class ResourceClass:
             self._fields = frozenset(field['SystemName'] for field in self.table)
         return self._fields
 
+    def update_metadata(self, metadata: dict, table_changed: bool) -> None:
+        """
+        Replaces the METADATA-CLASS entry of the class. If its table changed, the cached table,
+        fields, query templates and counts are dropped, and the table is fetched again on next
+        use. Decoders are built from the table on each search and need no invalidation.
+        """
+        self._metadata = metadata
+        if table_changed:
+            self._table = None
+            self._fields = None
+            self._query_builder = None
+            self._counts = {}
+
+    @property
+    def query_builder(self) -> QueryBuilder:
+        if self._query_builder is None:
+            self._query_builder = QueryBuilder(self.table)
+        return self._query_builder
+
     def search(self,
-               query: Union[str, Mapping[str, str]],
+               query: Union[str, Mapping[str, Any]],
                fields: Sequence[str] = None,
                parse: bool = True,
                include_tz: bool = False,
+               hash_store: HashStore = None,
+               expand_lookups: bool = False,
+               projection: AdaptiveProjection = None,
+               numeric: Union[str, Mapping[str, str]] = 'decimal',
+               intern: Union[bool, AbstractSet[str]] = False,
                **kwargs) -> SearchResult:
-        query = self._validate_query(query)
-        if fields:
-            fields = self._validate_fields(fields)
+        """
+        Searches the class and decodes the returned rows into Records.
+
+        If expand_lookups is set, the values of Lookup fields are expanded to their LongValue
+        using the cached lookup metadata of the resource. This allows searching with the smaller
+        format_='COMPACT' while still returning decoded values.
+
+        If a hash_store is given, records whose content hash is unchanged since they were last
+        seen are dropped before decoding. The hashes of the returned records are not saved to the
+        store by the search: the result is a HashedSearchResult whose pending_hashes map the key
+        of each returned record to its new hash, which are saved with hash_store.commit(result)
+        once the records were stored, so that records whose processing failed are returned again
+        by the next search. The count of the result is still the count reported by the server.
 
+        If a projection is given and no fields are, only the fields that the projection's job
+        read in its previous runs are selected, and the fields read from the returned Records
+        are recorded for the next runs.
+
+        The numeric policy selects how Decimal fields are decoded, and intern whether repeated
+        lookup values share a single object, see RecordDecoder.
+        """
+        query, fields = self._validate_search(query, fields, hash_store, projection)
         result = self._http.search(
             resource=self.resource.name,
             class_=self.name,
             query=query,
             select=fields,
+            hash_records=hash_store is not None,
             **kwargs,
         )
+        decoder = self.decoder(include_tz, expand_lookups, numeric, intern) if parse else None
+        return self._to_records(result, decoder, hash_store, projection)
+
+    def search_split(self,
+                     query: Mapping[str, Any],
+                     fields: Sequence[str] = None,
+                     max_length: int = DEFAULT_MAX_QUERY_LENGTH,
+                     threads: int = 1,
+                     parse: bool = True,
+                     include_tz: bool = False,
+                     expand_lookups: bool = False,
+                     **kwargs) -> SearchResult:
+        """
+        Like search, but splits a query whose longest list of values would make the request too
+        long into several searches of at most max_length url-encoded characters, see
+        QueryBuilder.split. The searches are run in sequence, or on up to threads threads, and
+        their records are returned together in the order of the split queries.
+        """
+        queries = self.query_builder.split(query, max_length)
+
+        def search(split_query: str) -> SearchResult:
+            return self.search(split_query, fields, parse, include_tz, expand_lookups=expand_lookups, **kwargs)
 
-        if parse:
-            decoder = RecordDecoder(self.table, include_tz)
-            rows = decoder.decode(result.data)
+        if threads > 1 and len(queries) > 1:
+            with ThreadPoolExecutor(min(threads, len(queries))) as executor:
+                results = tuple(executor.map(search, queries))
         else:
-            rows = result.data
+            results = tuple(search(split_query) for split_query in queries)
 
+        counts = tuple(result.count for result in results)
         return SearchResult(
-            count=result.count,
-            max_rows=result.max_rows,
-            data=tuple(Record(self, row) for row in rows) if rows else tuple(),
+            count=None if None in counts else sum(counts),
+            max_rows=any(result.max_rows for result in results),
+            data=tuple(record for result in results for record in result.data),
+        )
+
+    def count(self,
+              query: Union[str, Mapping[str, Any]],
+              watermark: Any = None,
+              ttl: float = 60,
+              **kwargs) -> int:
+        """
+        Returns the number of records matching the query, without fetching any of them. Counts
+        are cached for ttl seconds per query and watermark, so that planners and dashboards can
+        ask repeatedly. The watermark is any value that should invalidate the cached count when
+        it changes, e.g. the latest modification timestamp seen by the caller.
+        """
+        query = self._validate_query(query)
+        key = (query, _hashable(watermark), _hashable(kwargs))
+        now = time.monotonic()
+
+        cached = self._counts.get(key)
+        if cached is not None and now - cached[1] < ttl and now < cached[2]:
+            return cached[0]
+
+        count = self._http.count(resource=self.resource.name, class_=self.name, query=query, **kwargs)
+        # Drop expired counts so that the cache does not grow with every watermark
+        self._counts = {k: v for k, v in self._counts.items() if now < v[2]}
+        self._counts[key] = (count, now, now + ttl)
+        return count
+
+    def search_pages(self,
+                     query: Union[str, Mapping[str, Any]],
+                     fields: Sequence[str] = None,
+                     page_size: Union[int, PageSizer] = None,
+                     parse: bool = True,
+                     include_tz: bool = False,
+                     hash_store: HashStore = None,
+                     expand_lookups: bool = False,
+                     projection: AdaptiveProjection = None,
+                     numeric: Union[str, Mapping[str, str]] = 'decimal',
+                     intern: Union[bool, AbstractSet[str]] = False,
+                     **kwargs) -> Iterator[SearchResult]:
+        """
+        Like search, but follows the offset until all matching records have been returned and
+        yields one SearchResult per response, so that only a single page is held in memory.
+        All pages are decoded by the same decoder, so interned values are shared across pages.
+
+        The page_size is the Limit of every page, or a PageSizer that tunes it per class from the
+        duration and MAXROWS flag of the pages.
+        """
+        query, fields = self._validate_search(query, fields, hash_store, projection)
+        decoder = self.decoder(include_tz, expand_lookups, numeric, intern) if parse else None
+        pages = self._paginate(query, fields, page_size, hash_records=hash_store is not None, **kwargs)
+        for result in pages:
+            yield self._to_records(result, decoder, hash_store, projection)
+
+    def search_raw_pages(self,
+                         query: Union[str, Mapping[str, Any]],
+                         fields: Sequence[str] = None,
+                         page_size: Union[int, PageSizer] = None,
+                         **kwargs) -> Iterator[SearchResult]:
+        """
+        Yields the pages of a search as returned by the HTTP client, with the undecoded rows
+        as dicts of field to str. Use decoder() to decode them in bulk.
+        """
+        query, fields = self._validate_search(query, fields)
+        return self._paginate(query, fields, page_size, **kwargs)
+
+    def search_raw_batches(self,
+                           query: Union[str, Mapping[str, Any]],
+                           fields: Sequence[str] = None,
+                           batch_size: int = 1000,
+                           **kwargs) -> Iterator[SearchBatch]:
+        """
+        Streams the response of a single Search transaction and yields its undecoded DATA lines
+        in batches of batch_size, see iter_search_batches.
+        """
+        query, fields = self._validate_search(query, fields)
+        response = self._http.search_stream(
+            resource=self.resource.name,
+            class_=self.name,
+            query=query,
+            select=fields,
+            **kwargs,
         )
+        return parsers.iter_search_batches(response, batch_size, encoding=self._http.response_encoding)
 
-    def _validate_query(self, query: Union[str, Mapping[str, str]]) -> str:
+    def search_raw_batch_pages(self,
+                               query: Union[str, Mapping[str, Any]],
+                               fields: Sequence[str] = None,
+                               page_size: int = None,
+                               batch_size: int = 1000,
+                               **kwargs) -> Iterator[SearchBatch]:
+        """
+        Pages through the matching records like search_raw_pages, but streams the response of
+        every page and yields its undecoded DATA lines in batches, like search_raw_batches, so
+        that no row is parsed into a dict.
+        """
+        query, fields = self._validate_search(query, fields)
+        offset = 1
+        while True:
+            response = self._http.search_stream(
+                resource=self.resource.name,
+                class_=self.name,
+                query=query,
+                select=fields,
+                limit=page_size,
+                offset=offset,
+                **kwargs,
+            )
+            batches = parsers.iter_search_batches(response, batch_size, encoding=self._http.response_encoding)
+            returned = 0
+            while True:
+                try:
+                    batch = next(batches)
+                except StopIteration as stop:
+                    max_rows = stop.value
+                    break
+                returned += len(batch.lines)
+                yield batch
+
+            # The server sets MAXROWS when it truncated the response below the requested limit.
+            if not returned or not (max_rows or (page_size and returned >= page_size)):
+                return
+            offset += returned
+
+    def search_parallel(self,
+                        query: Union[str, Mapping[str, Any]],
+                        fields: Sequence[str] = None,
+                        processes: int = None,
+                        batch_size: int = 1000,
+                        ordered: bool = True,
+                        include_tz: bool = False,
+                        expand_lookups: bool = False,
+                        **kwargs) -> Iterator[Record]:
+        """
+        Streams the response of a single Search transaction and decodes its rows in a pool of
+        worker processes while the response is still being downloaded. The Records are yielded
+        in the order of the response, or as soon as their batch is decoded if ordered is unset.
+        """
+        batches = self.search_raw_batches(query, fields, batch_size, **kwargs)
+        lookups = self.resource.lookups if expand_lookups else None
+        for rows in decode_parallel(batches, self.table, include_tz, lookups, processes, ordered):
+            for row in rows:
+                yield Record(self, row)
+
+    def search_dataframe(self,
+                         query: Union[str, Mapping[str, Any]],
+                         fields: Sequence[str] = None,
+                         include_tz: bool = False,
+                         expand_lookups: bool = False,
+                         batch_size: int = 100000,
+                         **kwargs) -> 'pandas.DataFrame':
+        """
+        Searches the class into a pandas DataFrame, see rets.client.dataframe. This requires the
+        optional pandas dependency.
+        """
+        from rets.client.dataframe import search_dataframe
+        return search_dataframe(self, query, fields, include_tz, expand_lookups, batch_size, **kwargs)
+
+    def search_standard_xml(self,
+                            query: Union[str, Mapping[str, Any]],
+                            record_tag: str,
+                            mapping: Mapping[str, str] = None,
+                            fields: Sequence[str] = None,
+                            batch_size: int = 1000,
+                            include_tz: bool = False,
+                            **kwargs) -> Iterator[Record]:
+        """
+        Searches in the STANDARD-XML format, for fields that some servers only provide in it, and
+        streams the records as they are parsed. Each record_tag elem, e.g. 'Listing', is
+        flattened into a row by iter_standard_xml and decoded in batches of batch_size rows.
+
+        The mapping maps leaf paths or tags to the SystemNames of the table. By default, or if
+        it is empty, the leaf tags are matched against the StandardNames and SystemNames of the
+        table. Without a table, every leaf is kept under its path, and the rows of a batch are
+        given the same fields before they are decoded.
+        """
+        query, fields = self._validate_search(query, fields)
+        if not mapping:
+            mapping = self._standard_xml_mapping()
+
+        response = self._http.search_stream(
+            resource=self.resource.name,
+            class_=self.name,
+            query=query,
+            select=fields,
+            format_='STANDARD-XML',
+            **kwargs,
+        )
+        rows = parsers.iter_standard_xml(response, record_tag, mapping, encoding=self._http.response_encoding)
+        decoder = self.decoder(include_tz)
+        while True:
+            batch = tuple(islice(rows, batch_size))
+            if not batch:
+                return
+            if not mapping:
+                # Unmapped rows only have the leaves of their record, but the decoder expects
+                # every row to have the fields of the first one
+                batch_fields = tuple(OrderedDict.fromkeys(field for row in batch for field in row))
+                batch = tuple(OrderedDict((field, row.get(field, '')) for field in batch_fields) for row in batch)
+            for row in decoder.decode(batch):
+                yield Record(self, row)
+
+    def decoder(self,
+                include_tz: bool = False,
+                expand_lookups: bool = False,
+                numeric: Union[str, Mapping[str, str]] = 'decimal',
+                intern: Union[bool, AbstractSet[str]] = False) -> RecordDecoder:
+        lookups = self.resource.lookups if expand_lookups else None
+        return RecordDecoder(self.table, include_tz, lookups, numeric, intern)
+
+    def _standard_xml_mapping(self) -> Mapping[str, str]:
+        mapping = {}
+        for field in self.table:
+            mapping[field['SystemName']] = field['SystemName']
+            if field.get('StandardName'):
+                mapping.setdefault(field['StandardName'], field['SystemName'])
+        return mapping
+
+    def _paginate(self, query: str, select: str, page_size: Union[int, PageSizer], count: int = 1, offset: int = 1,
+                  **kwargs) -> Iterator[SearchResult]:
+        sizer = page_size if isinstance(page_size, PageSizer) else None
+        while True:
+            limit = sizer.size(self) if sizer else page_size
+            start = time.monotonic()
+            result = self._http.search(
+                resource=self.resource.name,
+                class_=self.name,
+                query=query,
+                select=select,
+                count=count,
+                limit=limit,
+                offset=offset,
+                **kwargs,
+            )
+            returned = len(result.data or ())
+            if sizer:
+                sizer.record(self, limit, returned, result.max_rows, time.monotonic() - start)
+            yield result
+
+            # The server sets MAXROWS when it truncated the response below the requested limit.
+            if not returned or not (result.max_rows or (limit and returned >= limit)):
+                return
+            offset += returned
+            # Only the first page needs to carry the count of matching records.
+            count = 0
+
+    def _to_records(self,
+                    result: SearchResult,
+                    decoder: Optional[RecordDecoder],
+                    hash_store: Optional[HashStore],
+                    projection: AdaptiveProjection = None) -> SearchResult:
+        rows = result.data
+        pending = None
+        if hash_store is not None:
+            row_hashes = getattr(result, 'row_hashes', ())
+            rows, pending = self._filter_unchanged(rows or (), row_hashes, hash_store)
+
+        if decoder is not None:
+            # The decoder builds the rows of a projection directly, rather than copying them
+            rows = decoder.decode(rows, projection.row_type(self)) if projection is not None else decoder.decode(rows)
+        elif projection is not None and rows:
+            rows = tuple(projection.track(self, row) for row in rows)
+
+        data = tuple(Record(self, row) for row in rows) if rows else tuple()
+        if pending is None:
+            return SearchResult(count=result.count, max_rows=result.max_rows, data=data)
+        return HashedSearchResult(count=result.count, max_rows=result.max_rows, data=data, pending_hashes=pending)
+
+    def _validate_search(self,
+                         query: Union[str, Mapping[str, Any]],
+                         fields: Optional[Sequence[str]],
+                         hash_store: HashStore = None,
+                         projection: AdaptiveProjection = None) -> Tuple[str, Optional[str]]:
+        query = self._validate_query(query)
+        if not fields and projection is not None:
+            fields = projection.select(self)
+        if fields:
+            if hash_store is not None and self.resource.key_field not in fields:
+                raise RetsClientError('fields must include the key field %s' % self.resource.key_field)
+            fields = self._validate_fields(fields)
+        return query, fields
+
+    def _filter_unchanged(self,
+                          rows: Sequence[dict],
+                          hashes: Sequence[str],
+                          hash_store: HashStore) -> Tuple[Sequence[dict], Mapping[str, str]]:
+        key_field = self.resource.key_field
+        keyed_rows = tuple((row[key_field], row, hash_) for row, hash_ in zip(rows, hashes))
+        known = hash_store.get_many(key for key, _, _ in keyed_rows)
+
+        changed = tuple((key, row, hash_) for key, row, hash_ in keyed_rows if known.get(key) != hash_)
+        # The hashes are only saved once the caller commits the result
+        return tuple(row for _, row, _ in changed), {key: hash_ for key, _, hash_ in changed}
+
+    def _validate_query(self, query: Union[str, Mapping[str, Any]]) -> str:
         if isinstance(query, str):
             return query
-        self._assert_fields(query)
-        return ','.join('(%s=%s)' % (field, value) for field, value in query.items())
+        return self.query_builder.compile(query)
 
     def _validate_fields(self, fields: Sequence[str]) -> str:
         self._assert_fields(fields)
@@ -91,3 +465,14 @@ class ResourceClass:
 
     def __repr__(self) -> str:
         return '<Class: %s:%s>' % (self.resource.name, self.name)
+
+
+def _hashable(value: Any) -> Any:
+    """ Converts a count argument, e.g. a list of values, into a form that can key the count cache. """
+    if isinstance(value, Mapping):
+        return tuple(sorted((key, _hashable(v)) for key, v in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    elif isinstance(value, (set, frozenset)):
+        return frozenset(_hashable(v) for v in value)
+    return value
@@ -0,0 +1,123 @@
+import json
+import os
+import time
+import weakref
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from rets.client.client import RetsClient
+from rets.client.utils import dump_json_atomic
+from rets.errors import RetsClientError
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, see SessionBroker
+    fcntl = None
+
+if TYPE_CHECKING:
+    from rets.http.client import RetsHttpClient
+
+
+class SessionBroker:
+    """
+    Shares a single logged in RETS session between the worker processes of a host, for servers
+    that limit the number of concurrent logins. The capability urls, cookies and RETS session id
+    of the session are kept in a JSON file, and workers build their clients from it without a
+    Login transaction. Logins and refreshes are serialized with an exclusive lock on a lock file
+    next to it, so that only one worker logs in when the session is missing or expired.
+
+    The session is considered expired after max_age seconds, or once a worker calls refresh
+    after the server rejected it. Servers that keep no cookies for the session are resumed from
+    the capability urls alone.
+
+    The lock relies on POSIX file locks, so the broker is not available on Windows.
+    """
+
+    def __init__(self, path: str, max_age: float = 3600):
+        if fcntl is None:
+            raise RetsClientError('SessionBroker requires POSIX file locks, which are not available on this platform')
+        self._path = path
+        self._lock_path = path + '.lock'
+        self._max_age = max_age
+        # Maps each client to the creation time of the shared session it is on, which tells
+        # whether another worker replaced the session since
+        self._created = weakref.WeakKeyDictionary()
+
+    def client(self, *args, **kwargs) -> RetsClient:
+        """
+        Returns a RetsClient on the shared session, logging in first if there is no valid
+        session. The arguments are those of RetsClient, except for capability_urls and
+        cookie_dict, which are taken from the shared session.
+        """
+        with self._locked():
+            session = self._load()
+            if session is None:
+                client = RetsClient(*args, **kwargs)
+                self._created[client] = self._save(client.http)
+                return client
+
+        client = RetsClient(
+            *args,
+            capability_urls=session['capability_urls'],
+            cookie_dict=session['cookie_dict'],
+            **kwargs,
+        )
+        self._created[client] = session['created']
+        return client
+
+    def refresh(self, client: RetsClient) -> None:
+        """
+        Replaces the expired session of the client. If another worker already replaced the
+        shared session, the client resumes that one, otherwise it logs in to a new session and
+        shares it.
+        """
+        http = client.http
+        with self._locked():
+            session = self._load()
+            if session is not None and session['created'] != self._created.get(client):
+                http.restore_session(session['capability_urls'], session['cookie_dict'])
+                self._created[client] = session['created']
+                return
+
+            http.restore_session(http.capability_urls, {})
+            http.login()
+            self._created[client] = self._save(http)
+
+    def invalidate(self) -> None:
+        """ Forgets the shared session, so that the next client logs in. """
+        with self._locked():
+            if os.path.exists(self._path):
+                os.remove(self._path)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with open(self._lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self) -> Optional[dict]:
+        try:
+            with open(self._path) as f:
+                session = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if time.time() - session['created'] > self._max_age:
+            return None
+        return session
+
+    def _save(self, http: 'RetsHttpClient') -> float:
+        """ Shares the session of the client and returns its creation time. """
+        session = {
+            'capability_urls': http.capability_urls,
+            'cookie_dict': http.cookie_dict,
+            'rets_session_id': http.rets_session_id,
+            'created': time.time(),
+        }
+        # The cookies grant access to the session, so the file is only readable by its owner
+        dump_json_atomic(session, self._path, mode=0o600)
+        return session['created']
@@ -0,0 +1,263 @@
+"""
+Pipelines the search of a class with the GetObject transactions for the records of each page,
+so that the objects of one page are downloaded while the next page is being searched, and
+syncs listing photos incrementally on top of it.
+"""
+import json
+import queue
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Iterator, Mapping, Optional, Sequence, Tuple, Union
+
+from rets.client.record import Record
+from rets.client.tuning import BatchSizer, PageSizer
+from rets.client.utils import dump_json_atomic
+from rets.errors import RetsClientError
+from rets.http.data import Object, SearchResult
+
+ObjectPage = namedtuple('ObjectPage', (
+    'result',
+    'objects',
+))
+ObjectPage.__doc__ = """
+A page of search results and the objects fetched for its records, as a mapping of each record
+key to the sequence of its objects.
+"""
+
+# How long a blocked producer waits before checking whether the consumer went away.
+_PUT_TIMEOUT = 0.1
+
+
+def search_with_objects(resource_class,
+                        object_type,
+                        query: Union[str, Mapping[str, Any]],
+                        fields: Sequence[str] = None,
+                        page_size: Union[int, PageSizer] = None,
+                        batch_size: Union[int, BatchSizer] = 20,
+                        threads: int = 4,
+                        max_pending_pages: int = 1,
+                        object_ids: Callable[[Record], Any] = None,
+                        object_kwargs: Mapping[str, Any] = None,
+                        **kwargs) -> Iterator[ObjectPage]:
+    """
+    Searches the resource class page by page, like search_pages, and yields every page with the
+    objects of the given object type for its records. The objects of a page are fetched with
+    GetObject transactions of batch_size record keys each, on up to threads threads.
+
+    The pages are searched on a background thread that runs up to max_pending_pages ahead of the
+    objects, so that the object downloads of a page overlap with the search for the next one.
+    The producer blocks once that many pages are waiting, which bounds the memory use when the
+    objects or the caller fall behind the search.
+
+    :param batch_size: The number of record keys per GetObject transaction, or a BatchSizer that
+        tunes it from the observed latency and throughput. A BatchSizer sets the batch size of
+        every page from the requests of the pages before it.
+    :param object_ids: An optional function of a Record to the object ids to fetch for it, in
+        any form accepted by the mapping form of ObjectType.get, e.g. '*' or [1, 3]. Records for
+        which it returns None are skipped. By default all objects of every record are fetched.
+    :param object_kwargs: Keyword arguments of ObjectType.get, e.g. media_types or location.
+    """
+    key_field = resource_class.resource.key_field
+    if fields and key_field not in fields:
+        raise RetsClientError('fields must include the key field %s' % key_field)
+
+    pages = queue.Queue(max_pending_pages)
+    stopped = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                pages.put(item, timeout=_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for page in resource_class.search_pages(query, fields, page_size, **kwargs):
+                if not put(page):
+                    return
+            put(None)
+        except BaseException as e:
+            put(e)
+
+    producer = threading.Thread(target=produce, name='rets-search-pages', daemon=True)
+    producer.start()
+    try:
+        with ThreadPoolExecutor(threads) as executor:
+            while True:
+                page = pages.get()
+                if page is None:
+                    return
+                elif isinstance(page, BaseException):
+                    raise page
+                objects = _fetch_objects(executor, object_type, page, key_field, batch_size,
+                                         object_ids, object_kwargs or {})
+                yield ObjectPage(page, objects)
+    finally:
+        # Unblocks the producer if the caller stopped early or the objects failed
+        stopped.set()
+        producer.join()
+
+
+def _fetch_objects(executor: Executor,
+                   object_type,
+                   page: SearchResult,
+                   key_field: str,
+                   batch_size: Union[int, BatchSizer],
+                   object_ids: Callable[[Record], Any],
+                   object_kwargs: Mapping[str, Any]) -> Mapping[str, Sequence[Object]]:
+    requested = OrderedDict()
+    for record in page.data:
+        ids = object_ids(record) if object_ids else '*'
+        if ids is not None:
+            requested[str(record.data[key_field])] = ids
+
+    if isinstance(batch_size, BatchSizer):
+        get = partial(batch_size.get, object_type)
+        batch_size = batch_size.size
+    else:
+        get = object_type.get
+
+    keys = tuple(requested)
+    futures = [
+        executor.submit(get, OrderedDict((key, requested[key]) for key in keys[i:i + batch_size]), **object_kwargs)
+        for i in range(0, len(keys), batch_size)
+    ]
+
+    objects = OrderedDict((key, []) for key in keys)
+    for future in futures:
+        for object_ in future.result():
+            objects.setdefault(object_.content_id, []).append(object_)
+    return objects
+
+
+class PhotoManifest:
+    """
+    Records, per listing key, the photo timestamp and count of the listing when its photos were
+    last downloaded, and the ids and descriptions of the downloaded objects. If a path is
+    given, the manifest is loaded from and saved to a JSON file there.
+    """
+
+    def __init__(self, path: str = None):
+        self._path = path
+        self._entries = {}
+        if path is not None:
+            try:
+                with open(path) as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                pass
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._entries.get(key)
+
+    def set(self, key: str, timestamp: Optional[str], count: Optional[int], objects: Mapping[str, str]) -> None:
+        self._entries[key] = {'timestamp': timestamp, 'count': count, 'objects': dict(objects)}
+
+    def save(self) -> None:
+        if self._path is not None:
+            dump_json_atomic(self._entries, self._path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PhotoSync:
+    """
+    Downloads only the photos of listings that changed since the last sync, by comparing the
+    photo count and modification timestamp fields of each listing with its PhotoManifest entry:
+
+    - Listings without an entry, or whose timestamp changed, have all their photos requested.
+    - Listings whose timestamp is unchanged but that have fewer downloaded photos than their
+      count, e.g. because the count grew or a download failed, only have the missing object ids
+      requested, through the mapping form of the GetObject ids.
+    - Listings whose timestamp is unchanged and whose photos were all downloaded, or that have
+      no photos, are skipped.
+
+    Servers name these fields differently, so their SystemNames are configurable.
+    """
+
+    def __init__(self,
+                 resource_class,
+                 object_type,
+                 manifest: PhotoManifest,
+                 count_field: str = 'PhotoCount',
+                 timestamp_field: str = 'PhotoModificationTimestamp'):
+        self.resource_class = resource_class
+        self.object_type = object_type
+        self.manifest = manifest
+        self.count_field = count_field
+        self.timestamp_field = timestamp_field
+
+    def sync(self,
+             query: Union[str, Mapping[str, Any]],
+             fields: Sequence[str] = None,
+             **kwargs) -> Iterator[ObjectPage]:
+        """
+        Searches the listings and yields every page with the objects downloaded for it, see
+        search_with_objects. The manifest is updated and saved for each page once the caller
+        resumes the iteration after it, so that an interrupted sync resumes where it stopped
+        and the photos of a page whose processing failed are downloaded again.
+        """
+        if fields:
+            required = (self.resource_class.resource.key_field, self.count_field, self.timestamp_field)
+            fields = tuple(fields) + tuple(f for f in required if f not in fields)
+
+        key_field = self.resource_class.resource.key_field
+        pages = search_with_objects(self.resource_class, self.object_type, query, fields,
+                                    object_ids=self.object_ids, **kwargs)
+        for page in pages:
+            yield page
+            # The photos of a page only count as downloaded once the caller asked for the next
+            # page, i.e. after it stored them, so that a failing caller gets them again
+            for record in page.result.data:
+                key = str(record.data[key_field])
+                self._update_manifest(record, key, page.objects.get(key))
+            self.manifest.save()
+
+    def object_ids(self, record: Record) -> Any:
+        """ Returns the object ids to request for the listing, or None if it is unchanged. """
+        key = str(record.data[self.resource_class.resource.key_field])
+        count, timestamp = self._photo_fields(record)
+        if count == 0:
+            return None
+
+        entry = self.manifest.get(key)
+        if entry is None or entry['timestamp'] != timestamp or count is None or entry['count'] is None:
+            # The photos may have been replaced under the same object ids
+            self.object_type.invalidate([key])
+            return '*'
+        elif len(entry['objects']) >= count:
+            return None
+        elif not entry['objects']:
+            # Nothing was downloaded, e.g. after a failed or empty GetObject
+            return '*'
+        # Photos added since, or missing from an earlier download
+        return [i for i in range(1, count + 1) if str(i) not in entry['objects']] or '*'
+
+    def _update_manifest(self, record: Record, key: str, objects: Optional[Sequence[Object]]) -> None:
+        count, timestamp = self._photo_fields(record)
+        entry = self.manifest.get(key)
+        downloaded = {} if entry is None else dict(entry['objects'])
+        if objects is not None and entry is not None and entry['timestamp'] != timestamp:
+            # All photos were requested again, so the previous ones are outdated
+            downloaded = {}
+        for object_ in objects or ():
+            downloaded[str(object_.object_id)] = object_.description
+        if count is not None:
+            # Photos beyond the count were removed from the listing
+            downloaded = {object_id: d for object_id, d in downloaded.items()
+                          if not object_id.isdigit() or int(object_id) <= count}
+        self.manifest.set(key, timestamp, count, downloaded)
+
+    def _photo_fields(self, record: Record) -> Tuple[Optional[int], Optional[str]]:
+        count = record.data.get(self.count_field)
+        timestamp = record.data.get(self.timestamp_field)
+        return (
+            None if count is None else int(count),
+            None if timestamp is None else str(timestamp),
+        )
@@ -0,0 +1,278 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Mapping, Optional, Sequence
+
+from rets.client.utils import dump_json_atomic
+from rets.http.data import Object
+
+
+class TuningStore:
+    """
+    Stores the parameters learned by the adaptive sizers, keyed by server and, where it applies,
+    by resource and class, so that a run starts from the optimum found by the previous ones.
+    Subclasses can back this with any key-value store.
+    """
+
+    def get(self, key: str) -> Mapping[str, Any]:
+        """ Returns the parameters stored for the key, or an empty mapping if none were stored. """
+        raise NotImplementedError
+
+    def update(self, key: str, values: Mapping[str, Any]) -> None:
+        """ Updates the parameters stored for the key with the given values. """
+        raise NotImplementedError
+
+
+class MemoryTuningStore(TuningStore):
+
+    def __init__(self, values: Mapping[str, Mapping[str, Any]] = None):
+        self._values = {key: dict(value) for key, value in (values or {}).items()}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Mapping[str, Any]:
+        return dict(self._values.get(key, {}))
+
+    def update(self, key: str, values: Mapping[str, Any]) -> None:
+        with self._lock:
+            self._values.setdefault(key, {}).update(values)
+
+
+class JsonTuningStore(MemoryTuningStore):
+    """ Persists the learned parameters in a JSON file so that they carry over between runs. """
+
+    def __init__(self, path: str):
+        self._path = path
+        try:
+            with open(path) as f:
+                values = json.load(f)
+        except FileNotFoundError:
+            values = None
+        super().__init__(values)
+
+    def update(self, key: str, values: Mapping[str, Any]) -> None:
+        super().update(key, values)
+        with self._lock:
+            dump_json_atomic(self._values, self._path)
+
+
+class BatchSizer:
+    """
+    Tunes the number of resource keys per GetObject request with an AIMD policy, from the
+    observed latency, throughput and errors of the requests:
+
+    - A full batch that succeeds within target_seconds, at a throughput in bytes per second of
+      at least 90% of the average so far, grows the batch size by increase keys, unless the
+      recent error rate exceeds max_error_rate.
+    - A batch that fails with a transient error, i.e. a timeout, a connection error, a 5xx or
+      an entity or URI too long status, or that takes longer than target_seconds, shrinks the
+      batch size by the decrease factor. Its keys are fetched again in halves, which count as
+      a single decrease. Other errors, e.g. an expired session, are raised right away.
+
+    If a store is given, the batch size starts from the optimum stored for the server, e.g. its
+    login URL, and is stored again on save() or when leaving the sizer's context:
+
+        with BatchSizer(JsonTuningStore('tuning.json'), login_url) as sizer:
+            for page in search_with_objects(resource_class, object_type, query, batch_size=sizer):
+                ...
+    """
+
+    def __init__(self,
+                 store: TuningStore = None,
+                 server: str = '',
+                 initial: int = 20,
+                 minimum: int = 1,
+                 maximum: int = 500,
+                 target_seconds: float = 20.0,
+                 increase: int = 2,
+                 decrease: float = 0.5,
+                 max_error_rate: float = 0.1):
+        self.store = store
+        self.server = server
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+        self.increase = increase
+        self.decrease = decrease
+        self.max_error_rate = max_error_rate
+        stored = store.get(server) if store is not None else {}
+        self._size = float(min(max(stored.get('object_batch_size', initial), minimum), maximum))
+        # An exponential moving average of the throughput of the successful batches, in bytes/s
+        self._throughput = None
+        # An exponential moving average of the share of batches that failed with a transient error
+        self._error_rate = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """ The number of resource keys for the next GetObject request. """
+        return int(self._size)
+
+    @property
+    def error_rate(self) -> float:
+        return self._error_rate
+
+    def record(self, keys: int, num_bytes: int, seconds: float, error: bool = False) -> None:
+        """ Records the outcome of a GetObject request for the given number of keys. """
+        with self._lock:
+            self._error_rate = 0.8 * self._error_rate + 0.2 * error
+            if error or seconds > self.target_seconds:
+                self._size = max(self.minimum, self._size * self.decrease)
+                return
+
+            throughput = num_bytes / seconds if seconds > 0 else None
+            if throughput is None:
+                return
+            saturated = self._throughput is not None and throughput < 0.9 * self._throughput
+            self._throughput = throughput if self._throughput is None else 0.8 * self._throughput + 0.2 * throughput
+            # Batches smaller than the current size, e.g. the last one of a page, say nothing about larger ones
+            if keys >= self.size and not saturated and self._error_rate <= self.max_error_rate:
+                self._size = min(self.maximum, self._size + self.increase)
+
+    def get(self, object_type, resource_keys: Mapping[str, Any], **kwargs) -> Sequence[Object]:
+        """
+        Fetches the objects of the resource keys with object_type.get and records the outcome.
+        If the request fails with a transient error, the keys are fetched again in two halves,
+        down to single keys.
+        """
+        start = time.monotonic()
+        try:
+            objects = object_type.get(resource_keys, **kwargs)
+        except Exception as e:
+            if not _is_transient(e):
+                raise
+            self.record(len(resource_keys), 0, time.monotonic() - start, error=True)
+            return self._get_split(e, object_type, resource_keys, kwargs)
+
+        num_bytes = sum(len(object_.data) for object_ in objects if object_.data is not None)
+        self.record(len(resource_keys), num_bytes, time.monotonic() - start)
+        return objects
+
+    def save(self) -> None:
+        if self.store is not None:
+            self.store.update(self.server, {'object_batch_size': self._size})
+
+    def _get_split(self,
+                   error: Exception,
+                   object_type,
+                   resource_keys: Mapping[str, Any],
+                   kwargs: Mapping[str, Any]) -> Sequence[Object]:
+        if len(resource_keys) <= 1:
+            raise error
+        keys = tuple(resource_keys)
+        middle = len(keys) // 2
+        objects = []
+        for half in (keys[:middle], keys[middle:]):
+            half_keys = OrderedDict((key, resource_keys[key]) for key in half)
+            try:
+                objects.extend(object_type.get(half_keys, **kwargs))
+            except Exception as e:
+                if not _is_transient(e):
+                    raise
+                objects.extend(self._get_split(e, object_type, half_keys, kwargs))
+        return tuple(objects)
+
+    def __enter__(self) -> 'BatchSizer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.save()
+
+
+def _is_transient(error: Exception) -> bool:
+    """ Whether a failed GetObject request may succeed with fewer keys or on a retry. """
+    # requests is only loaded once a request failed, see rets.lazy
+    import requests
+
+    if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status >= 500 or status in (413, 414)
+    return False
+
+
+class PageSizer:
+    """
+    Tunes the Limit of the pages of search_pages per class towards pages that take about
+    target_seconds, and learns the effective MAXROWS of each class from the responses:
+
+    - A response with the MAXROWS flag and fewer rows than the Limit reveals the server maximum
+      of the class, which then caps the page size.
+    - A full page scales the page size by target_seconds over its duration, by at most twice
+      or half of the current size per page. A partial page, e.g. the last one, only shrinks it.
+
+    The page size and server maximum of each class are stored per server, resource and class
+    on save() or when leaving the sizer's context:
+
+        with PageSizer(JsonTuningStore('tuning.json'), login_url) as sizer:
+            for page in resource_class.search_pages(query, page_size=sizer):
+                ...
+    """
+
+    def __init__(self,
+                 store: TuningStore = None,
+                 server: str = '',
+                 initial: int = 2500,
+                 minimum: int = 100,
+                 maximum: int = 50000,
+                 target_seconds: float = 10.0):
+        self.store = store
+        self.server = server
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+        # Maps each class key to a dict of its page size and learned server maximum
+        self._classes = {}
+        self._lock = threading.Lock()
+
+    def size(self, resource_class) -> int:
+        """ The Limit for the next page of the class. """
+        state = self._state(resource_class)
+        return int(min(state['page_size'], state['max_rows'] or self.maximum))
+
+    def max_rows(self, resource_class) -> Optional[int]:
+        """ The learned server maximum of rows per response for the class, if known. """
+        return self._state(resource_class)['max_rows']
+
+    def record(self, resource_class, limit: int, returned: int, max_rows: bool, seconds: float) -> None:
+        """ Records the outcome of a search page requested with the given limit. """
+        state = self._state(resource_class)
+        with self._lock:
+            if max_rows and 0 < returned < limit:
+                state['max_rows'] = returned
+
+            if seconds <= 0 or not returned:
+                return
+            factor = min(2.0, max(0.5, self.target_seconds / seconds))
+            if returned < limit and factor > 1:
+                # A partial page says nothing about larger ones
+                return
+            upper = min(self.maximum, state['max_rows'] or self.maximum)
+            state['page_size'] = min(upper, max(self.minimum, state['page_size'] * factor))
+
+    def save(self) -> None:
+        if self.store is None:
+            return
+        with self._lock:
+            classes = {key: dict(state) for key, state in self._classes.items()}
+        for key, state in classes.items():
+            self.store.update(key, state)
+
+    def _state(self, resource_class) -> dict:
+        key = '%s:%s:%s' % (self.server, resource_class.resource.name, resource_class.name)
+        with self._lock:
+            if key not in self._classes:
+                stored = self.store.get(key) if self.store is not None else {}
+                self._classes[key] = {
+                    'page_size': float(min(max(stored.get('page_size', self.initial), self.minimum), self.maximum)),
+                    'max_rows': stored.get('max_rows'),
+                }
+            return self._classes[key]
+
+    def __enter__(self) -> 'PageSizer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.save()
@@ -1,8 +1,27 @@
-from rets.http.client import RetsHttpClient
+import json
+import os
+import threading
+from typing import TYPE_CHECKING, Any
 
+if TYPE_CHECKING:
+    from rets.http.client import RetsHttpClient
 
-def get_metadata_data(http_client: RetsHttpClient, type_: str, **kwargs):
+
+def get_metadata_data(http_client: 'RetsHttpClient', type_: str, **kwargs):
     metadata_structs = http_client.get_metadata(type_, **kwargs)
     if metadata_structs:
         return metadata_structs[0].data
     return ()
+
+
+def dump_json_atomic(value: Any, path: str, mode: int = 0o666) -> None:
+    """
+    Writes the value as JSON to path through a temporary file, so that an interrupted write
+    never leaves a partial file and readers never see one. The temporary file is named after
+    the process and thread, so that concurrent writers do not collide, and is created with the
+    given permission mode.
+    """
+    tmp_path = '%s.%i.%i.tmp' % (path, os.getpid(), threading.get_ident())
+    with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode), 'w') as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,206 @@
+"""
+The rets-export command streams every record matching one or more queries of a resource class
+to a CSV or NDJSON file, optionally compressed.
+
+    rets-export --login-url http://my.rets.server/rets/login --username user \
+        --resource Property --class A --query '(LIST_87=2017-01-01+)' --output listings.csv.gz
+
+The password may be given through the RETS_PASSWORD environment variable. Passing several
+--query arguments exports each of them in turn, which allows sharding a class whose full
+result set is too large for the server to page through.
+"""
+import argparse
+import bz2
+import csv
+import gzip
+import io
+import json
+import logging
+import lzma
+import os
+import sys
+import time
+from typing import IO, Iterable, Iterator, Sequence, Tuple
+
+from rets.client import RetsClient
+from rets.http.data import SearchBatch
+from rets.http.parsers.parse import split_batch_columns, split_data_line
+
+logger = logging.getLogger('rets')
+
+FORMATS = ('csv', 'ndjson')
+
+_COMPRESSION_OPENERS = {
+    'gzip': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open,
+}
+
+_COMPRESSION_SUFFIXES = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+}
+
+
+def export(resource_class,
+           out: IO[str],
+           queries: Sequence[str],
+           fields: Sequence[str] = None,
+           output_format: str = 'csv',
+           page_size: int = None,
+           decode: bool = False,
+           **kwargs) -> int:
+    """
+    Writes all records matching the queries to the text file out and returns the number of rows
+    written. Each page is streamed, and rows are written straight from the split DATA lines of
+    its batches; if decode is set, the values are first decoded column by column into Python
+    types.
+    """
+    if output_format not in FORMATS:
+        raise ValueError('unknown format %s' % output_format)
+
+    decoder = resource_class.decoder() if decode else None
+    write_rows = None
+    rows_written = 0
+    started = time.monotonic()
+
+    for query in queries:
+        for batch in resource_class.search_raw_batch_pages(query, fields, page_size, **kwargs):
+            columns, rows = _batch_rows(batch, decoder)
+            if write_rows is None:
+                write_rows = _csv_writer(out, columns) if output_format == 'csv' else _ndjson_writer(out, columns)
+            write_rows(rows)
+
+            rows_written += len(batch.lines)
+            elapsed = time.monotonic() - started
+            logger.info('exported %i rows (%.0f rows/s)', rows_written, rows_written / elapsed if elapsed else 0)
+
+    return rows_written
+
+
+def _batch_rows(batch: SearchBatch, decoder) -> Tuple[Sequence[str], Iterable[Sequence]]:
+    if decoder is None:
+        return batch.columns, (split_data_line(line, batch.delimiter) for line in batch.lines)
+    return batch.columns, zip(*decoder.decode_column_values(split_batch_columns(batch)).values())
+
+
+def _csv_writer(out: IO[str], columns: Sequence[str]):
+    writer = csv.writer(out)
+    writer.writerow(columns)
+
+    def write_rows(rows: Iterable[Sequence]) -> None:
+        writer.writerows(_join_lists(row) for row in rows)
+
+    return write_rows
+
+
+def _join_lists(row: Sequence) -> Iterator:
+    # Decoded LookupMulti values are written to CSV the same way the server sends them.
+    return (','.join(value) if isinstance(value, (list, tuple)) else value for value in row)
+
+
+def _ndjson_writer(out: IO[str], columns: Sequence[str]):
+    # The keys are encoded once, so a line is built by joining encoded values without a dict per row.
+    encode = json.JSONEncoder(default=str, ensure_ascii=False).encode
+    keys = tuple(encode(column) + ':' for column in columns)
+
+    def write_rows(rows: Iterable[Sequence]) -> None:
+        out.writelines('{%s}\n' % ','.join(key + encode(value) for key, value in zip(keys, row))
+                       for row in rows)
+
+    return write_rows
+
+
+def open_output(path: str, compression: str = None) -> IO[str]:
+    """
+    Opens the output file for writing text, where '-' is stdout. The compression defaults to
+    the one implied by the file suffix.
+    """
+    if compression is None:
+        compression = _COMPRESSION_SUFFIXES.get(os.path.splitext(path)[1]) if path != '-' else None
+    elif compression == 'none':
+        compression = None
+
+    if compression is None:
+        if path == '-':
+            return _StdoutWrapper(sys.stdout.buffer, encoding='utf-8', newline='')
+        return open(path, 'w', encoding='utf-8', newline='')
+
+    try:
+        opener = _COMPRESSION_OPENERS[compression]
+    except KeyError:
+        raise ValueError('unknown compression %s' % compression) from None
+    return opener(sys.stdout.buffer if path == '-' else path, 'wt', encoding='utf-8', newline='')
+
+
+class _StdoutWrapper(io.TextIOWrapper):
+    """ Writes text to stdout, which is flushed but left open when the wrapper is closed. """
+
+    def close(self) -> None:
+        if self.buffer is not None:
+            self.detach()
+
+
+def _parse_args(argv: Sequence[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='rets-export', description='Export RETS search results to CSV or NDJSON.')
+    parser.add_argument('--login-url', required=True)
+    parser.add_argument('--username')
+    parser.add_argument('--password', default=os.environ.get('RETS_PASSWORD'))
+    parser.add_argument('--auth-type', default='digest', choices=('basic', 'digest'))
+    parser.add_argument('--user-agent', default='rets-python/0.3')
+    parser.add_argument('--user-agent-password', default=os.environ.get('RETS_USER_AGENT_PASSWORD', ''))
+    parser.add_argument('--rets-version', default='1.7.2')
+    parser.add_argument('--resource', required=True)
+    parser.add_argument('--class', dest='class_', required=True)
+    parser.add_argument('--query', dest='queries', action='append', required=True,
+                        help='DMQL2 query; repeat to export several shards in turn')
+    parser.add_argument('--select', help='comma separated list of fields to export')
+    parser.add_argument('--page-size', type=int, default=5000)
+    parser.add_argument('--search-format', default='COMPACT-DECODED', choices=('COMPACT', 'COMPACT-DECODED'))
+    parser.add_argument('--format', dest='output_format', default='csv', choices=FORMATS)
+    parser.add_argument('--output', default='-', help="output path, or '-' for stdout")
+    parser.add_argument('--compression', choices=('none',) + tuple(_COMPRESSION_OPENERS),
+                        help='defaults to the compression implied by the output suffix')
+    parser.add_argument('--decode', action='store_true', help='decode values using the table metadata')
+    parser.add_argument('--quiet', action='store_true', help='do not report progress')
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] = None) -> int:
+    args = _parse_args(argv)
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format='%(asctime)s %(message)s')
+
+    client = RetsClient(
+        login_url=args.login_url,
+        username=args.username,
+        password=args.password,
+        auth_type=args.auth_type,
+        user_agent=args.user_agent,
+        user_agent_password=args.user_agent_password,
+        rets_version=args.rets_version,
+    )
+    try:
+        resource_class = client.get_resource(args.resource).get_class(args.class_)
+        with open_output(args.output, args.compression) as out:
+            export(
+                resource_class,
+                out,
+                args.queries,
+                fields=args.select.split(',') if args.select else None,
+                output_format=args.output_format,
+                page_size=args.page_size,
+                decode=args.decode,
+                format_=args.search_format,
+            )
+    finally:
+        # A failed logout must not hide an error of the export
+        try:
+            client.http.logout()
+        except Exception:
+            logger.warning('logout failed', exc_info=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
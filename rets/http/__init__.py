@@ -1,10 +1,37 @@
-from rets.http.client import RetsHttpClient
-from rets.http.data import Metadata, Object, SearchResult, SystemMetadata
+from typing import TYPE_CHECKING
+
+from rets.lazy import lazy_import
+
+if TYPE_CHECKING:
+    from rets.http.client import RetsHttpClient
+    from rets.http.data import Metadata, Object, SearchBatch, SearchResult, SystemMetadata
+    from rets.http.object_cache import ObjectCache
+    from rets.http.transport import RecordingTransport, ReplayTransport, RequestsTransport, Transport
 
 __all__ = [
     'Metadata',
     'Object',
+    'ObjectCache',
+    'RecordingTransport',
+    'ReplayTransport',
+    'RequestsTransport',
     'RetsHttpClient',
+    'SearchBatch',
     'SearchResult',
     'SystemMetadata',
+    'Transport',
 ]
+
+__getattr__, __dir__ = lazy_import(globals(), {
+    'Metadata': 'rets.http.data',
+    'Object': 'rets.http.data',
+    'ObjectCache': 'rets.http.object_cache',
+    'RecordingTransport': 'rets.http.transport',
+    'ReplayTransport': 'rets.http.transport',
+    'RequestsTransport': 'rets.http.transport',
+    'RetsHttpClient': 'rets.http.client',
+    'SearchBatch': 'rets.http.data',
+    'SearchResult': 'rets.http.data',
+    'SystemMetadata': 'rets.http.data',
+    'Transport': 'rets.http.transport',
+})
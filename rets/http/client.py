@@ -1,21 +1,20 @@
+import threading
 from hashlib import md5
-from typing import Any, Mapping, Sequence, Union
+from typing import TYPE_CHECKING, Any, Mapping, Optional, Sequence, Union
 from urllib.parse import urljoin, urlsplit, urlunsplit, urlencode
 
 import requests
 from requests import Response
 from requests.auth import AuthBase, HTTPBasicAuth, HTTPDigestAuth
 
-from rets.http.parsers import (
-    parse_capability_urls,
-    parse_metadata,
-    parse_object,
-    parse_search,
-    parse_system,
-)
+from rets.http import parsers
 from rets.http.data import Object, Metadata, SearchResult, SystemMetadata
+from rets.http.transport import RequestsTransport, Transport
 from rets.errors import RetsApiError, RetsClientError
 
+if TYPE_CHECKING:
+    from rets.http.object_cache import ObjectCache
+
 
 class RetsHttpClient:
 
@@ -31,12 +30,21 @@ class RetsHttpClient:
                  cookie_dict: dict = None,
                  use_get_method: bool = False,
                  send_rets_ua_authorization: bool = True,
+                 response_encoding: str = None,
+                 transport: Transport = None,
+                 object_cache: 'ObjectCache' = None,
                  ):
         self._user_agent = user_agent
         self._user_agent_password = user_agent_password
         self._rets_version = rets_version
         self._use_get_method = use_get_method
         self._send_rets_ua_authorization = send_rets_ua_authorization
+        # Overrides the encoding declared by the server for all XML responses
+        self._response_encoding = response_encoding
+        # Sends the HTTP requests; can be replaced to record or replay the traffic
+        self._transport = transport or RequestsTransport()
+        # Serves repeated GetObject requests from local disk, if given
+        self._object_cache = object_cache
 
         splits = urlsplit(login_url)
         self._base_url = urlunsplit((splits.scheme, splits.netloc, '', '', ''))
@@ -62,7 +70,9 @@ class RetsHttpClient:
                 self._session.cookies.set(name, value=value)
 
         # this session id is part of the rets standard for use with a user agent password
-        self._rets_session_id = ''
+        self._rets_session_id = (cookie_dict or {}).get('RETS-Session-ID', '')
+        # The user agent digest only changes with the session id, so it is cached against it.
+        self._user_agent_auth_digest_cache = None
 
     @property
     def user_agent(self) -> str:
@@ -85,6 +95,18 @@ class RetsHttpClient:
         """
         return 'RETS/' + self._rets_version
 
+    @property
+    def response_encoding(self) -> Optional[str]:
+        """
+        The encoding used to parse XML responses regardless of the encoding declared by the
+        server, or None to use the declared encoding.
+        """
+        return self._response_encoding
+
+    @property
+    def object_cache(self) -> Optional['ObjectCache']:
+        return self._object_cache
+
     @property
     def capability_urls(self) -> dict:
         return self._capabilities
@@ -97,9 +119,27 @@ class RetsHttpClient:
             cookie_d[k] = v
         return cookie_d
 
+    @property
+    def rets_session_id(self) -> str:
+        return self._rets_session_id
+
+    def restore_session(self, capability_urls: dict, cookie_dict: dict) -> None:
+        """
+        Resumes a session that was logged in elsewhere, e.g. by another process, replacing the
+        current capability urls and cookies without a Login transaction. Restoring an empty
+        cookie_dict clears the cookies, so that the next login starts a new session.
+        """
+        if not self._session:
+            self._session = requests.Session()
+        self._session.cookies.clear()
+        for name, value in cookie_dict.items():
+            self._session.cookies.set(name, value=value)
+        self._capabilities = dict(capability_urls)
+        self._rets_session_id = cookie_dict.get('RETS-Session-ID', '')
+
     def login(self) -> dict:
         response = self._http_request(self._url_for('Login'))
-        self._capabilities = parse_capability_urls(response)
+        self._capabilities = parsers.parse_capability_urls(response, self._response_encoding)
         return self._capabilities
 
     def logout(self) -> None:
@@ -107,7 +147,7 @@ class RetsHttpClient:
         self._session = None
 
     def get_system_metadata(self) -> SystemMetadata:
-        return parse_system(self._get_metadata('system'))
+        return parsers.parse_system(self._get_metadata('system'), self._response_encoding)
 
     def get_metadata(self,
                      type_: str,
@@ -121,7 +161,7 @@ class RetsHttpClient:
             id_ = metadata_id
 
         try:
-            return parse_metadata(self._get_metadata(type_, id_))
+            return parsers.parse_metadata(self._get_metadata(type_, id_), self._response_encoding)
         except RetsApiError as e:
             if e.reply_code in (20502, 20503):  # No metadata exists.
                 return ()
@@ -159,6 +199,7 @@ class RetsHttpClient:
                standard_names: bool = False,
                query_type: str = 'DMQL2',
                format_: str = 'COMPACT-DECODED',
+               hash_records: bool = False,
                ) -> SearchResult:
         """
         The Search transaction requests that the server search one or more searchable databases
@@ -206,25 +247,45 @@ class RetsHttpClient:
             Lookup types. 'STANDARD-XML' means an XML presentation of the data in the format
             defined by the RETS Data XML DTD. Servers MUST support all formats. If the format is
             not specified, the server MUST return STANDARD-XML.
+
+        :param hash_records: If set, the result includes a stable content hash of each raw row,
+            which can be used to detect records that did not change since a previous search.
         """
-        raw_payload = {
-            'SearchType': resource,
-            'Class': class_,
-            'Query': query,
-            'QueryType': query_type,
-            'Select': select,
-            'Count': count,
-            'Limit': limit or 'NONE',
-            'Offset': offset,
-            'RestrictedIndicator': restricted_indicator,
-            'StandardNames': int(standard_names),
-            'Format': format_,
-        }
-        # None values indicate that the argument should be omitted from the request
-        payload = {k: v for k, v in raw_payload.items() if v is not None}
+        payload = _build_search_payload(
+            resource=resource,
+            class_=class_,
+            query=query,
+            select=select,
+            count=count,
+            limit=limit,
+            offset=offset,
+            restricted_indicator=restricted_indicator,
+            standard_names=standard_names,
+            query_type=query_type,
+            format_=format_,
+        )
+        response = self._http_request(self._url_for('Search'), payload=payload)
+        return parsers.parse_search(response, hash_records, self._response_encoding)
 
+    def count(self, resource: str, class_: str, query: str, **kwargs) -> int:
+        """
+        Sends a Search transaction with Count=2, for which the server only returns the number of
+        matching records and no data. The keyword arguments are those of search.
+        """
+        kwargs['count'] = 2
+        payload = _build_search_payload(resource, class_, query, **kwargs)
         response = self._http_request(self._url_for('Search'), payload=payload)
-        return parse_search(response)
+        return parsers.parse_count(response, self._response_encoding)
+
+    def search_stream(self, resource: str, class_: str, query: str, **kwargs) -> Response:
+        """
+        Sends a Search transaction like search, but returns the response with its body still
+        unread, so that it can be parsed incrementally while it is downloaded, e.g. with
+        iter_search_batches. The caller is responsible for closing the response. The keyword
+        arguments are those of search.
+        """
+        payload = _build_search_payload(resource, class_, query, **kwargs)
+        return self._http_request(self._url_for('Search'), payload=payload, stream=True)
 
     def get_object(self,
                    resource: str,
@@ -271,7 +332,25 @@ class RetsHttpClient:
             returned. If location is set to True, it is up to the server to support this
             functionality and the lifetime of the returned URL is not given by the RETS
             specification.
+
+        If the client has an ObjectCache, the objects are served from it where possible and only
+        the missing entities are requested. Requests for URL locations are never cached.
         """
+        if self._object_cache is not None and not location:
+            return self._object_cache.get_object(
+                resource,
+                object_type,
+                resource_keys,
+                lambda missing: self._get_object(resource, object_type, missing, media_types, location),
+            )
+        return self._get_object(resource, object_type, resource_keys, media_types, location)
+
+    def _get_object(self,
+                    resource: str,
+                    object_type: str,
+                    resource_keys: Union[str, Mapping[str, Any], Sequence[str]],
+                    media_types: Union[str, Sequence[str]],
+                    location: bool) -> Sequence[Object]:
         headers = {
             'Accept': _build_accepted_media_types(media_types),
         }
@@ -282,7 +361,7 @@ class RetsHttpClient:
             'Location': int(location),
         }
         response = self._http_request(self._url_for('GetObject'), headers=headers, payload=payload)
-        return parse_object(response)
+        return parsers.parse_object(response, self._response_encoding)
 
     def _url_for(self, transaction: str) -> str:
         try:
@@ -291,7 +370,7 @@ class RetsHttpClient:
             raise RetsClientError('No URL found for transaction %s' % transaction)
         return urljoin(self._base_url, url)
 
-    def _http_request(self, url: str, headers: dict = None, payload: dict = None) -> Response:
+    def _http_request(self, url: str, headers: dict = None, payload: dict = None, stream: bool = False) -> Response:
         if not self._session:
             raise RetsClientError('Session not instantiated. Call .login() first')
 
@@ -306,9 +385,11 @@ class RetsHttpClient:
         if self._use_get_method:
             if payload:
                 url = '%s?%s' % (url, urlencode(payload))
-            response = self._session.get(url, auth=self._http_auth, headers=request_headers)
+            response = self._transport.send(self._session, 'GET', url, request_headers,
+                                            auth=self._http_auth, stream=stream)
         else:
-            response = self._session.post(url, auth=self._http_auth, headers=request_headers, data=payload)
+            response = self._transport.send(self._session, 'POST', url, request_headers, payload,
+                                            auth=self._http_auth, stream=stream)
 
         response.raise_for_status()
         self._rets_session_id = self._session.cookies.get('RETS-Session-ID', '')
@@ -318,18 +399,102 @@ class RetsHttpClient:
         return 'Digest ' + self._user_agent_auth_digest()
 
     def _user_agent_auth_digest(self) -> str:
+        rets_session_id = self._rets_session_id
+        cached = self._user_agent_auth_digest_cache
+        if cached is not None and cached[0] == rets_session_id:
+            return cached[1]
+
         user_password = '%s:%s' % (self.user_agent, self._user_agent_password)
         a1 = md5(user_password.encode()).hexdigest()
 
-        digest_values = '%s::%s:%s' % (a1, self._rets_session_id, self.rets_version)
-        return md5(digest_values.encode()).hexdigest()
+        digest_values = '%s::%s:%s' % (a1, rets_session_id, self.rets_version)
+        digest = md5(digest_values.encode()).hexdigest()
+        self._user_agent_auth_digest_cache = (rets_session_id, digest)
+        return digest
+
+
+class _SharedNonceDigestAuth(HTTPDigestAuth):
+    """
+    HTTPDigestAuth keeps the server challenge in thread local state, so every new thread pays a
+    401 round trip before its first authenticated request. This shares the challenge and the
+    nonce count between all threads, so that once any thread has been challenged, every request
+    is authenticated preemptively with the next nonce count for as long as the server accepts
+    the nonce. A stale nonce is answered with a new challenge, which is then shared in turn.
+    """
+
+    def __init__(self, username: str, password: str):
+        super().__init__(username, password)
+        self._lock = threading.Lock()
+        self._shared_chal = {}
+        self._shared_nonce_count = 0
+
+    def __call__(self, r):
+        self.init_per_thread_state()
+        with self._lock:
+            if not self._thread_local.last_nonce and self._shared_chal:
+                # Makes HTTPDigestAuth send the Authorization header without waiting for a 401
+                self._thread_local.last_nonce = self._shared_chal['nonce']
+        return super().__call__(r)
+
+    def handle_401(self, r, **kwargs):
+        # Marks the challenge that HTTPDigestAuth parses from this 401 as new, so that only an
+        # actual challenge replaces the shared one, and never a thread's stale copy of it
+        self._thread_local.challenged = True
+        try:
+            return super().handle_401(r, **kwargs)
+        finally:
+            self._thread_local.challenged = False
+
+    def build_digest_header(self, method: str, url: str) -> str:
+        with self._lock:
+            local = self._thread_local
+            if getattr(local, 'challenged', False):
+                local.challenged = False
+                self._shared_chal = local.chal
+                self._shared_nonce_count = 0
+
+            local.chal = self._shared_chal
+            local.last_nonce = self._shared_chal.get('nonce', '') if self._shared_nonce_count else ''
+            local.nonce_count = self._shared_nonce_count
+            header = super().build_digest_header(method, url)
+            self._shared_nonce_count = local.nonce_count
+            return header
+
+
+def _build_search_payload(resource: str,
+                          class_: str,
+                          query: str,
+                          select: str = None,
+                          count: int = 1,
+                          limit: int = None,
+                          offset: int = 1,
+                          restricted_indicator: str = None,
+                          standard_names: bool = False,
+                          query_type: str = 'DMQL2',
+                          format_: str = 'COMPACT-DECODED',
+                          ) -> dict:
+    raw_payload = {
+        'SearchType': resource,
+        'Class': class_,
+        'Query': query,
+        'QueryType': query_type,
+        'Select': select,
+        'Count': count,
+        'Limit': limit or 'NONE',
+        'Offset': offset,
+        'RestrictedIndicator': restricted_indicator,
+        'StandardNames': int(standard_names),
+        'Format': format_,
+    }
+    # None values indicate that the argument should be omitted from the request
+    return {k: v for k, v in raw_payload.items() if v is not None}
 
 
 def _get_http_auth(username: str, password: str, auth_type: str) -> AuthBase:
     if auth_type == 'basic':
         return HTTPBasicAuth(username, password)
     if auth_type == 'digest':
-        return HTTPDigestAuth(username, password)
+        return _SharedNonceDigestAuth(username, password)
     raise RetsClientError('unknown auth type %s' % auth_type)
 
 
@@ -7,6 +7,19 @@ Metadata = namedtuple('Metadata', (
     'data',
 ))
 
+
+class LookupTypeMetadata(Metadata):
+    """
+    The Metadata of a METADATA-LOOKUP_TYPE element, which also names its lookup. The name is
+    kept outside of the fields so that it unpacks like any other Metadata.
+    """
+
+    def __new__(cls, type_, resource, class_, data, lookup: str = None):
+        self = super().__new__(cls, type_, resource, class_, data)
+        self.lookup = lookup
+        return self
+
+
 Object = namedtuple('Object', (
     'mime_type',
     'content_id',
@@ -23,6 +36,28 @@ SearchResult = namedtuple('SearchResult', (
     'data',
 ))
 
+
+class HashedSearchResult(SearchResult):
+    """
+    A SearchResult that also carries the content hashes of its records, outside of its fields
+    so that it unpacks like any other SearchResult. row_hashes holds the hash of each raw DATA
+    row in the order of the rows, and pending_hashes maps the key of each record returned by a
+    search filtered with a HashStore to its hash, until the result is committed to the store.
+    """
+
+    def __new__(cls, count, max_rows, data, row_hashes: tuple = (), pending_hashes: dict = None):
+        self = super().__new__(cls, count, max_rows, data)
+        self.row_hashes = row_hashes
+        self.pending_hashes = pending_hashes
+        return self
+
+
+SearchBatch = namedtuple('SearchBatch', (
+    'columns',
+    'delimiter',
+    'lines',
+))
+
 SystemMetadata = namedtuple('SystemMetadata', (
     'system_id',
     'system_description',
@@ -0,0 +1,331 @@
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, List, Mapping, Optional, Sequence, Union
+
+from rets.errors import RetsClientError
+from rets.http.data import Object
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    resource TEXT NOT NULL,
+    object_type TEXT NOT NULL,
+    resource_key TEXT NOT NULL,
+    object_id TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    mime_type TEXT,
+    content_id TEXT,
+    description TEXT,
+    actual_object_id TEXT NOT NULL,
+    url TEXT,
+    preferred INTEGER,
+    stored_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (resource, object_type, resource_key, object_id)
+);
+CREATE INDEX IF NOT EXISTS objects_last_used ON objects (last_used);
+CREATE INDEX IF NOT EXISTS objects_digest ON objects (digest);
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+-- The running total of the blob sizes, so that puts need not sum them
+CREATE TABLE IF NOT EXISTS blobs_size (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    total INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO blobs_size SELECT 0, COALESCE(SUM(size), 0) FROM blobs;
+CREATE TABLE IF NOT EXISTS object_sets (
+    resource TEXT NOT NULL,
+    object_type TEXT NOT NULL,
+    resource_key TEXT NOT NULL,
+    object_ids TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (resource, object_type, resource_key)
+);
+"""
+
+# The object id under which the preferred object of an entity is cached, as requested with 0.
+_PREFERRED = '0'
+
+# The number of least recently used objects that are read at a time during an eviction.
+_EVICT_BATCH_SIZE = 100
+
+
+class ObjectCache:
+    """
+    A content-addressed cache of GetObject results on local disk, keyed by resource, object
+    type, resource key and object id. The contents are stored once per SHA-256 digest under
+    path, and indexed in an SQLite database next to them, so several processes can share the
+    cache. Once the contents exceed max_bytes, the least recently used objects are evicted.
+
+    Cache hits are served from memory-mapped files, so the data of a cached Object is a
+    read-only memoryview of the file rather than bytes, and repeated reads are page-cache hits.
+
+    Objects requested with '*' are only served from the cache if the full set of objects of the
+    entity was cached by an earlier '*' request. Objects that were replaced on the server under
+    the same object id are only fetched again once their entry is older than ttl seconds, if
+    given, or after they were invalidated, e.g. when the photo timestamp of a listing changed.
+    The cache assumes that the same media types are
+    requested for an object type, and URL locations are never cached.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1 << 30, ttl: float = None):
+        self._path = path
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        os.makedirs(os.path.join(path, 'blobs'), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(path, 'index.sqlite'), check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def get_object(self,
+                   resource: str,
+                   object_type: str,
+                   resource_keys: Union[str, Mapping[str, Any], Sequence[str]],
+                   fetch: Callable[[Mapping[str, Any]], Sequence[Object]]) -> Sequence[Object]:
+        """
+        Returns the requested objects, serving what it can from the cache and calling fetch with
+        the mapping form of the resource keys that are missing. The fetched objects are cached.
+        """
+        requested = _requested_object_ids(resource_keys)
+        found = OrderedDict()
+        missing = OrderedDict()
+        for key, object_ids in requested.items():
+            cached = self._get_cached(resource, object_type, key, object_ids)
+            if cached is None:
+                missing[key] = object_ids
+            else:
+                found[key] = cached
+
+        if missing:
+            fetched = fetch(missing)
+            self._put(resource, object_type, missing, fetched)
+            for object_ in fetched:
+                found.setdefault(object_.content_id, []).append(object_)
+
+        return tuple(object_ for key in requested for object_ in found.get(key, ()))
+
+    def invalidate(self, resource: str, object_type: str, keys: Iterable[str]) -> None:
+        """ Removes the cached objects of the resource keys, so that they are fetched again. """
+        with self._lock, self._db:
+            digests = set()
+            for key in keys:
+                where = (resource, object_type, str(key))
+                digests.update(row[0] for row in self._db.execute(
+                    'SELECT digest FROM objects WHERE resource = ? AND object_type = ? AND resource_key = ?',
+                    where,
+                ))
+                self._db.execute('DELETE FROM objects WHERE resource = ? AND object_type = ? AND resource_key = ?',
+                                 where)
+                self._db.execute(
+                    'DELETE FROM object_sets WHERE resource = ? AND object_type = ? AND resource_key = ?',
+                    where,
+                )
+            removed = [digest for digest in digests if self._delete_unreferenced_blob(digest) is not None]
+
+        for digest in removed:
+            self._remove_blob(digest)
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            digests = [row[0] for row in self._db.execute('SELECT digest FROM blobs')]
+            self._db.execute('DELETE FROM objects')
+            self._db.execute('DELETE FROM object_sets')
+            self._db.execute('DELETE FROM blobs')
+            self._db.execute('UPDATE blobs_size SET total = 0')
+        for digest in digests:
+            self._remove_blob(digest)
+
+    def close(self) -> None:
+        self._db.close()
+
+    @property
+    def size(self) -> int:
+        """ The total size in bytes of the cached contents. """
+        with self._lock:
+            return self._total_size()
+
+    def _get_cached(self, resource: str, object_type: str, key: str, object_ids: Any) -> Optional[List[Object]]:
+        if object_ids == '*':
+            with self._lock:
+                row = self._db.execute(
+                    'SELECT object_ids, stored_at FROM object_sets '
+                    'WHERE resource = ? AND object_type = ? AND resource_key = ?',
+                    (resource, object_type, key),
+                ).fetchone()
+            if row is None or self._expired(row[1]):
+                return None
+            object_ids = row[0].split(',') if row[0] else []
+        elif object_ids in (0, _PREFERRED):
+            object_ids = [_PREFERRED]
+
+        objects = []
+        for object_id in object_ids:
+            object_ = self._load(resource, object_type, key, str(object_id))
+            if object_ is None:
+                return None
+            objects.append(object_)
+        return objects
+
+    def _load(self, resource: str, object_type: str, key: str, object_id: str) -> Optional[Object]:
+        where = (resource, object_type, key, object_id)
+        with self._lock, self._db:
+            row = self._db.execute(
+                'SELECT digest, mime_type, content_id, description, actual_object_id, url, preferred, stored_at '
+                'FROM objects '
+                'WHERE resource = ? AND object_type = ? AND resource_key = ? AND object_id = ?',
+                where,
+            ).fetchone()
+            if row is None or self._expired(row[7]):
+                return None
+            self._db.execute(
+                'UPDATE objects SET last_used = ? '
+                'WHERE resource = ? AND object_type = ? AND resource_key = ? AND object_id = ?',
+                (time.time(),) + where,
+            )
+
+        digest, mime_type, content_id, description, actual_id, url, preferred, _ = row
+        try:
+            data = self._map_blob(digest)
+        except FileNotFoundError:
+            # The blob was evicted by another process after the row was read
+            return None
+        # The preferred object is cached under 0 as well, but keeps its own object id
+        return Object(mime_type, content_id, description, actual_id, url, bool(preferred), data)
+
+    def _put(self, resource: str, object_type: str, requested: Mapping[str, Any], objects: Sequence[Object]) -> None:
+        by_key = OrderedDict((key, []) for key in requested)
+        for object_ in objects:
+            if object_.data is not None:
+                by_key.setdefault(object_.content_id, []).append(object_)
+
+        now = time.time()
+        for key, key_objects in by_key.items():
+            for object_ in key_objects:
+                digest = self._store_blob(object_.data)
+                object_ids = [str(object_.object_id)]
+                if requested.get(key) in (0, _PREFERRED) or object_.preferred:
+                    object_ids.append(_PREFERRED)
+                with self._lock, self._db:
+                    for object_id in object_ids:
+                        self._db.execute(
+                            'INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                            (resource, object_type, key, object_id, digest, object_.mime_type, object_.content_id,
+                             object_.description, str(object_.object_id), object_.url, int(bool(object_.preferred)),
+                             now, now),
+                        )
+            # Keys without objects are not cached, so that objects added later are found
+            if requested.get(key) == '*' and key_objects:
+                with self._lock, self._db:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO object_sets VALUES (?, ?, ?, ?, ?)',
+                        (resource, object_type, key, ','.join(str(o.object_id) for o in key_objects), now),
+                    )
+        self._evict()
+
+    def _store_blob(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            # Write to a temporary file first so that readers never map a partial blob
+            tmp_path = '%s.%i.%i.tmp' % (blob_path, os.getpid(), threading.get_ident())
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, blob_path)
+        with self._lock, self._db:
+            if self._db.execute('INSERT OR IGNORE INTO blobs VALUES (?, ?)', (digest, len(data))).rowcount:
+                self._db.execute('UPDATE blobs_size SET total = total + ?', (len(data),))
+        return digest
+
+    def _evict(self) -> None:
+        with self._lock:
+            total = self._total_size()
+            if total <= self._max_bytes:
+                return
+
+            evicted = []
+            with self._db:
+                while total > self._max_bytes:
+                    rows = self._db.execute(
+                        'SELECT resource, object_type, resource_key, object_id, digest FROM objects '
+                        'ORDER BY last_used LIMIT ?',
+                        (_EVICT_BATCH_SIZE,),
+                    ).fetchall()
+                    if not rows:
+                        break
+                    for resource, object_type, key, object_id, digest in rows:
+                        if total <= self._max_bytes:
+                            break
+                        self._db.execute(
+                            'DELETE FROM objects '
+                            'WHERE resource = ? AND object_type = ? AND resource_key = ? AND object_id = ?',
+                            (resource, object_type, key, object_id),
+                        )
+                        # Sets missing an object can no longer be served, see _get_cached
+                        self._db.execute(
+                            'DELETE FROM object_sets WHERE resource = ? AND object_type = ? AND resource_key = ?',
+                            (resource, object_type, key),
+                        )
+                        size = self._delete_unreferenced_blob(digest)
+                        if size is not None:
+                            total -= size
+                            evicted.append(digest)
+
+        for digest in evicted:
+            self._remove_blob(digest)
+
+    def _delete_unreferenced_blob(self, digest: str) -> Optional[int]:
+        """ Deletes the index entry of the blob if no object refers to it, and returns its size. """
+        if self._db.execute('SELECT 1 FROM objects WHERE digest = ? LIMIT 1', (digest,)).fetchone() is not None:
+            return None
+        size = self._db.execute('SELECT size FROM blobs WHERE digest = ?', (digest,)).fetchone()
+        if size is None:
+            return 0
+        self._db.execute('DELETE FROM blobs WHERE digest = ?', (digest,))
+        self._db.execute('UPDATE blobs_size SET total = total - ?', size)
+        return size[0]
+
+    def _total_size(self) -> int:
+        return self._db.execute('SELECT total FROM blobs_size').fetchone()[0]
+
+    def _expired(self, stored_at: float) -> bool:
+        return self._ttl is not None and time.time() - stored_at > self._ttl
+
+    def _map_blob(self, digest: str) -> Union[memoryview, bytes]:
+        with open(self._blob_path(digest), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files cannot be mapped
+                return b''
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _remove_blob(self, digest: str) -> None:
+        try:
+            os.remove(self._blob_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self._path, 'blobs', digest[:2], digest)
+
+    def __enter__(self) -> 'ObjectCache':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _requested_object_ids(entities: Union[str, Mapping[str, Any], Sequence[str]]) -> Mapping[str, Any]:
+    """ Converts the resource keys of a GetObject request into their mapping form. """
+    if isinstance(entities, str):
+        return OrderedDict(((entities, '*'),))
+    elif isinstance(entities, Sequence):
+        return OrderedDict((str(entity), '*') for entity in entities)
+    elif isinstance(entities, Mapping):
+        return OrderedDict((str(entity), object_ids) for entity, object_ids in entities.items())
+    raise RetsClientError('Invalid entities argument')
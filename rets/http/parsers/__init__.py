@@ -1,15 +1,43 @@
-from rets.http.parsers.parse import (
-    parse_capability_urls,
-    parse_metadata,
-    parse_search,
-    parse_system,
-)
-from rets.http.parsers.parse_object import parse_object
+from typing import TYPE_CHECKING
+
+from rets.lazy import lazy_import
+
+if TYPE_CHECKING:
+    from rets.http.parsers.parse import (
+        iter_search_batches,
+        iter_standard_xml,
+        parse_capability_urls,
+        parse_count,
+        parse_metadata,
+        parse_search,
+        parse_system,
+        split_batch_columns,
+        split_data_line,
+    )
+    from rets.http.parsers.parse_object import parse_object
 
 __all__ = [
+    'iter_search_batches',
+    'iter_standard_xml',
     'parse_capability_urls',
+    'parse_count',
     'parse_metadata',
     'parse_object',
     'parse_search',
     'parse_system',
+    'split_batch_columns',
+    'split_data_line',
 ]
+
+__getattr__, __dir__ = lazy_import(globals(), {
+    'iter_search_batches': 'rets.http.parsers.parse',
+    'iter_standard_xml': 'rets.http.parsers.parse',
+    'parse_capability_urls': 'rets.http.parsers.parse',
+    'parse_count': 'rets.http.parsers.parse',
+    'parse_metadata': 'rets.http.parsers.parse',
+    'parse_object': 'rets.http.parsers.parse_object',
+    'parse_search': 'rets.http.parsers.parse',
+    'parse_system': 'rets.http.parsers.parse',
+    'split_batch_columns': 'rets.http.parsers.parse',
+    'split_data_line': 'rets.http.parsers.parse',
+})
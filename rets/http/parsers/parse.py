@@ -1,30 +1,41 @@
+import re
+import threading
 from collections import OrderedDict
+from hashlib import blake2b
 from itertools import zip_longest
-from typing import Iterable, Sequence, Tuple, Union
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
 from lxml import etree
 
-from requests import Response
-from requests_toolbelt.multipart.decoder import BodyPart
-
 from rets.errors import RetsParseError, RetsApiError, RetsResponseError
-from rets.http.data import Metadata, SearchResult, SystemMetadata
+from rets.http.data import HashedSearchResult, LookupTypeMetadata, Metadata, SearchBatch, SearchResult, SystemMetadata
+
+if TYPE_CHECKING:
+    from requests import Response
+    from requests_toolbelt.multipart.decoder import BodyPart
 
 DEFAULT_ENCODING = 'utf-8'
 
-ResponseLike = Union[Response, BodyPart]
+ResponseLike = Union['Response', 'BodyPart']
 
+# Matches an XML declaration with an encoding, optionally preceded by a UTF-8 byte order mark.
+_XML_DECLARATION_ENCODING = re.compile(br'^(?:\xef\xbb\xbf)?\s*<\?xml[^>]*\sencoding\s*=')
 
-def parse_xml(response: ResponseLike) -> etree.Element:
-    encoding = response.encoding or DEFAULT_ENCODING
-    try:
-        root = etree.fromstring(response.content.decode(encoding), parser=etree.XMLParser(recover=True))
-    except ValueError as e:
-        if str(e) == "Unicode strings with encoding declaration are not supported. Please use bytes input or XML fragments without declaration.":
-            # parse bytes directly, rather than from string
-            root = etree.XML(response.content)
-        else:
-            raise e
+_parsers = threading.local()
+
+
+def parse_xml(response: ResponseLike, encoding: str = None) -> etree.Element:
+    """
+    Parses the body of the response as bytes, without decoding it to a str first.
+
+    The encoding of the body is taken from, in order of precedence, the encoding argument, the
+    XML declaration of the body and the charset of the Content-Type header. The encoding argument
+    is meant for servers whose declared or reported encoding is wrong.
+    """
+    content = response.content
+    if encoding is None and not _declares_encoding(content):
+        encoding = response.encoding
 
+    root = etree.fromstring(content, parser=_xml_parser(encoding))
     if root is None:
         raise RetsResponseError(response.content, response.headers)
 
@@ -35,7 +46,27 @@ def parse_xml(response: ResponseLike) -> etree.Element:
     return root
 
 
-def parse_capability_urls(response: Response) -> dict:
+def _declares_encoding(content: bytes) -> bool:
+    return _XML_DECLARATION_ENCODING.match(content) is not None
+
+
+def _xml_parser(encoding: Optional[str]) -> etree.XMLParser:
+    """
+    Returns a parser for the encoding that is shared by all calls in the current thread. Parsers
+    are reusable, but lxml does not allow using a parser from several threads at once.
+    """
+    try:
+        parsers = _parsers.by_encoding
+    except AttributeError:
+        parsers = _parsers.by_encoding = {}
+
+    parser = parsers.get(encoding)
+    if parser is None:
+        parser = parsers[encoding] = etree.XMLParser(recover=True, encoding=encoding)
+    return parser
+
+
+def parse_capability_urls(response: 'Response', encoding: str = None) -> dict:
     """
     Parses the list of capability URLs from the response of a successful Login transaction.
 
@@ -61,7 +92,7 @@ def parse_capability_urls(response: Response) -> dict:
         </RETS-RESPONSE>
     </RETS>
     """
-    elem = parse_xml(response)
+    elem = parse_xml(response, encoding)
     response_elem = elem.find('RETS-RESPONSE')
     if response_elem is None:
         return {}
@@ -69,7 +100,7 @@ def parse_capability_urls(response: Response) -> dict:
     return dict((s.strip() for s in arg.split('=', 1)) for arg in raw_arguments)
 
 
-def parse_metadata(response: Response) -> Sequence[Metadata]:
+def parse_metadata(response: 'Response', encoding: str = None) -> Sequence[Metadata]:
     """
     Parse the information from a GetMetadata transaction.
 
@@ -84,24 +115,27 @@ def parse_metadata(response: Response) -> Sequence[Metadata]:
         </METADATA-RESOURCE>
     </RETS>
     """
-    elem = parse_xml(response)
+    elem = parse_xml(response, encoding)
     metadata_elems = [e for e in elem.findall('*') if e.tag.startswith('METADATA-')]
     if metadata_elems is None:
         return ()
 
     def parse_metadata_elem(elem: etree.Element) -> Metadata:
         """ Parses a single <METADATA-X> element """
-        return Metadata(
+        metadata = Metadata(
             type_=elem.tag.split('-', 1)[1],
             resource=elem.get('Resource'),
             class_=elem.get('Class'),
             data=tuple(_parse_data(elem)),
         )
+        if metadata.type_ == 'LOOKUP_TYPE':
+            return LookupTypeMetadata(*metadata, lookup=elem.get('Lookup'))
+        return metadata
 
     return tuple(parse_metadata_elem(metadata_elem) for metadata_elem in metadata_elems)
 
 
-def parse_system(response: Response) -> SystemMetadata:
+def parse_system(response: 'Response', encoding: str = None) -> SystemMetadata:
     """
     Parse the server system information from a SYSTEM GetMetadata transaction.
 
@@ -112,7 +146,7 @@ def parse_system(response: Response) -> SystemMetadata:
         </METADATA-SYSTEM>
     </RETS>
     """
-    elem = parse_xml(response)
+    elem = parse_xml(response, encoding)
     metadata_system_elem = _find_or_raise(elem, 'METADATA-SYSTEM')
     system_elem = _find_or_raise(metadata_system_elem, 'SYSTEM')
     comments_elem = metadata_system_elem.find('COMMENTS')
@@ -128,9 +162,16 @@ def parse_system(response: Response) -> SystemMetadata:
     )
 
 
-def parse_search(response: Response) -> SearchResult:
+def parse_search(response: 'Response', hash_records: bool = False, encoding: str = None) -> SearchResult:
+    """
+    Parse the COMPACT or COMPACT-DECODED response from a Search transaction.
+
+    If hash_records is set, a HashedSearchResult is returned, with a stable content hash of each
+    raw DATA row in its row_hashes, in the same order as the rows. The hash is computed from the undecoded row,
+    so it is cheap and only changes when the data the server sends for the record changes.
+    """
     try:
-        elem = parse_xml(response)
+        elem = parse_xml(response, encoding)
     except RetsApiError as e:
         if e.reply_code == 20201:  # No records found
             return SearchResult(0, False, ())
@@ -142,17 +183,212 @@ def parse_search(response: Response) -> SearchResult:
     else:
         count = None
 
+    hashes = [] if hash_records else None
     try:
-        data = tuple(_parse_data(elem))
+        data = tuple(_parse_data(elem, hashes))
     except RetsParseError:
         data = None
+        hashes = []
 
-    return SearchResult(
+    result = SearchResult(
         count=count,
         # python xml.etree.ElementTree.Element objects are always considered false-y
         max_rows=elem.find('MAXROWS') is not None,
         data=data,
     )
+    if hashes is None:
+        return result
+    return HashedSearchResult(*result, row_hashes=tuple(hashes))
+
+
+def parse_count(response: 'Response', encoding: str = None) -> int:
+    """
+    Parses the record count from the response of a Search transaction sent with Count=2, which
+    contains no data. No DATA elems are looked at.
+
+    <RETS ReplyCode="0" ReplyText="Success">
+        <COUNT Records="11941"/>
+    </RETS>
+    """
+    try:
+        elem = parse_xml(response, encoding)
+    except RetsApiError as e:
+        if e.reply_code == 20201:  # No records found
+            return 0
+        raise
+
+    return int(_find_or_raise(elem, 'COUNT').get('Records'))
+
+
+def iter_search_batches(response: 'Response',
+                        batch_size: int = 1000,
+                        chunk_size: int = 64 * 1024,
+                        encoding: str = None) -> Iterator[SearchBatch]:
+    """
+    Incrementally parses a streamed COMPACT or COMPACT-DECODED Search response and yields the
+    raw text of its DATA elems in batches of up to batch_size lines, as the body is downloaded.
+    Each line can be split into values with split_data_line. Parsed elems are discarded as soon
+    as they are consumed, so memory use is bounded by the batch size and not by the response.
+    The encoding is determined as in parse_xml.
+
+    Once exhausted, the generator returns whether the response had the MAXROWS flag, e.g. to
+    `max_rows = yield from iter_search_batches(response)`.
+    """
+    delimiter = '\t'
+    columns = None
+    lines = []
+    max_rows = False
+
+    for elem in _iter_streamed_elems(response, chunk_size, encoding):
+        tag = elem.tag
+        if tag == 'DATA':
+            lines.append(elem.text or '')
+            if len(lines) >= batch_size:
+                yield SearchBatch(columns, delimiter, lines)
+                lines = []
+        elif tag == 'COLUMNS':
+            columns = tuple(split_data_line(elem.text or '', delimiter))
+        elif tag == 'DELIMITER':
+            delimiter = chr(int(elem.get('value')))
+        elif tag == 'MAXROWS':
+            max_rows = True
+        else:
+            continue
+        _discard_elem(elem)
+
+    if lines:
+        if columns is None:
+            raise RetsParseError('Missing COLUMNS element')
+        yield SearchBatch(columns, delimiter, lines)
+    return max_rows
+
+
+def iter_standard_xml(response: 'Response',
+                      record_tag: str,
+                      mapping: Mapping[str, str] = None,
+                      chunk_size: int = 64 * 1024,
+                      encoding: str = None) -> Iterator[dict]:
+    """
+    Incrementally parses a streamed STANDARD-XML Search response and yields one flat dict of
+    str values for each record_tag elem, e.g. 'Listing'. Each record elem is discarded once it
+    is flattened, so memory use does not grow with the size of the response.
+
+    <RETS ReplyCode="0" ReplyText="Success">
+        <COUNT Records="1"/>
+        <REData>
+            <REProperties>
+                <ResidentialProperty>
+                    <Listing>
+                        <StreetAddress>
+                            <StreetNumber>123</StreetNumber>
+                            <StreetName>Main</StreetName>
+                        </StreetAddress>
+                        <ListingID>5489015</ListingID>
+                        <ListPrice>250000</ListPrice>
+                    </Listing>
+                </ResidentialProperty>
+            </REProperties>
+        </REData>
+    </RETS>
+
+    Every leaf elem of a record is named by its path below the record elem, e.g.
+    'StreetAddress/StreetNumber'. If a mapping is given, it maps paths or leaf tags to the
+    field names of the rows, and only mapped leaves are kept; every row then has all mapped
+    fields, with '' for missing leaves. The values of repeated leaves are joined with commas,
+    like LookupMulti values in the COMPACT formats.
+    """
+    fields = tuple(OrderedDict.fromkeys(mapping.values())) if mapping else ()
+
+    for elem in _iter_streamed_elems(response, chunk_size, encoding):
+        if elem.tag != record_tag:
+            continue
+
+        row = OrderedDict((field, '') for field in fields)
+        for path, tag, value in _iter_leaves(elem, ''):
+            if mapping:
+                field = mapping.get(path) or mapping.get(tag)
+                if field is None:
+                    continue
+            else:
+                field = path
+            row[field] = '%s,%s' % (row[field], value) if row.get(field) else value
+
+        _discard_elem(elem)
+        yield row
+
+
+def _iter_leaves(elem: etree.Element, prefix: str) -> Iterator[Tuple[str, str, str]]:
+    for child in elem:
+        if not isinstance(child.tag, str):  # Comments and processing instructions
+            continue
+        path = prefix + child.tag
+        if len(child):
+            yield from _iter_leaves(child, path + '/')
+        else:
+            yield path, child.tag, (child.text or '').strip()
+
+
+def _iter_streamed_elems(response: 'Response', chunk_size: int, encoding: Optional[str]) -> Iterator[etree.Element]:
+    """
+    Feeds the streamed body of the response to a pull parser and yields each elem once it is
+    complete. The reply code is checked as soon as the root elem starts, and the iteration stops
+    without yielding anything if the server found no records.
+    """
+    parser = None
+    root_seen = False
+    try:
+        for chunk in response.iter_content(chunk_size):
+            if parser is None:
+                if encoding is None and not _declares_encoding(chunk):
+                    encoding = response.encoding
+                parser = etree.XMLPullParser(events=('start', 'end'), recover=True, encoding=encoding)
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if event == 'start':
+                    if not root_seen:
+                        root_seen = True
+                        if _is_no_records(elem):
+                            return
+                elif elem.tag == 'RETS-STATUS':
+                    if _is_no_records(elem):
+                        return
+                else:
+                    yield elem
+        if parser is not None:
+            parser.close()
+    finally:
+        response.close()
+
+    if not root_seen:
+        raise RetsResponseError(b'', response.headers)
+
+
+def _discard_elem(elem: etree.Element) -> None:
+    """ Drops a consumed elem and its preceding siblings from the tree being parsed. """
+    elem.clear()
+    while elem.getprevious() is not None:
+        del elem.getparent()[0]
+
+
+def split_data_line(text: str, delimiter: str = '\t') -> Sequence[str]:
+    # DATA elems using the COMPACT format and COLUMN elems all start and end with delimiters
+    return text.split(delimiter)[1:-1]
+
+
+def split_batch_columns(batch: SearchBatch) -> Mapping[str, List[str]]:
+    """ Splits the DATA lines of a SearchBatch into an ordered mapping of each column to its values. """
+    rows = [split_data_line(line, batch.delimiter) for line in batch.lines]
+    return OrderedDict(zip(batch.columns, map(list, zip(*rows))))
+
+
+def _is_no_records(elem: etree.Element) -> bool:
+    """ Checks the reply code of a streamed RETS or RETS-STATUS elem. """
+    reply_code, reply_text = int(elem.get('ReplyCode')), elem.get('ReplyText')
+    if reply_code == 20201:  # No records found
+        return True
+    if reply_code and reply_text != "Operation Successful":
+        raise RetsApiError(reply_code, reply_text, b'')
+    return False
 
 
 def _parse_rets_status(root: etree.Element) -> Tuple[int, str]:
@@ -165,7 +401,7 @@ def _parse_rets_status(root: etree.Element) -> Tuple[int, str]:
     return int(elem.get('ReplyCode')), elem.get('ReplyText')
 
 
-def _parse_data(elem: etree.Element) -> Iterable[dict]:
+def _parse_data(elem: etree.Element, hashes: list = None) -> Iterable[dict]:
     """
     Parses a generic container element enclosing a single COLUMNS and multiple DATA elems, and
     returns a generator of dicts with keys given by the COLUMNS elem and values given by each
@@ -181,6 +417,8 @@ def _parse_data(elem: etree.Element) -> Iterable[dict]:
         <DATA>	2016-12-01T00:10:52	5528955	20161123234916869427000000	</DATA>
         <DATA>	2016-12-01T00:14:31	5530021	20161127221848669500000000	</DATA>
     </RETS>
+
+    If a hashes list is given, it is extended with the content hash of each DATA elem.
     """
     delimiter = _parse_delimiter(elem)
 
@@ -189,6 +427,9 @@ def _parse_data(elem: etree.Element) -> Iterable[dict]:
 
     data_elems = elem.findall('DATA')
 
+    if hashes is not None:
+        hashes.extend(_hash_data_lines(columns_elem, data_elems))
+
     return (OrderedDict(zip_longest(columns, _parse_data_line(data, delimiter)))
             for data in data_elems)
 
@@ -201,8 +442,17 @@ def _find_or_raise(elem: etree.Element, child_elem_name: str) -> etree.Element:
 
 
 def _parse_data_line(elem: etree.Element, delimiter: str = '\t') -> Sequence[str]:
-    # DATA elems using the COMPACT format and COLUMN elems all start and end with delimiters
-    return elem.text.split(delimiter)[1:-1]
+    return split_data_line(elem.text, delimiter)
+
+
+def _hash_data_lines(columns_elem: etree.Element, data_elems: Sequence[etree.Element]) -> Iterable[str]:
+    # The columns are part of the hash so that a change of the selected fields is never
+    # mistaken for unchanged data.
+    columns_hash = blake2b((columns_elem.text or '').encode(), digest_size=16)
+    for data in data_elems:
+        row_hash = columns_hash.copy()
+        row_hash.update((data.text or '').encode())
+        yield row_hash.hexdigest()
 
 
 def _parse_delimiter(elem: etree.Element) -> str:
@@ -11,7 +11,7 @@ from rets.http.data import Object
 from rets.http.parsers.parse import DEFAULT_ENCODING, ResponseLike, parse_xml
 
 
-def parse_object(response: Response) -> Sequence[Object]:
+def parse_object(response: Response, encoding: str = None) -> Sequence[Object]:
     """
     Parse the response from a GetObject transaction. If there are multiple
     objects to be returned then the response should be a multipart response.
@@ -19,17 +19,19 @@ def parse_object(response: Response) -> Sequence[Object]:
     contains the metadata for the object, including the location if requested.
     The body of the response should contain the binary content of the object,
     an XML document specifying a transaction status code, or left empty.
+
+    The encoding overrides the encoding of XML bodies, see parse_xml.
     """
     content_type = response.headers.get('content-type')
 
     if content_type and 'multipart/parallel' in content_type:
-        return _parse_multipart(response)
+        return _parse_multipart(response, encoding)
 
-    object_ = _parse_body_part(response)
+    object_ = _parse_body_part(response, encoding)
     return (object_,) if object_ is not None else ()
 
 
-def _parse_multipart(response: ResponseLike) -> Sequence[Object]:
+def _parse_multipart(response: ResponseLike, encoding: str = None) -> Sequence[Object]:
     """
     RFC 2045 describes the format of an Internet message body containing a MIME message. The
     body contains one or more body parts, each preceded by a boundary delimiter line, and the
@@ -60,18 +62,18 @@ def _parse_multipart(response: ResponseLike) -> Sequence[Object]:
 
     --simple boundary--
     """
-    encoding = response.encoding or DEFAULT_ENCODING
-    multipart = MultipartDecoder.from_response(response, encoding)
+    header_encoding = response.encoding or DEFAULT_ENCODING
+    multipart = MultipartDecoder.from_response(response, header_encoding)
     # We need to decode the headers because MultipartDecoder returns bytes keys and values,
     # while requests.Response.headers uses str keys and values.
     for part in multipart.parts:
-        part.headers = _decode_headers(part.headers, encoding)
+        part.headers = _decode_headers(part.headers, header_encoding)
 
-    objects = (_parse_body_part(part) for part in multipart.parts)
+    objects = (_parse_body_part(part, encoding) for part in multipart.parts)
     return tuple(object_ for object_ in objects if object_ is not None)
 
 
-def _parse_body_part(part: ResponseLike) -> Optional[Object]:
+def _parse_body_part(part: ResponseLike, encoding: str = None) -> Optional[Object]:
     headers = part.headers
 
     content_id = headers.get('content-id')
@@ -85,7 +87,7 @@ def _parse_body_part(part: ResponseLike) -> Optional[Object]:
     # Check XML responses first, it may contain an error description.
     if mime_type == 'text/xml':
         try:
-            parse_xml(part)
+            parse_xml(part, encoding)
         except RetsApiError as e:
             if e.reply_code == 20403:  # No object found
                 return None
@@ -0,0 +1,163 @@
+import json
+import threading
+import zipfile
+from collections import defaultdict
+from hashlib import sha1
+from typing import Mapping, Optional
+
+from requests import Response, Session
+from requests.auth import AuthBase
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from rets.errors import RetsClientError
+
+
+class Transport:
+    """
+    Sends the HTTP requests of a RetsHttpClient. Replacing the transport allows recording the
+    traffic with a server and replaying it later without touching the network.
+    """
+
+    def send(self,
+             session: Session,
+             method: str,
+             url: str,
+             headers: dict,
+             data: dict = None,
+             auth: AuthBase = None,
+             stream: bool = False,
+             ) -> Response:
+        raise NotImplementedError
+
+
+class RequestsTransport(Transport):
+    """ Sends requests over the network with the requests session of the client. """
+
+    def send(self,
+             session: Session,
+             method: str,
+             url: str,
+             headers: dict,
+             data: dict = None,
+             auth: AuthBase = None,
+             stream: bool = False,
+             ) -> Response:
+        if method == 'GET':
+            return session.get(url, auth=auth, headers=headers, stream=stream)
+        return session.post(url, auth=auth, headers=headers, data=data, stream=stream)
+
+
+class RecordingTransport(Transport):
+    """
+    Sends requests with another transport and records each response into a zip archive at
+    path, keyed by a fingerprint of the request method, url and payload. Streamed responses
+    are read in full to be recorded.
+
+    Responses to identical requests are recorded in sequence, and replayed in the same order.
+    """
+
+    def __init__(self, path: str, transport: Transport = None):
+        self._transport = transport or RequestsTransport()
+        self._archive = zipfile.ZipFile(path, 'a', compression=zipfile.ZIP_DEFLATED)
+        # Recording into an existing archive continues the sequences of responses already in it
+        self._counts = _count_recorded(self._archive)
+        self._lock = threading.Lock()
+
+    def send(self,
+             session: Session,
+             method: str,
+             url: str,
+             headers: dict,
+             data: dict = None,
+             auth: AuthBase = None,
+             stream: bool = False,
+             ) -> Response:
+        response = self._transport.send(session, method, url, headers, data, auth, stream)
+        meta = {
+            'status_code': response.status_code,
+            'reason': response.reason,
+            'url': response.url,
+            'headers': dict(response.headers),
+        }
+        fingerprint = request_fingerprint(method, url, data)
+        with self._lock:
+            name = '%s-%i' % (fingerprint, self._counts[fingerprint])
+            self._counts[fingerprint] += 1
+            self._archive.writestr(name + '.json', json.dumps(meta))
+            self._archive.writestr(name + '.body', response.content)
+        return response
+
+    def close(self) -> None:
+        self._archive.close()
+
+    def __enter__(self) -> 'RecordingTransport':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class ReplayTransport(Transport):
+    """
+    Serves the responses recorded by a RecordingTransport from the archive at path, without any
+    network access. If a request was recorded fewer times than it is replayed, its last
+    response is served again.
+    """
+
+    def __init__(self, path: str):
+        self._archive = zipfile.ZipFile(path, 'r')
+        self._recorded = _count_recorded(self._archive)
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def send(self,
+             session: Session,
+             method: str,
+             url: str,
+             headers: dict,
+             data: dict = None,
+             auth: AuthBase = None,
+             stream: bool = False,
+             ) -> Response:
+        fingerprint = request_fingerprint(method, url, data)
+        with self._lock:
+            recorded = self._recorded.get(fingerprint)
+            if not recorded:
+                raise RetsClientError('No recorded response for %s %s' % (method, url))
+            name = '%s-%i' % (fingerprint, min(self._counts[fingerprint], recorded - 1))
+            self._counts[fingerprint] += 1
+            meta = json.loads(self._archive.read(name + '.json').decode())
+            content = self._archive.read(name + '.body')
+
+        response = Response()
+        response.status_code = meta['status_code']
+        response.reason = meta['reason']
+        response.url = meta['url']
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = content
+        response._content_consumed = True
+        return response
+
+    def close(self) -> None:
+        self._archive.close()
+
+
+def _count_recorded(archive: zipfile.ZipFile) -> defaultdict:
+    counts = defaultdict(int)
+    for name in archive.namelist():
+        if name.endswith('.json'):
+            counts[name.rsplit('-', 1)[0]] += 1
+    return counts
+
+
+def request_fingerprint(method: str, url: str, data: Optional[Mapping] = None) -> str:
+    """
+    Identifies a request by its method, url and payload. Headers are left out since they
+    include values that change between sessions, like the RETS-UA-Authorization digest.
+    """
+    fingerprint = sha1(('%s %s' % (method, url)).encode())
+    for key, value in sorted((data or {}).items()):
+        fingerprint.update(('\n%s=%s' % (key, value)).encode())
+    return fingerprint.hexdigest()
@@ -0,0 +1,29 @@
+"""
+Lazy attributes for the packages of rets, so that importing them does not load requests, lxml
+and the other heavy dependencies until a transaction or parse needs them (PEP 562).
+"""
+from importlib import import_module
+from typing import Any, Callable, Iterable, Mapping, Tuple
+
+
+def lazy_import(module_globals: dict,
+                imports: Mapping[str, str]) -> Tuple[Callable[[str], Any], Callable[[], Iterable]]:
+    """
+    Returns the module level __getattr__ and __dir__ functions of a package whose names, given
+    as a mapping of name to the module defining it, are imported on first access.
+    """
+
+    def __getattr__(name: str) -> Any:
+        try:
+            module = imports[name]
+        except KeyError:
+            raise AttributeError('module %r has no attribute %r' % (module_globals['__name__'], name)) from None
+        value = getattr(import_module(module), name)
+        # Later accesses find the name in the module without calling __getattr__
+        module_globals[name] = value
+        return value
+
+    def __dir__() -> Iterable:
+        return sorted(set(module_globals) | set(imports))
+
+    return __getattr__, __dir__
@@ -2,8 +2,8 @@ import sys
 
 from setuptools import setup
 
-if sys.version_info < (3, 5):
-    print('rets requires Python 3.5 or later')
+if sys.version_info < (3, 7):
+    print('rets requires Python 3.7 or later')
     sys.exit(1)
 
 
@@ -16,6 +16,11 @@ install_requires = [
     'lxml>=4.3.0',
 ]
 
+extras_require = {
+    'pandas': ['pandas>=2.0'],
+    'parquet': ['pyarrow'],
+}
+
 setup_requires = [
     'pytest-runner',
 ]
@@ -50,8 +55,11 @@ setup(
         'Operating System :: OS Independent',
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
         'Programming Language :: Python :: 3 :: Only',
         'Programming Language :: Python :: Implementation :: CPython',
         'Programming Language :: Python :: Implementation :: PyPy',
@@ -59,8 +67,16 @@ setup(
         'Topic :: Internet :: WWW/HTTP :: Indexing/Search',
     ],
     license='MIT License',
+    # The lazy imports of the packages rely on module __getattr__ (PEP 562)
+    python_requires='>=3.7',
     install_requires=install_requires,
+    extras_require=extras_require,
     setup_requires=setup_requires,
     tests_require=tests_requires,
     packages=packages,
+    entry_points={
+        'console_scripts': [
+            'rets-export=rets.export:main',
+        ],
+    },
 )
@@ -0,0 +1,100 @@
+from datetime import time
+from unittest.mock import MagicMock
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from rets.client.dataframe import batch_dataframe, to_dataframe  # noqa: E402
+from rets.client.resource_class import ResourceClass  # noqa: E402
+from rets.http import SearchBatch  # noqa: E402
+from tests.utils import make_response  # noqa: E402
+
+TABLE = ({
+    'SystemName': 'LIST_1',
+    'DataType': 'Character',
+}, {
+    'SystemName': 'LIST_15',
+    'DataType': 'Character',
+    'Interpretation': 'Lookup',
+    'LookupName': 'STATUS',
+}, {
+    'SystemName': 'LIST_9',
+    'DataType': 'Character',
+    'Interpretation': 'LookupMulti',
+}, {
+    'SystemName': 'LIST_22',
+    'DataType': 'Long',
+}, {
+    'SystemName': 'LIST_23',
+    'DataType': 'Decimal',
+}, {
+    'SystemName': 'LIST_8',
+    'DataType': 'Boolean',
+}, {
+    'SystemName': 'LIST_87',
+    'DataType': 'DateTime',
+}, {
+    'SystemName': 'LIST_10',
+    'DataType': 'Date',
+}, {
+    'SystemName': 'LIST_11',
+    'DataType': 'Time',
+})
+
+
+def test_to_dataframe():
+    frame = to_dataframe({
+        'LIST_1': ('a', ''),
+        'LIST_15': ('A', 'A'),
+        'LIST_9': ('P,G', ''),
+        'LIST_22': ('9007199254740993', ''),
+        'LIST_23': ('1.5', ''),
+        'LIST_8': ('1', ''),
+        'LIST_87': ('2017-01-01T12:00:00-05:00', ''),
+        'LIST_10': ('2017-01-02', ''),
+        'LIST_11': ('12:30:00', ''),
+    }, TABLE, lookups={'STATUS': {'A': 'Active'}})
+
+    assert frame['LIST_1'].tolist() == ['a', None]
+    assert isinstance(frame['LIST_15'].dtype, pd.CategoricalDtype)
+    assert frame['LIST_15'].tolist() == ['Active', 'Active']
+    assert frame['LIST_9'].tolist() == [['P', 'G'], None]
+    assert str(frame['LIST_22'].dtype) == 'Int64'
+    assert frame['LIST_22'][0] == 9007199254740993
+    assert frame['LIST_22'].isna().tolist() == [False, True]
+    assert frame['LIST_23'].dtype == 'float64'
+    assert str(frame['LIST_8'].dtype) == 'boolean'
+    assert frame['LIST_87'][0] == pd.Timestamp('2017-01-01T17:00:00')
+    assert frame['LIST_10'][0] == pd.Timestamp('2017-01-02')
+    assert frame['LIST_11'].tolist() == [time(12, 30), None]
+
+
+def test_batch_dataframe_empty():
+    frame = batch_dataframe(SearchBatch(columns=('LIST_1', 'LIST_22'), delimiter='\t', lines=()), TABLE)
+    assert frame.columns.tolist() == ['LIST_1', 'LIST_22']
+    assert len(frame) == 0
+
+
+def test_search_dataframe():
+    resource = MagicMock()
+    resource.name = 'Property'
+    http = MagicMock()
+    http.response_encoding = None
+    http.search_stream.return_value = make_response(200, (
+        '<RETS ReplyCode="0" ReplyText="Success">'
+        '<DELIMITER value="09"/>'
+        '<COLUMNS>\tLIST_1\tLIST_15\tLIST_22\t</COLUMNS>'
+        '<DATA>\t1\tA\t100\t</DATA>'
+        '<DATA>\t2\tS\t\t</DATA>'
+        '<DATA>\t3\tA\t300\t</DATA>'
+        '</RETS>'
+    ).encode())
+    resource_class = ResourceClass(resource, {'ClassName': 'A', '_table': TABLE}, http)
+
+    frame = resource_class.search_dataframe('(LIST_22=0+)', batch_size=2)
+
+    assert frame['LIST_1'].tolist() == ['1', '2', '3']
+    assert isinstance(frame['LIST_15'].dtype, pd.CategoricalDtype)
+    assert frame['LIST_15'].tolist() == ['A', 'S', 'A']
+    assert frame['LIST_22'].tolist() == [100, pd.NA, 300]
@@ -7,9 +7,10 @@ from rets.client.decoder import (
     RecordDecoder,
     _get_decoder,
     _decode_datetime,
-    _decode_time,
+    decode_time,
     _decode_date,
 )
+from rets.errors import RetsParseError
 
 
 @pytest.fixture
@@ -136,26 +137,131 @@ def test_decode_datetime():
 
 
 def test_decode_time():
-    assert _decode_time('03:04:05', True) == time(3, 4, 5, tzinfo=timezone(timedelta(0)))
+    assert decode_time('03:04:05', True) == time(3, 4, 5, tzinfo=timezone(timedelta(0)))
     # TODO: The standard specifies that the second fraction is limited to one
     # digit, however udatetime only permits 3 or 6 digits.
-    assert _decode_time('03:04:05.600', True) == time(3, 4, 5, 600000, tzinfo=timezone(timedelta(0)))
-    assert _decode_time('03:04:05Z', True) == time(3, 4, 5, tzinfo=timezone(timedelta(0)))
-    assert _decode_time('03:04:05+00:00', True) == time(3, 4, 5, tzinfo=timezone(timedelta(0)))
-    assert _decode_time('03:04:05-00:00', True) == time(3, 4, 5, tzinfo=timezone(timedelta(0)))
-    assert _decode_time('03:04:05+07:08', True) == time(3, 4, 5, tzinfo=timezone(timedelta(hours=7, minutes=8)))
-    assert _decode_time('03:04:05-07:08', True) == time(3, 4, 5, tzinfo=timezone(timedelta(hours=-7, minutes=-8)))
-    assert _decode_time('03:04:05.600+07:08', True) == \
+    assert decode_time('03:04:05.600', True) == time(3, 4, 5, 600000, tzinfo=timezone(timedelta(0)))
+    assert decode_time('03:04:05Z', True) == time(3, 4, 5, tzinfo=timezone(timedelta(0)))
+    assert decode_time('03:04:05+00:00', True) == time(3, 4, 5, tzinfo=timezone(timedelta(0)))
+    assert decode_time('03:04:05-00:00', True) == time(3, 4, 5, tzinfo=timezone(timedelta(0)))
+    assert decode_time('03:04:05+07:08', True) == time(3, 4, 5, tzinfo=timezone(timedelta(hours=7, minutes=8)))
+    assert decode_time('03:04:05-07:08', True) == time(3, 4, 5, tzinfo=timezone(timedelta(hours=-7, minutes=-8)))
+    assert decode_time('03:04:05.600+07:08', True) == \
            time(3, 4, 5, 600000, tzinfo=timezone(timedelta(hours=7, minutes=8)))
-    assert _decode_time('03:04:05', False) == time(3, 4, 5)
-    assert _decode_time('03:04:05.600', False) == time(3, 4, 5, 600000)
-    assert _decode_time('03:04:05Z', False) == time(3, 4, 5)
-    assert _decode_time('03:04:05+00:00', False) == time(3, 4, 5)
-    assert _decode_time('03:04:05-00:00', False) == time(3, 4, 5)
-    assert _decode_time('12:00:00+07:08', False) == time(4, 52)
-    assert _decode_time('12:00:00-07:08', False) == time(19, 8)
+    assert decode_time('03:04:05', False) == time(3, 4, 5)
+    assert decode_time('03:04:05.600', False) == time(3, 4, 5, 600000)
+    assert decode_time('03:04:05Z', False) == time(3, 4, 5)
+    assert decode_time('03:04:05+00:00', False) == time(3, 4, 5)
+    assert decode_time('03:04:05-00:00', False) == time(3, 4, 5)
+    assert decode_time('12:00:00+07:08', False) == time(4, 52)
+    assert decode_time('12:00:00-07:08', False) == time(19, 8)
 
 
 def test_decode_date():
     assert _decode_date('2017-01-02T00:00:00.000', False) == datetime(2017, 1, 2, 0, 0, 0)
     assert _decode_date('2017-01-02', False) == datetime(2017, 1, 2, 0, 0, 0)
+
+
+def test_decode_rows_lookups():
+    decoder = RecordDecoder(({
+        'SystemName': 'status',
+        'DataType': 'Character',
+        'Interpretation': 'Lookup',
+        'LookupName': 'STATUS',
+    }, {
+        'SystemName': 'features',
+        'DataType': 'Character',
+        'Interpretation': 'LookupMulti',
+        'LookupName': 'FEATURES',
+    }), lookups={
+        'STATUS': {'A': 'Active', 'S': 'Sold'},
+        'FEATURES': {'P': 'Pool', 'G': 'Garage'},
+    })
+
+    rows = decoder.decode(({
+        'status': 'A',
+        'features': 'P,G,X',
+    }, {
+        'status': 'U',
+        'features': '',
+    }))
+
+    assert rows == ({
+        'status': 'Active',
+        'features': ['Pool', 'Garage', 'X'],
+    }, {
+        'status': 'U',
+        'features': None,
+    })
+
+
+def test_decode_numeric_policy():
+    decoder = RecordDecoder(({
+        'SystemName': 'list_price',
+        'DataType': 'Decimal',
+        'Precision': '2',
+    }, {
+        'SystemName': 'acreage',
+        'DataType': 'Decimal',
+        'Precision': '3',
+    }, {
+        'SystemName': 'latitude',
+        'DataType': 'Decimal',
+        'Precision': '6',
+    }), numeric={'list_price': 'scaled', 'Decimal': 'float'})
+
+    columns = decoder.decode_columns(({
+        'list_price': '150000.5',
+        'acreage': '1.25',
+        'latitude': '',
+    }, {
+        'list_price': '-0.015',
+        'acreage': '1e2',
+        'latitude': '45.123456',
+    }))
+
+    assert columns == {
+        'list_price': [15000050, -2],
+        'acreage': [1.25, 100.0],
+        'latitude': [None, 45.123456],
+    }
+    assert RecordDecoder(({'SystemName': 'a', 'DataType': 'Decimal'},)).decode(({'a': '1.5'},)) == (
+        {'a': Decimal('1.5')},
+    )
+
+
+def test_decode_numeric_scaled_requires_precision():
+    decoder = RecordDecoder(({'SystemName': 'a', 'DataType': 'Decimal'},), numeric='scaled')
+    with pytest.raises(RetsParseError):
+        decoder.decode(({'a': '1.5'},))
+
+
+def test_decode_interned():
+    table = ({
+        'SystemName': 'status',
+        'DataType': 'Character',
+        'Interpretation': 'Lookup',
+    }, {
+        'SystemName': 'features',
+        'DataType': 'Character',
+        'Interpretation': 'LookupMulti',
+    }, {
+        'SystemName': 'city',
+        'DataType': 'Character',
+    })
+    rows = tuple({
+        'status': ''.join(['Act', 'ive']),
+        'features': ''.join(['P,', 'G']),
+        'city': ''.join(['Sea', 'ttle']),
+    } for _ in range(3))
+
+    decoded = RecordDecoder(table, intern=True).decode(rows)
+    assert decoded[0] == {'status': 'Active', 'features': ('P', 'G'), 'city': 'Seattle'}
+    assert decoded[0]['status'] is decoded[2]['status']
+    assert decoded[0]['features'] is decoded[2]['features']
+    assert decoded[0]['city'] is not decoded[2]['city']
+
+    columns = RecordDecoder(table, intern={'city'}).decode_columns(rows)
+    assert columns['city'][0] is columns['city'][2]
+    assert columns['features'] == [['P', 'G']] * 3
+    assert columns['features'][0] is not columns['features'][2]
@@ -0,0 +1,108 @@
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+
+from rets.client.local_index import LocalIndex
+from rets.client.query import Range
+from rets.client.resource_class import ResourceClass
+from rets.errors import RetsClientError
+from rets.http import SearchResult
+
+TABLE = ({
+    'SystemName': 'LIST_1',
+    'DataType': 'Character',
+}, {
+    'SystemName': 'LIST_15',
+    'DataType': 'Character',
+    'Interpretation': 'Lookup',
+}, {
+    'SystemName': 'LIST_22',
+    'DataType': 'Decimal',
+}, {
+    'SystemName': 'LIST_78',
+    'DataType': 'Character',
+}, {
+    'SystemName': 'LIST_88',
+    'DataType': 'Character',
+    'Interpretation': 'LookupMulti',
+})
+
+
+@pytest.fixture
+def resource_class():
+    resource = MagicMock()
+    resource.name = 'Property'
+    resource.key_field = 'LIST_1'
+    return ResourceClass(resource, {'ClassName': 'A', '_table': TABLE}, MagicMock())
+
+
+def _row(key, status, price, remarks='', features=''):
+    return {'LIST_1': key, 'LIST_15': status, 'LIST_22': price, 'LIST_78': remarks, 'LIST_88': features}
+
+
+def test_sync_and_query_local(tmpdir, resource_class):
+    resource_class._http.search.side_effect = [
+        SearchResult(count=2, max_rows=True, data=(
+            _row('1', 'Active', '100000.50', 'Pool and garden', 'Pool,Garage'),
+            _row('2', 'Sold', '250000'),
+        )),
+        SearchResult(count=0, max_rows=False, data=(_row('3', 'Pending', '300000', 'Shared pool', 'Pool'),)),
+    ]
+    path = str(tmpdir.join('index.sqlite'))
+
+    with LocalIndex(path, resource_class, indexed_fields=['LIST_15'], full_text_fields=['LIST_78']) as index:
+        assert index.sync('(LIST_22=0+)') == 3
+        assert len(index) == 3
+
+        result = index.query_local({'LIST_15': ['Active', 'Pending'], 'LIST_22': Range(Decimal('100000'), None)})
+        assert [record.data['LIST_1'] for record in result.data] == ['1', '3']
+        assert str(result.data[0].data['LIST_22']) == '100000.50'
+        assert result.data[0].data['LIST_88'] == ['Pool', 'Garage']
+        assert result.data[1].data == {
+            'LIST_1': '3', 'LIST_15': 'Pending', 'LIST_22': Decimal('300000'), 'LIST_78': 'Shared pool',
+            'LIST_88': ['Pool'],
+        }
+
+        assert index.query_local({'LIST_88': ['Garage']}).count == 1
+        assert index.query_local({'LIST_22': 250000}, fields=['LIST_1']).data[0].data == {'LIST_1': '2'}
+        assert index.query_local({'LIST_22': Range(None, 200000)}, fields=['LIST_1']).count == 1
+        assert index.query_local({'LIST_22': [Decimal('100000.5')]}, fields=['LIST_1']).count == 1
+        assert [r.data['LIST_1'] for r in index.query_local(text='pool NOT shared').data] == ['1']
+
+        # Upserts only replace the synced fields
+        index.update([{'LIST_1': '1', 'LIST_15': 'Sold', 'LIST_78': 'Garden'}])
+        record, = index.query_local({'LIST_1': '1'}).data
+        assert (record.data['LIST_15'], record.data['LIST_22']) == ('Sold', Decimal('100000.5'))
+        assert index.query_local(text='pool').count == 1
+
+        index.delete(['3'])
+        assert index.query_local(text='pool').count == 0
+
+        index.update([{'LIST_1': '2', 'LIST_22': '33.12345678901234567'}])
+        assert str(index.query_local({'LIST_1': '2'}).data[0].data['LIST_22']) == '33.12345678901234567'
+
+    with LocalIndex(path, resource_class) as index:
+        assert len(index) == 2
+
+
+def test_query_local_invalid_fields(tmpdir, resource_class):
+    index = LocalIndex(str(tmpdir.join('index.sqlite')), resource_class)
+    with pytest.raises(RetsClientError):
+        index.query_local({'LIST_99': '1'})
+    with pytest.raises(RetsClientError):
+        index.update([{'LIST_15': 'Active'}])
+    with pytest.raises(RetsClientError):
+        index.query_local(text='pool')
+
+
+def test_integer_key_field_accepts_any_key(tmpdir):
+    resource = MagicMock()
+    resource.name = 'Property'
+    resource.key_field = 'LIST_2'
+    table = ({'SystemName': 'LIST_2', 'DataType': 'Int'}, {'SystemName': 'LIST_15', 'DataType': 'Character'})
+    resource_class = ResourceClass(resource, {'ClassName': 'A', '_table': table}, MagicMock())
+
+    with LocalIndex(str(tmpdir.join('index.sqlite')), resource_class) as index:
+        assert index.update([{'LIST_2': 'A-1', 'LIST_15': 'Active'}, {'LIST_2': '2', 'LIST_15': 'Sold'}]) == 2
+        assert index.query_local({'LIST_2': 2}).data[0].data == {'LIST_2': 2, 'LIST_15': 'Sold'}
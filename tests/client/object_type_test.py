@@ -0,0 +1,53 @@
+import threading
+from unittest.mock import MagicMock
+
+from rets.client.object_type import ObjectBatch, ObjectType
+from rets.http.data import Object
+
+
+def _object(key: str, object_id: str, preferred: bool = False) -> Object:
+    return Object('image/jpeg', key, None, object_id, None, preferred, b'data')
+
+
+def test_get_preferred_first():
+    calls = []
+    lock = threading.Lock()
+
+    def get_object(resource, object_type, resource_keys, **kwargs):
+        with lock:
+            calls.append(dict(resource_keys))
+        if list(resource_keys.values())[0] == 0:
+            return [_object(key, '1', preferred=True) for key in resource_keys if key != '3']
+        return [_object(key, object_id) for key in resource_keys for object_id in ('1', '2')]
+
+    http = MagicMock()
+    http.get_object.side_effect = get_object
+    resource = MagicMock()
+    resource.name = 'Property'
+    object_type = ObjectType(resource, {'ObjectType': 'Photo'}, http)
+
+    batches = list(object_type.get_preferred_first([1, 2, 3], batch_size=2, media_types='image/jpeg'))
+
+    assert [batch.preferred for batch in batches] == [True, True, False, False]
+    # The backfill only starts once every preferred batch was fetched
+    assert all(0 in c.values() for c in calls[:2]) and all('*' in c.values() for c in calls[2:])
+    preferred = {key: objects for batch in batches[:2] for key, objects in batch.objects.items()}
+    assert preferred == {'1': [_object('1', '1', True)], '2': [_object('2', '1', True)], '3': []}
+    backfilled = {key: objects for batch in batches[2:] for key, objects in batch.objects.items()}
+    assert [o.object_id for o in backfilled['3']] == ['1', '2']
+    assert http.get_object.call_args[1] == {'media_types': 'image/jpeg'}
+
+
+def test_get_preferred_first_thumbnails():
+    http = MagicMock()
+    http.get_object.return_value = ()
+    resource = MagicMock()
+    resource.name = 'Property'
+    thumbnails = MagicMock()
+    thumbnails.get.return_value = [_object('1', '1', True)]
+    object_type = ObjectType(resource, {'ObjectType': 'Photo'}, http)
+
+    batches = list(object_type.get_preferred_first(['1'], preferred_type=thumbnails))
+    assert batches == [ObjectBatch(True, {'1': [_object('1', '1', True)]}), ObjectBatch(False, {'1': []})]
+    thumbnails.get.assert_called_once_with({'1': 0})
+    http.get_object.assert_called_once_with('Property', 'Photo', {'1': '*'})
@@ -0,0 +1,91 @@
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from rets.client.parquet import arrow_schema, write_parquet  # noqa: E402
+from rets.client.resource_class import ResourceClass  # noqa: E402
+from tests.utils import make_compact_response  # noqa: E402
+
+TABLE = ({
+    'SystemName': 'LIST_1',
+    'DataType': 'Character',
+    'MaximumLength': '30',
+}, {
+    'SystemName': 'LIST_22',
+    'DataType': 'Decimal',
+    'MaximumLength': '12',
+    'Precision': '2',
+}, {
+    'SystemName': 'LIST_15',
+    'DataType': 'Character',
+    'Interpretation': 'Lookup',
+}, {
+    'SystemName': 'LIST_87',
+    'DataType': 'DateTime',
+}, {
+    'SystemName': 'LIST_10',
+    'DataType': 'Date',
+}, {
+    'SystemName': 'LIST_66',
+    'DataType': 'Int',
+    'MaximumLength': '12',
+})
+
+
+def test_arrow_schema():
+    schema = arrow_schema(TABLE)
+
+    assert schema.names == ['LIST_1', 'LIST_22', 'LIST_15', 'LIST_87', 'LIST_10', 'LIST_66']
+    assert schema.field('LIST_1').type == pa.string()
+    assert schema.field('LIST_22').type == pa.decimal128(14, 2)
+    assert schema.field('LIST_15').type == pa.dictionary(pa.int32(), pa.string())
+    assert schema.field('LIST_87').type == pa.timestamp('us')
+    assert schema.field('LIST_10').type == pa.date32()
+    assert schema.field('LIST_66').type == pa.int64()
+    assert arrow_schema(TABLE, ['unknown']).field('unknown').type == pa.string()
+    assert arrow_schema(TABLE, ['LIST_22'], numeric='float').field('LIST_22').type == pa.float64()
+    assert arrow_schema(TABLE, ['LIST_22'], numeric={'LIST_22': 'scaled'}).field('LIST_22').type == pa.int64()
+
+
+def test_write_parquet():
+    resource_class = ResourceClass(MagicMock(), {'ClassName': 'A', '_table': TABLE}, MagicMock())
+    resource_class._http.response_encoding = None
+    columns = ('LIST_1', 'LIST_22', 'LIST_15', 'LIST_87', 'LIST_10', 'LIST_66')
+    row = ('1', '100.25', 'Active', '2017-08-01T12:00:00', '2017-08-01', '')
+    resource_class._http.search_stream.side_effect = [
+        make_compact_response(columns, (row, row)),
+        make_compact_response(columns, (row,)),
+    ]
+
+    buffer = io.BytesIO()
+    assert write_parquet(resource_class, buffer, '(LIST_1=*)', page_size=2) == 3
+
+    parquet_file = pq.ParquetFile(io.BytesIO(buffer.getvalue()))
+    assert parquet_file.num_row_groups == 2
+    assert parquet_file.read().to_pylist()[0] == {
+        'LIST_1': '1',
+        'LIST_22': Decimal('100.25'),
+        'LIST_15': 'Active',
+        'LIST_87': datetime(2017, 8, 1, 12),
+        'LIST_10': date(2017, 8, 1),
+        'LIST_66': None,
+    }
+
+
+def test_write_parquet_decimal_without_maximum_length():
+    table = ({'SystemName': 'LIST_22', 'DataType': 'Decimal', 'Precision': '2'},)
+    assert arrow_schema(table).field('LIST_22').type == pa.decimal128(38, 2)
+
+    resource_class = ResourceClass(MagicMock(), {'ClassName': 'A', '_table': table}, MagicMock())
+    resource_class._http.response_encoding = None
+    resource_class._http.search_stream.return_value = make_compact_response(('LIST_22',), (('250000.00',),))
+
+    buffer = io.BytesIO()
+    assert write_parquet(resource_class, buffer, '(LIST_22=0+)') == 1
+    assert pq.read_table(io.BytesIO(buffer.getvalue())).to_pylist() == [{'LIST_22': Decimal('250000.00')}]
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from rets.client.pipeline import decode_parallel
+from rets.http import SearchBatch
+
+TABLE = ({
+    'SystemName': 'LIST_1',
+    'DataType': 'Character',
+}, {
+    'SystemName': 'LIST_87',
+    'DataType': 'DateTime',
+})
+
+COLUMNS = ('LIST_1', 'LIST_87')
+
+
+def _batches(n):
+    return (SearchBatch(COLUMNS, '\t', ['\t%i\t2017-08-01T12:00:00\t' % i, '\t%i\t\t' % -i]) for i in range(n))
+
+
+def test_decode_parallel_ordered():
+    batches = list(decode_parallel(_batches(10), TABLE, processes=2))
+
+    assert [[row['LIST_1'] for row in rows] for rows in batches] == [[str(i), str(-i)] for i in range(10)]
+    assert batches[0] == (
+        {'LIST_1': '0', 'LIST_87': datetime(2017, 8, 1, 12)},
+        {'LIST_1': '0', 'LIST_87': None},
+    )
+
+
+def test_decode_parallel_unordered():
+    batches = list(decode_parallel(_batches(10), TABLE, processes=2, ordered=False, max_pending=3))
+
+    assert sorted(rows[0]['LIST_1'] for rows in batches) == sorted(str(i) for i in range(10))
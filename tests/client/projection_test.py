@@ -0,0 +1,122 @@
+import json
+import logging
+import pickle
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from rets.client.projection import AdaptiveProjection, JsonProjectionStore, MemoryProjectionStore
+from rets.client.resource_class import ResourceClass
+from rets.http import SearchResult
+
+TABLE = tuple({'SystemName': 'LIST_%i' % i, 'DataType': 'Character'} for i in range(1, 6))
+
+
+@pytest.fixture
+def resource_class():
+    resource = MagicMock()
+    resource.name = 'Property'
+    resource.key_field = 'LIST_1'
+    http = MagicMock()
+    http.search.return_value = SearchResult(
+        count=1,
+        max_rows=False,
+        data=(OrderedDict(('LIST_%i' % i, str(i)) for i in range(1, 6)),),
+    )
+    return ResourceClass(resource, {'ClassName': 'A', '_table': TABLE}, http)
+
+
+def test_projection_learns_fields(resource_class):
+    store = MemoryProjectionStore()
+
+    with AdaptiveProjection(store, 'job') as projection:
+        record = resource_class.search('(LIST_1=0+)', projection=projection).data[0]
+        assert record.data['LIST_3'] == '3'
+        assert record.data.get('LIST_4') == '4'
+    assert resource_class._http.search.call_args[1]['select'] is None
+    assert store.get('job:Property:A') == {'LIST_3', 'LIST_4'}
+
+    with AdaptiveProjection(store, 'job') as projection:
+        resource_class.search('(LIST_1=0+)', projection=projection)
+    assert resource_class._http.search.call_args[1]['select'] == 'LIST_1,LIST_3,LIST_4'
+
+    with AdaptiveProjection(store, 'job', full_rows=True) as projection:
+        resource_class.search('(LIST_1=0+)', projection=projection)
+    assert resource_class._http.search.call_args[1]['select'] is None
+
+
+def test_projection_iteration_reads_all_fields(resource_class):
+    store = MemoryProjectionStore()
+
+    with AdaptiveProjection(store, 'job') as projection:
+        record = resource_class.search('(LIST_1=0+)', projection=projection).data[0]
+        dict(record.data)
+
+    assert store.get('job:Property:A') == {'LIST_1', 'LIST_2', 'LIST_3', 'LIST_4', 'LIST_5'}
+    assert AdaptiveProjection(store, 'job').select(resource_class) is None
+
+
+def test_projection_explicit_fields(resource_class):
+    store = MemoryProjectionStore({'job:Property:A': ['LIST_3']})
+
+    with AdaptiveProjection(store, 'job') as projection:
+        resource_class.search('(LIST_1=0+)', fields=['LIST_2'], projection=projection)
+
+    assert resource_class._http.search.call_args[1]['select'] == 'LIST_2'
+
+
+def test_json_projection_store(tmpdir):
+    path = str(tmpdir.join('projection.json'))
+    store = JsonProjectionStore(path)
+    store.add({'job:Property:A': ['LIST_2']})
+    store.add({'job:Property:A': ['LIST_1']})
+
+    with open(path) as f:
+        assert json.load(f) == {'job:Property:A': ['LIST_1', 'LIST_2']}
+    assert JsonProjectionStore(path).get('job:Property:A') == {'LIST_1', 'LIST_2'}
+
+
+def test_json_projection_store_concurrent_adds(tmpdir):
+    path = str(tmpdir.join('projection.json'))
+    store = JsonProjectionStore(path)
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda i: store.add({'job:Property:A': ['LIST_%i' % i]}), range(50)))
+
+    assert len(JsonProjectionStore(path).get('job:Property:A')) == 50
+    assert tmpdir.listdir() == [tmpdir.join('projection.json')]
+
+
+def test_projection_rows_pickle_and_warn(resource_class, caplog):
+    store = MemoryProjectionStore({'job:Property:A': ['LIST_3']})
+    resource_class._http.search.return_value = SearchResult(
+        count=1,
+        max_rows=False,
+        data=(OrderedDict((('LIST_1', '1'), ('LIST_3', '3'))),),
+    )
+
+    with AdaptiveProjection(store, 'job') as projection:
+        record = resource_class.search('(LIST_1=0+)', projection=projection).data[0]
+        # Pickling neither fails nor counts as reading every field
+        assert pickle.loads(pickle.dumps(record.data)) == {'LIST_1': '1', 'LIST_3': '3'}
+        with caplog.at_level(logging.WARNING, logger='rets'):
+            assert record.data.get('LIST_4') is None
+            assert record.data.get('LIST_4') is None
+        assert len(caplog.records) == 1 and 'LIST_4' in caplog.records[0].getMessage()
+
+    assert store.get('job:Property:A') == {'LIST_3', 'LIST_4'}
+
+
+def test_projection_merges_threads(resource_class):
+    store = MemoryProjectionStore()
+
+    def read(field):
+        record = resource_class.search('(LIST_1=0+)', projection=projection).data[0]
+        return record.data[field]
+
+    with AdaptiveProjection(store, 'job') as projection:
+        with ThreadPoolExecutor(2) as executor:
+            assert list(executor.map(read, ['LIST_2', 'LIST_5'])) == ['2', '5']
+
+    assert store.get('job:Property:A') == {'LIST_2', 'LIST_5'}
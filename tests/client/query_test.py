@@ -0,0 +1,87 @@
+from datetime import date, datetime
+from urllib.parse import quote_plus
+
+import pytest
+
+from rets.client.query import QueryBuilder, Range
+from rets.errors import RetsClientError
+
+TABLE = ({
+    'SystemName': 'LIST_1',
+    'DataType': 'Character',
+}, {
+    'SystemName': 'LIST_15',
+    'DataType': 'Character',
+    'Interpretation': 'Lookup',
+}, {
+    'SystemName': 'LIST_22',
+    'DataType': 'Int',
+}, {
+    'SystemName': 'LIST_87',
+    'DataType': 'DateTime',
+}, {
+    'SystemName': 'LIST_132',
+    'DataType': 'Date',
+}, {
+    'SystemName': 'LIST_8',
+    'DataType': 'Boolean',
+})
+
+
+def test_compile():
+    builder = QueryBuilder(TABLE)
+    assert builder.compile({
+        'LIST_87': Range(datetime(2017, 1, 1, 12, 30), None),
+        'LIST_132': Range(None, date(2017, 2, 1)),
+        'LIST_22': Range(100000, 250000),
+        'LIST_15': ['Active', 'Pending'],
+        'LIST_1': ('A', 'B'),
+        'LIST_8': True,
+    }) == ('(LIST_87=2017-01-01T12:30:00+),(LIST_132=2017-02-01-),(LIST_22=100000-250000),'
+           '(LIST_15=|Active,Pending),(LIST_1=A,B),(LIST_8=1)')
+
+
+def test_compile_str_verbatim():
+    builder = QueryBuilder(TABLE)
+    assert builder.compile({'LIST_22': '0+', 'LIST_1': 'ABC*'}) == '(LIST_22=0+),(LIST_1=ABC*)'
+
+
+def test_compile_caches_template():
+    builder = QueryBuilder(TABLE)
+    builder.compile({'LIST_22': Range(1, 2)})
+    builder.compile({'LIST_22': Range(3, 4)})
+    builder.compile({'LIST_22': 5})
+    assert len(builder._templates) == 2
+
+
+def test_compile_invalid():
+    builder = QueryBuilder(TABLE)
+    with pytest.raises(RetsClientError):
+        builder.compile({'LIST_999': 1})
+    with pytest.raises(RetsClientError):
+        builder.compile({'LIST_22': datetime(2017, 1, 1)})
+    with pytest.raises(RetsClientError):
+        builder.compile({'LIST_22': Range(None, None)})
+
+
+def test_split():
+    builder = QueryBuilder(TABLE)
+    keys = ['%08i' % i for i in range(500)]
+    queries = builder.split({'LIST_22': Range(1, None), 'LIST_1': keys}, max_length=500)
+
+    assert len(queries) > 1
+    assert all(len(quote_plus(query)) <= 500 for query in queries)
+    assert all(query.startswith('(LIST_22=1+),(LIST_1=') for query in queries)
+    split_keys = [key for query in queries for key in query[len('(LIST_22=1+),(LIST_1='):-1].split(',')]
+    assert split_keys == keys
+
+
+def test_split_short_query():
+    builder = QueryBuilder(TABLE)
+    assert builder.split({'LIST_1': ['A', 'B']}) == ('(LIST_1=A,B)',)
+
+
+def test_split_without_list():
+    builder = QueryBuilder(TABLE)
+    with pytest.raises(RetsClientError):
+        builder.split({'LIST_1': 'A' * 100}, max_length=50)
@@ -1,7 +1,12 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, call
 
+from requests import Request
+
 from rets.http.client import (
-    RetsHttpClient
+    RetsHttpClient,
+    _SharedNonceDigestAuth,
 )
 
 
@@ -33,3 +38,62 @@ def test_rets_ua_authorization_default():
 
     assert client._session.post.called
     assert 'RETS-UA-Authorization' in client._session.post.call_args_list[0][1]['headers']
+
+
+def test_rets_ua_authorization_cached():
+    client = RetsHttpClient(login_url='test.url', user_agent='agent', user_agent_password='secret')
+    digest = client._user_agent_auth_digest()
+    assert client._user_agent_auth_digest() == digest
+
+    client._rets_session_id = 'session'
+    assert client._user_agent_auth_digest() != digest
+
+    client._rets_session_id = ''
+    assert client._user_agent_auth_digest() == digest
+
+
+def _challenge(auth: _SharedNonceDigestAuth, nonce: str) -> str:
+    """ Sends a request that the server answers with a 401 challenge, and returns the header of the retry. """
+    request = auth(Request('POST', 'http://rets.server/Search').prepare())
+    response = MagicMock(status_code=401, request=request, raw=None)
+    response.headers = {'www-authenticate': 'Digest realm="rets", nonce="%s", qop="auth"' % nonce}
+    auth.handle_401(response)
+    return response.connection.send.call_args[0][0].headers['Authorization']
+
+
+def _authenticate(auth: _SharedNonceDigestAuth) -> str:
+    return auth(Request('POST', 'http://rets.server/Search').prepare()).headers.get('Authorization')
+
+
+def test_shared_nonce_digest_auth():
+    auth = _SharedNonceDigestAuth('user', 'pass')
+    assert 'nc=00000001' in _challenge(auth, 'abc')
+
+    headers = []
+
+    def authenticate_in_new_thread():
+        headers.append(_authenticate(auth))
+
+    thread = threading.Thread(target=authenticate_in_new_thread)
+    thread.start()
+    thread.join()
+
+    assert 'nonce="abc"' in headers[0]
+    assert 'nc=00000002' in headers[0]
+
+
+def test_shared_nonce_digest_auth_rechallenge():
+    auth = _SharedNonceDigestAuth('user', 'pass')
+    # Every step of a thread runs on the single worker thread of its executor
+    with ThreadPoolExecutor(1) as first, ThreadPoolExecutor(1) as second:
+        assert 'nonce="abc"' in first.submit(_challenge, auth, 'abc').result()
+        assert 'nonce="abc"' in second.submit(_authenticate, auth).result()
+
+        # The server rejects the nonce as stale and challenges the first thread again
+        assert 'nc=00000001' in first.submit(_challenge, auth, 'def').result()
+
+        # The second thread still holds the old challenge, but must not bring it back
+        header = second.submit(_authenticate, auth).result()
+        assert 'nonce="def"' in header and 'nc=00000002' in header
+        header = first.submit(_authenticate, auth).result()
+        assert 'nonce="def"' in header and 'nc=00000003' in header
@@ -0,0 +1,206 @@
+from collections import OrderedDict
+from unittest.mock import MagicMock
+
+import pytest
+
+from rets.client.hash_store import MemoryHashStore
+from rets.client.resource_class import ResourceClass
+from rets.client.tuning import PageSizer
+from rets.errors import RetsClientError
+from rets.http.data import HashedSearchResult
+from tests.utils import make_compact_response, make_response
+
+TABLE = ({
+    'SystemName': 'LIST_1',
+    'DataType': 'Character',
+}, {
+    'SystemName': 'LIST_22',
+    'DataType': 'Int',
+})
+
+
+@pytest.fixture
+def resource_class():
+    resource = MagicMock()
+    resource.name = 'Property'
+    resource.key_field = 'LIST_1'
+    http = MagicMock()
+    http.response_encoding = None
+    return ResourceClass(resource, {'ClassName': 'A', '_table': TABLE}, http)
+
+
+def _search_result(*rows):
+    return HashedSearchResult(
+        count=len(rows),
+        max_rows=False,
+        data=tuple(OrderedDict((('LIST_1', key), ('LIST_22', price))) for key, price, _ in rows),
+        row_hashes=tuple(hash_ for _, _, hash_ in rows),
+    )
+
+
+def test_search_hash_store_skips_unchanged(resource_class):
+    hash_store = MemoryHashStore({'1': 'a', '2': 'b'})
+    resource_class._http.search.return_value = _search_result(('1', '100', 'a'), ('2', '200', 'c'), ('3', '300', 'd'))
+
+    result = resource_class.search('(LIST_22=0+)', hash_store=hash_store)
+
+    assert result.count == 3
+    assert [record.data for record in result.data] == [
+        {'LIST_1': '2', 'LIST_22': 200},
+        {'LIST_1': '3', 'LIST_22': 300},
+    ]
+    # The hashes are only saved once the caller commits the result
+    assert hash_store.get_many(('1', '2', '3')) == {'1': 'a', '2': 'b'}
+    assert result.pending_hashes == {'2': 'c', '3': 'd'}
+    # The hashes are not fields, so the result unpacks like any other
+    assert len(result) == 3
+    hash_store.commit(result)
+    assert hash_store.get_many(('1', '2', '3')) == {'1': 'a', '2': 'c', '3': 'd'}
+    assert resource_class._http.search.call_args[1]['hash_records'] is True
+
+    # Results that were not filtered have nothing to commit
+    hash_store.commit(resource_class.search('(LIST_22=0+)'))
+    assert len(hash_store) == 3
+
+
+def test_search_hash_store_requires_key_field(resource_class):
+    with pytest.raises(RetsClientError):
+        resource_class.search('(LIST_22=0+)', fields=['LIST_22'], hash_store=MemoryHashStore())
+
+
+def test_search_pages(resource_class):
+    resource_class._http.search.side_effect = [
+        _search_result(('1', '100', 'a'), ('2', '200', 'b')),
+        _search_result(('3', '300', 'c')),
+    ]
+
+    pages = list(resource_class.search_pages('(LIST_22=0+)', page_size=2))
+
+    assert [[record.data['LIST_1'] for record in page.data] for page in pages] == [['1', '2'], ['3']]
+    calls = resource_class._http.search.call_args_list
+    assert [(c[1]['offset'], c[1]['limit'], c[1]['count']) for c in calls] == [(1, 2, 1), (3, 2, 0)]
+
+
+def test_search_raw_pages_max_rows(resource_class):
+    # The server caps the response below the requested limit
+    resource_class._http.search.side_effect = [
+        _search_result(('1', '100', 'a'))._replace(max_rows=True),
+        _search_result(),
+    ]
+
+    pages = list(resource_class.search_raw_pages('(LIST_22=0+)', page_size=10))
+
+    assert [len(page.data) for page in pages] == [1, 0]
+    assert resource_class._http.search.call_args[1]['offset'] == 2
+
+
+def test_search_pages_page_sizer(resource_class):
+    resource_class._http.search.side_effect = [
+        _search_result(('1', '100', 'a'), ('2', '200', 'b'))._replace(max_rows=True),
+        _search_result(('3', '300', 'c'), ('4', '400', 'd'))._replace(max_rows=True),
+        _search_result(('5', '500', 'e')),
+    ]
+    sizer = PageSizer(initial=4, minimum=1)
+
+    pages = list(resource_class.search_pages('(LIST_22=0+)', page_size=sizer))
+
+    assert [len(page.data) for page in pages] == [2, 2, 1]
+    calls = resource_class._http.search.call_args_list
+    assert [(c[1]['offset'], c[1]['limit']) for c in calls] == [(1, 4), (3, 2), (5, 2)]
+    assert sizer.max_rows(resource_class) == 2
+
+
+def test_search_parallel(resource_class):
+    body = b'<RETS ReplyCode="0" ReplyText="Success"><COLUMNS>\tLIST_1\tLIST_22\t</COLUMNS>' + \
+        b''.join(b'<DATA>\t%i\t%i\t</DATA>' % (i, i * 100) for i in range(5)) + b'</RETS>'
+    resource_class._http.search_stream.return_value = make_response(200, body)
+
+    records = list(resource_class.search_parallel('(LIST_22=0+)', processes=2, batch_size=2))
+
+    assert [record.data for record in records] == [{'LIST_1': str(i), 'LIST_22': i * 100} for i in range(5)]
+
+
+def test_search_raw_batch_pages(resource_class):
+    columns = ('LIST_1', 'LIST_22')
+    resource_class._http.search_stream.side_effect = [
+        make_compact_response(columns, (('1', '100'), ('2', '200'), ('3', '300'))),
+        # The server truncated the page below the limit
+        make_compact_response(columns, (('4', '400'),), max_rows=True),
+        make_compact_response(columns, ()),
+    ]
+
+    batches = list(resource_class.search_raw_batch_pages('(LIST_22=0+)', page_size=3, batch_size=2))
+
+    assert [batch.lines for batch in batches] == [['\t1\t100\t', '\t2\t200\t'], ['\t3\t300\t'], ['\t4\t400\t']]
+    calls = resource_class._http.search_stream.call_args_list
+    assert [(c[1]['offset'], c[1]['limit']) for c in calls] == [(1, 3), (4, 3), (5, 3)]
+
+
+def test_search_standard_xml(resource_class):
+    body = b'<RETS ReplyCode="0" ReplyText="Success"><REData>' + \
+        b''.join(b'<Listing><ListingID>%i</ListingID><ListPrice>%i</ListPrice></Listing>' % (i, i * 100)
+                 for i in range(3)) + b'</REData></RETS>'
+    resource_class._http.search_stream.return_value = make_response(200, body)
+
+    records = list(resource_class.search_standard_xml(
+        '(LIST_22=0+)',
+        'Listing',
+        mapping={'ListingID': 'LIST_1', 'ListPrice': 'LIST_22'},
+        batch_size=2,
+    ))
+
+    assert [record.data for record in records] == [{'LIST_1': str(i), 'LIST_22': i * 100} for i in range(3)]
+    assert resource_class._http.search_stream.call_args[1]['format_'] == 'STANDARD-XML'
+
+
+def test_search_standard_xml_unmapped(resource_class):
+    body = b'<RETS ReplyCode="0" ReplyText="Success"><REData>' \
+        b'<Listing><LIST_1>1</LIST_1></Listing>' \
+        b'<Listing><LIST_1>2</LIST_1><LIST_22>200</LIST_22></Listing>' \
+        b'</REData></RETS>'
+    resource_class._http.search_stream.side_effect = lambda **kwargs: make_response(200, body)
+
+    # An empty mapping matches the leaves against the table like the default one
+    records = list(resource_class.search_standard_xml('(LIST_22=0+)', 'Listing', mapping={}))
+    assert [record.data for record in records] == [{'LIST_1': '1', 'LIST_22': None}, {'LIST_1': '2', 'LIST_22': 200}]
+
+    # Without a table, every leaf is kept, and records missing one have an empty value for it
+    resource_class._table = ()
+    records = list(resource_class.search_standard_xml('(LIST_22=0+)', 'Listing'))
+    assert [record.data for record in records] == [{'LIST_1': '1', 'LIST_22': None}, {'LIST_1': '2', 'LIST_22': '200'}]
+
+
+def test_count_cached(resource_class):
+    resource_class._http.count.side_effect = [10, 11, 12]
+
+    assert resource_class.count('(LIST_22=0+)') == 10
+    assert resource_class.count('(LIST_22=0+)') == 10
+    assert resource_class.count('(LIST_22=0+)', watermark='2017-08-02T00:00:00') == 11
+    assert resource_class.count('(LIST_22=0+)', ttl=0) == 12
+    assert resource_class._http.count.call_count == 3
+
+
+def test_count_cache_expiry_and_unhashable_arguments(resource_class):
+    resource_class._http.count.side_effect = [10, 11, 12]
+
+    assert resource_class.count('(LIST_22=0+)') == 10
+    # A count with a shorter ttl does not expire the counts cached for longer
+    assert resource_class.count('(LIST_22=0+)', watermark=['2017-08-02'], ttl=0) == 11
+    assert resource_class.count('(LIST_22=0+)') == 10
+    assert resource_class.count('(LIST_22=0+)', restricted_indicator={'value': '****'}) == 12
+    assert resource_class.count('(LIST_22=0+)', restricted_indicator={'value': '****'}) == 12
+    assert resource_class._http.count.call_count == 3
+
+
+def test_search_split(resource_class):
+    resource_class._http.search.side_effect = [
+        _search_result(('1', '100', 'a')),
+        _search_result(('2', '200', 'b')),
+    ]
+
+    result = resource_class.search_split({'LIST_1': ['1', '2']}, max_length=len('%28LIST_1%3D1%29'))
+
+    assert result.count == 2
+    assert [record.data['LIST_1'] for record in result.data] == ['1', '2']
+    queries = [call[1]['query'] for call in resource_class._http.search.call_args_list]
+    assert queries == ['(LIST_1=1)', '(LIST_1=2)']
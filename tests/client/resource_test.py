@@ -0,0 +1,88 @@
+from unittest.mock import MagicMock
+
+from rets.client.metadata import MetadataDiff, diff_classes
+from rets.client.resource import Resource
+from rets.http import Metadata
+from rets.http.data import LookupTypeMetadata
+
+
+def test_lookups():
+    http = MagicMock()
+    http.get_metadata.return_value = (
+        LookupTypeMetadata('LOOKUP_TYPE', 'Property', None, (
+            {'Value': 'A', 'ShortValue': 'Act', 'LongValue': 'Active'},
+            {'Value': 'S', 'ShortValue': 'Sld', 'LongValue': 'Sold'},
+        ), 'STATUS'),
+        LookupTypeMetadata('LOOKUP_TYPE', 'Property', None, (
+            {'Value': 'P', 'ShortValue': 'Pool', 'LongValue': 'Pool'},
+        ), 'FEATURES'),
+    )
+    resource = Resource({'ResourceID': 'Property', 'KeyField': 'LIST_1'}, http)
+
+    assert resource.lookups == {
+        'STATUS': {'A': 'Active', 'S': 'Sold'},
+        'FEATURES': {'P': 'Pool'},
+    }
+    # The lookups are cached in the metadata
+    assert resource.lookups is resource.lookups
+    assert http.get_metadata.call_count == 1
+    http.get_metadata.assert_called_with('lookup_type', metadata_id='Property:*')
+    assert Resource(resource.metadata, MagicMock()).lookups == resource.lookups
+
+
+def test_empty_lookups_are_cached():
+    http = MagicMock()
+    http.get_metadata.return_value = ()
+    resource = Resource({'ResourceID': 'Property', 'KeyField': 'LIST_1'}, http)
+
+    assert resource.lookups == {}
+    assert resource.lookups == {}
+    restored = Resource(resource.metadata, http)
+    assert restored.lookups == {}
+    assert http.get_metadata.call_count == 1
+
+
+def test_refresh_classes():
+    http = MagicMock()
+    resource = Resource({
+        'ResourceID': 'Property',
+        'KeyField': 'LIST_1',
+        '_classes': (
+            {'ClassName': 'A', 'TableVersion': '1.0', '_table': ({'SystemName': 'LIST_1', 'DataType': 'Int'},)},
+            {'ClassName': 'B', 'TableVersion': '1.0', '_table': ({'SystemName': 'LIST_1', 'DataType': 'Int'},)},
+            {'ClassName': 'C', 'TableVersion': '1.0'},
+        ),
+    }, http)
+    class_a, class_b = resource.get_class('A'), resource.get_class('B')
+    class_b.query_builder.compile({'LIST_1': 1})
+    http.get_metadata.return_value = (Metadata('CLASS', 'Property', None, (
+        {'ClassName': 'A', 'TableVersion': '1.0'},
+        {'ClassName': 'B', 'TableVersion': '1.1'},
+        {'ClassName': 'D', 'TableVersion': '1.0'},
+    )),)
+
+    diff = resource.refresh_classes()
+
+    assert diff == MetadataDiff(added=('D',), removed=('C',), changed=('B',))
+    http.get_metadata.assert_called_once_with('class', resource='Property')
+    assert [c.name for c in resource.classes] == ['A', 'B', 'D']
+    assert resource.get_class('A') is class_a
+    assert class_a.table == ({'SystemName': 'LIST_1', 'DataType': 'Int'},)
+    assert resource.get_class('B') is class_b
+    assert class_b.metadata == {'ClassName': 'B', 'TableVersion': '1.1'}
+    assert class_b._query_builder is None
+
+    http.get_metadata.return_value = (Metadata('TABLE', 'Property', 'B', (
+        {'SystemName': 'LIST_1', 'DataType': 'Int'},
+        {'SystemName': 'LIST_2', 'DataType': 'Int'},
+    )),)
+    assert class_b.fields == {'LIST_1', 'LIST_2'}
+    http.get_metadata.assert_called_with('table', resource='Property', class_='B')
+
+
+def test_diff_classes_without_versions():
+    assert diff_classes(({'ClassName': 'A'},), ({'ClassName': 'A'},)) == MetadataDiff((), (), ('A',))
+    assert diff_classes(
+        ({'ClassName': 'A', 'TableDate': '2017-01-01'},),
+        ({'ClassName': 'A', 'TableDate': '2017-01-01'},),
+    ) == MetadataDiff((), (), ())
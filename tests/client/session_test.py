@@ -0,0 +1,70 @@
+from unittest.mock import patch
+
+from rets.client.session import SessionBroker
+from rets.http import RetsHttpClient
+
+CAPABILITY_URLS = {'Login': '/rets/Login', 'Search': '/rets/Search'}
+
+
+def _login(self):
+    # Like _http_request, sets the session id from the cookie returned by the server
+    self._session.cookies.set('RETS-Session-ID', 'session-%i' % _login.calls)
+    self._rets_session_id = 'session-%i' % _login.calls
+    _login.calls += 1
+    self._capabilities = dict(CAPABILITY_URLS)
+    return self._capabilities
+
+
+def test_session_broker(tmpdir):
+    _login.calls = 0
+    broker = SessionBroker(str(tmpdir.join('session.json')))
+
+    with patch.object(RetsHttpClient, 'login', _login):
+        first = broker.client('http://rets.server/rets/Login', 'user', 'pass')
+        second = broker.client('http://rets.server/rets/Login', 'user', 'pass')
+
+    assert _login.calls == 1
+    assert second.http.capability_urls == CAPABILITY_URLS
+    assert second.http.cookie_dict == {'RETS-Session-ID': 'session-0'}
+    assert second.http.rets_session_id == first.http.rets_session_id == 'session-0'
+
+    with patch.object(RetsHttpClient, 'login', _login):
+        # The first worker to refresh logs in, the others resume the new session
+        broker.refresh(first)
+        broker.refresh(second)
+
+    assert _login.calls == 2
+    assert first.http.rets_session_id == second.http.rets_session_id == 'session-1'
+
+
+def test_session_broker_max_age(tmpdir):
+    _login.calls = 0
+    broker = SessionBroker(str(tmpdir.join('session.json')), max_age=0)
+
+    with patch.object(RetsHttpClient, 'login', _login):
+        broker.client('http://rets.server/rets/Login', 'user', 'pass')
+        broker.client('http://rets.server/rets/Login', 'user', 'pass')
+
+    assert _login.calls == 2
+
+
+def test_session_broker_without_cookies(tmpdir):
+    calls = []
+
+    def login(self):
+        calls.append(1)
+        self._capabilities = dict(CAPABILITY_URLS)
+        return self._capabilities
+
+    broker = SessionBroker(str(tmpdir.join('session.json')))
+    with patch.object(RetsHttpClient, 'login', login):
+        first = broker.client('http://rets.server/rets/Login', 'user', 'pass')
+        second = broker.client('http://rets.server/rets/Login', 'user', 'pass')
+        assert len(calls) == 1
+
+        # Only the first worker to refresh logs in, although both session ids are empty
+        broker.refresh(first)
+        broker.refresh(second)
+
+    assert len(calls) == 2
+    assert second.http.capability_urls == CAPABILITY_URLS
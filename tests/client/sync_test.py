@@ -0,0 +1,177 @@
+import threading
+from datetime import datetime
+from unittest.mock import MagicMock, call
+
+import pytest
+
+from rets.client.record import Record
+from rets.client.sync import PhotoManifest, PhotoSync, search_with_objects
+from rets.client.tuning import BatchSizer
+from rets.errors import RetsClientError
+from rets.http import Object, SearchResult
+
+
+def _object(key, object_id):
+    return Object('image/jpeg', key, None, object_id, None, False, b'data')
+
+
+def _page(resource_class, *keys):
+    return SearchResult(count=None, max_rows=False, data=tuple(Record(resource_class, {'LIST_1': k}) for k in keys))
+
+
+@pytest.fixture
+def resource_class():
+    resource_class = MagicMock()
+    resource_class.resource.key_field = 'LIST_1'
+    return resource_class
+
+
+def test_search_with_objects_overlaps_pages(resource_class):
+    second_page_searched = threading.Event()
+
+    def search_pages(*args, **kwargs):
+        yield _page(resource_class, '1', '2', '3')
+        second_page_searched.set()
+        yield _page(resource_class, '4')
+
+    def get(resource_keys, **kwargs):
+        # The objects of the first page wait for the search of the next one
+        assert second_page_searched.wait(5)
+        return [_object(key, 1) for key in resource_keys]
+
+    resource_class.search_pages.side_effect = search_pages
+    object_type = MagicMock()
+    object_type.get.side_effect = get
+
+    pages = list(search_with_objects(resource_class, object_type, '(LIST_1=0+)', batch_size=2,
+                                     object_kwargs={'location': True}))
+
+    assert [list(page.objects) for page in pages] == [['1', '2', '3'], ['4']]
+    assert pages[0].objects['3'] == [_object('3', 1)]
+    assert sorted(tuple(call[0][0].items()) for call in object_type.get.call_args_list) == [
+        (('1', '*'), ('2', '*')),
+        (('3', '*'),),
+        (('4', '*'),),
+    ]
+    assert object_type.get.call_args[1] == {'location': True}
+
+
+def test_search_with_objects_ids(resource_class):
+    resource_class.search_pages.return_value = iter([_page(resource_class, '1', '2')])
+    object_type = MagicMock()
+    object_type.get.return_value = [_object('1', 2)]
+
+    pages = list(search_with_objects(resource_class, object_type, '(LIST_1=0+)',
+                                     object_ids=lambda record: [2] if record.data['LIST_1'] == '1' else None))
+
+    object_type.get.assert_called_once_with({'1': [2]})
+    assert pages[0].objects == {'1': [_object('1', 2)]}
+
+
+def test_search_with_objects_batch_sizer(resource_class):
+    resource_class.search_pages.return_value = iter([_page(resource_class, '1', '2', '3'), _page(resource_class, '4')])
+    object_type = MagicMock()
+    object_type.get.side_effect = lambda resource_keys, **kwargs: [_object(key, 1) for key in resource_keys]
+    sizer = BatchSizer(initial=2, increase=1)
+
+    pages = list(search_with_objects(resource_class, object_type, '(LIST_1=0+)', batch_size=sizer, threads=1))
+
+    assert [list(page.objects) for page in pages] == [['1', '2', '3'], ['4']]
+    assert [len(call[0][0]) for call in object_type.get.call_args_list] == [2, 1, 1]
+    assert sizer.size == 3
+
+
+def test_search_with_objects_search_error(resource_class):
+    def search_pages(*args, **kwargs):
+        yield _page(resource_class, '1')
+        raise RetsClientError('search failed')
+
+    resource_class.search_pages.side_effect = search_pages
+    object_type = MagicMock()
+    object_type.get.return_value = []
+
+    pages = search_with_objects(resource_class, object_type, '(LIST_1=0+)')
+    assert next(pages).objects == {'1': []}
+    with pytest.raises(RetsClientError):
+        next(pages)
+
+
+def test_search_with_objects_requires_key_field(resource_class):
+    with pytest.raises(RetsClientError):
+        next(search_with_objects(resource_class, MagicMock(), '(LIST_1=0+)', fields=['LIST_2']))
+
+
+def test_photo_sync(resource_class, tmpdir):
+    path = str(tmpdir.join('manifest.json'))
+    manifest = PhotoManifest(path)
+    manifest.set('1', '2017-01-01 00:00:00', 2, {'1': 'front', '2': 'back'})
+    manifest.set('2', '2017-01-01 00:00:00', 2, {'1': 'front', '2': 'back'})
+    manifest.set('3', '2017-01-01 00:00:00', 1, {'1': 'front'})
+
+    def listing(key, count, timestamp):
+        return Record(resource_class, {'LIST_1': key, 'PhotoCount': count, 'PhotoModificationTimestamp': timestamp})
+
+    resource_class.search_pages.return_value = iter([SearchResult(count=5, max_rows=False, data=(
+        listing('1', 2, datetime(2017, 1, 1)),
+        listing('2', 3, datetime(2017, 1, 1)),
+        listing('3', 1, datetime(2017, 2, 1)),
+        listing('4', 1, datetime(2017, 2, 1)),
+        listing('5', 0, datetime(2017, 2, 1)),
+    ))])
+    object_type = MagicMock()
+    object_type.get.return_value = [
+        Object('image/jpeg', '2', 'side', 3, None, False, b''),
+        Object('image/jpeg', '3', 'new front', 1, None, False, b''),
+        Object('image/jpeg', '4', 'front', 1, None, False, b''),
+    ]
+
+    pages = list(PhotoSync(resource_class, object_type, manifest).sync('(LIST_1=0+)', fields=['LIST_1']))
+
+    object_type.get.assert_called_once_with({'2': [3], '3': '*', '4': '*'})
+    # Cached photos of listings whose photos changed are invalidated before they are requested
+    assert object_type.invalidate.call_args_list == [call(['3']), call(['4'])]
+    assert resource_class.search_pages.call_args[0][1] == ('LIST_1', 'PhotoCount', 'PhotoModificationTimestamp')
+    assert list(pages[0].objects) == ['2', '3', '4']
+
+    saved = PhotoManifest(path)
+    assert len(saved) == 5
+    assert saved.get('1')['objects'] == {'1': 'front', '2': 'back'}
+    assert saved.get('2') == {'timestamp': '2017-01-01 00:00:00', 'count': 3,
+                              'objects': {'1': 'front', '2': 'back', '3': 'side'}}
+    assert saved.get('3')['objects'] == {'1': 'new front'}
+    assert saved.get('5') == {'timestamp': '2017-02-01 00:00:00', 'count': 0, 'objects': {}}
+
+
+def test_photo_sync_saves_after_the_caller(resource_class, tmpdir):
+    path = str(tmpdir.join('manifest.json'))
+    resource_class.search_pages.return_value = iter([SearchResult(count=1, max_rows=False, data=(
+        Record(resource_class, {'LIST_1': '1', 'PhotoCount': 1, 'PhotoModificationTimestamp': '2017'}),
+    ))])
+    object_type = MagicMock()
+    object_type.get.return_value = [_object('1', 1)]
+
+    pages = PhotoSync(resource_class, object_type, PhotoManifest(path)).sync('(LIST_1=0+)')
+    next(pages)
+    # The caller failed to store the photos of the page
+    pages.close()
+    assert len(PhotoManifest(path)) == 0
+
+
+def test_photo_sync_requests_missing_photos_again(resource_class):
+    manifest = PhotoManifest()
+
+    def sync(*objects):
+        resource_class.search_pages.return_value = iter([SearchResult(count=2, max_rows=False, data=(
+            Record(resource_class, {'LIST_1': '1', 'PhotoCount': 3, 'PhotoModificationTimestamp': '2017'}),
+            Record(resource_class, {'LIST_1': '2', 'PhotoCount': 2, 'PhotoModificationTimestamp': '2017'}),
+        ))])
+        object_type = MagicMock()
+        object_type.get.return_value = list(objects)
+        list(PhotoSync(resource_class, object_type, manifest).sync('(LIST_1=0+)'))
+        return object_type.get
+
+    # The server returned no photos for 2, and only some of those of 1
+    sync(_object('1', 1), _object('1', 3))
+    sync(_object('1', 2)).assert_called_once_with({'1': [2], '2': '*'})
+    assert sorted(manifest.get('1')['objects']) == ['1', '2', '3']
+    sync().assert_called_once_with({'2': '*'})
@@ -0,0 +1,101 @@
+from unittest.mock import MagicMock, Mock
+
+import pytest
+import requests
+
+from rets.client.tuning import BatchSizer, JsonTuningStore, MemoryTuningStore, PageSizer
+from rets.errors import RetsApiError
+from rets.http.data import Object
+
+
+def test_batch_sizer_aimd():
+    sizer = BatchSizer(initial=10, maximum=13, target_seconds=5, increase=2)
+    sizer.record(10, 1000, 1.0)
+    assert sizer.size == 12
+    # Batches smaller than the size don't grow it
+    sizer.record(3, 1000, 1.0)
+    assert sizer.size == 12
+    sizer.record(12, 1000, 1.0)
+    assert sizer.size == 13
+
+    # A drop in throughput holds the size
+    sizer.record(13, 100, 1.0)
+    assert sizer.size == 13
+    sizer.record(13, 1000, 6.0)
+    assert sizer.size == 6
+    sizer.record(6, 0, 1.0, error=True)
+    assert sizer.size == 3
+    assert sizer.error_rate == pytest.approx(0.2)
+    # A high recent error rate holds the size
+    sizer.record(3, 1000, 1.0)
+    assert sizer.size == 3
+
+
+def test_batch_sizer_get_splits_failed_batches():
+    object_type = MagicMock()
+
+    def get(resource_keys, **kwargs):
+        if len(resource_keys) > 1:
+            raise requests.HTTPError(response=MagicMock(status_code=414))
+        return [Object('image/jpeg', key, None, '1', None, False, b'data') for key in resource_keys]
+
+    object_type.get.side_effect = get
+    sizer = BatchSizer(initial=4)
+    objects = sizer.get(object_type, {'1': '*', '2': '*', '3': 0}, location=False)
+    assert [o.content_id for o in objects] == ['1', '2', '3']
+    assert object_type.get.call_args_list[-1][0][0] == {'3': 0}
+    assert object_type.get.call_args[1] == {'location': False}
+    # The failures of the halves count as a single decrease
+    assert sizer.size == 2
+    assert sizer.error_rate == pytest.approx(0.2)
+
+
+def test_batch_sizer_get_raises_other_errors():
+    object_type = MagicMock()
+    object_type.get.side_effect = RetsApiError(20701, 'Not logged in', '')
+    sizer = BatchSizer(initial=4)
+    with pytest.raises(RetsApiError):
+        sizer.get(object_type, {'1': '*', '2': '*'})
+    assert object_type.get.call_count == 1
+    assert (sizer.size, sizer.error_rate) == (4, 0)
+
+
+def test_batch_sizer_store(tmpdir):
+    path = str(tmpdir.join('tuning.json'))
+    with BatchSizer(JsonTuningStore(path), 'http://rets.server', initial=10) as sizer:
+        sizer.record(10, 1000, 1.0)
+    assert JsonTuningStore(path).get('http://rets.server') == {'object_batch_size': 12}
+    assert BatchSizer(JsonTuningStore(path), 'http://rets.server').size == 12
+    assert BatchSizer(MemoryTuningStore({'http://rets.server': {'object_batch_size': 900}}), 'http://rets.server',
+                      maximum=50).size == 50
+
+
+def _resource_class(resource: str, class_: str) -> Mock:
+    resource_class = Mock()
+    resource_class.resource.name = resource
+    resource_class.name = class_
+    return resource_class
+
+
+def test_page_sizer(tmpdir):
+    listings = _resource_class('Property', 'A')
+    agents = _resource_class('Agent', 'Agent')
+    path = str(tmpdir.join('tuning.json'))
+
+    with PageSizer(JsonTuningStore(path), 'http://rets.server', initial=1000, target_seconds=10) as sizer:
+        # Fast full pages double the size, slow ones halve it
+        sizer.record(listings, 1000, 1000, False, 1.0)
+        assert sizer.size(listings) == 2000
+        sizer.record(listings, 2000, 2000, False, 40.0)
+        assert sizer.size(listings) == 1000
+        # A fast partial page does not grow it
+        sizer.record(listings, 1000, 10, False, 1.0)
+        assert sizer.size(listings) == 1000
+        # The server caps the responses of the class
+        sizer.record(listings, 1000, 500, True, 5.0)
+        assert (sizer.max_rows(listings), sizer.size(listings)) == (500, 500)
+        assert sizer.size(agents) == 1000
+
+    stored = JsonTuningStore(path)
+    assert stored.get('http://rets.server:Property:A') == {'page_size': 1000, 'max_rows': 500}
+    assert PageSizer(stored, 'http://rets.server').size(listings) == 500
@@ -0,0 +1,80 @@
+import gzip
+import io
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from rets.client.resource_class import ResourceClass
+from rets.export import export, main, open_output
+from tests.utils import make_compact_response
+
+TABLE = ({
+    'SystemName': 'LIST_1',
+    'DataType': 'Character',
+}, {
+    'SystemName': 'LIST_22',
+    'DataType': 'Int',
+}, {
+    'SystemName': 'LIST_9',
+    'DataType': 'Character',
+    'Interpretation': 'LookupMulti',
+})
+
+
+@pytest.fixture
+def resource_class():
+    resource_class = ResourceClass(MagicMock(), {'ClassName': 'A', '_table': TABLE}, MagicMock())
+    resource_class._http.response_encoding = None
+    resource_class._http.search_stream.side_effect = lambda **kwargs: make_compact_response(
+        ('LIST_1', 'LIST_22', 'LIST_9'),
+        (('1', '100', 'a,b'), ('2', '', '')),
+    )
+    return resource_class
+
+
+def test_export_csv(resource_class):
+    out = io.StringIO()
+    assert export(resource_class, out, ['(LIST_22=0+)', '(LIST_22=0-)'], page_size=10) == 4
+    assert out.getvalue().splitlines() == [
+        'LIST_1,LIST_22,LIST_9',
+        '1,100,"a,b"',
+        '2,,',
+        '1,100,"a,b"',
+        '2,,',
+    ]
+
+
+def test_export_ndjson_decoded(resource_class):
+    out = io.StringIO()
+    export(resource_class, out, ['(LIST_22=0+)'], output_format='ndjson', page_size=10, decode=True)
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == [
+        {'LIST_1': '1', 'LIST_22': 100, 'LIST_9': ['a', 'b']},
+        {'LIST_1': '2', 'LIST_22': None, 'LIST_9': None},
+    ]
+
+
+def test_open_output_compression(tmpdir):
+    path = str(tmpdir.join('listings.csv.gz'))
+    with open_output(path) as out:
+        out.write('LIST_1\n')
+    with gzip.open(path, 'rt') as f:
+        assert f.read() == 'LIST_1\n'
+
+
+def test_open_output_leaves_stdout_open(monkeypatch):
+    stdout = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+    monkeypatch.setattr('sys.stdout', stdout)
+    with open_output('-') as out:
+        out.write('LIST_1\n')
+    assert not stdout.closed
+    assert stdout.buffer.getvalue() == b'LIST_1\n'
+
+
+def test_main_keeps_export_error_on_logout_failure():
+    with patch('rets.export.RetsClient') as client:
+        client.return_value.get_resource.side_effect = KeyError('Property')
+        client.return_value.http.logout.side_effect = ConnectionError
+        with pytest.raises(KeyError):
+            main(['--login-url', 'http://rets.server/rets/Login', '--resource', 'Property', '--class', 'A',
+                  '--query', '(LIST_22=0+)', '--quiet'])
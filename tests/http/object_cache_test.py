@@ -0,0 +1,125 @@
+from unittest.mock import MagicMock
+
+from rets.http import ObjectCache, RetsHttpClient, Transport
+from rets.http.data import Object
+from tests.utils import make_response
+
+
+def _object(key: str, object_id: str, data: bytes, preferred: bool = False) -> Object:
+    return Object('image/jpeg', key, None, object_id, None, preferred, data)
+
+
+def test_get_object_caches_by_object_id(tmpdir):
+    cache = ObjectCache(str(tmpdir))
+    fetch = MagicMock(return_value=(_object('1', '1', b'a'), _object('1', '2', b'b')))
+
+    objects = cache.get_object('Property', 'Photo', {'1': [1, 2]}, fetch)
+    fetch.assert_called_once_with({'1': [1, 2]})
+    assert [o.data for o in objects] == [b'a', b'b']
+
+    fetch.reset_mock()
+    fetch.return_value = (_object('2', '1', b'c'),)
+    objects = cache.get_object('Property', 'Photo', {'1': [2], '2': [1]}, fetch)
+    fetch.assert_called_once_with({'2': [1]})
+    assert [(o.content_id, o.object_id, bytes(o.data)) for o in objects] == [('1', '2', b'b'), ('2', '1', b'c')]
+    assert isinstance(objects[0].data, memoryview)
+
+
+def test_get_object_all_and_preferred(tmpdir):
+    cache = ObjectCache(str(tmpdir))
+    fetch = MagicMock(return_value=(_object('1', '1', b'a', preferred=True), _object('1', '2', b'b')))
+    cache.get_object('Property', 'Photo', '1', fetch)
+
+    fetch.reset_mock()
+    assert [o.object_id for o in cache.get_object('Property', 'Photo', ['1'], fetch)] == ['1', '2']
+    preferred, = cache.get_object('Property', 'Photo', {'1': 0}, fetch)
+    assert (preferred.object_id, preferred.preferred, preferred.data) == ('1', True, b'a')
+    # Another object type is cached separately
+    cache.get_object('Property', 'LargePhoto', {'1': 0}, fetch)
+    fetch.assert_called_once_with({'1': 0})
+
+
+def test_content_addressed_lru_eviction(tmpdir):
+    cache = ObjectCache(str(tmpdir), max_bytes=4)
+    cache.get_object('Property', 'Photo', {'1': [1]}, lambda missing: (_object('1', '1', b'aa'),))
+    # Identical contents are stored once
+    cache.get_object('Property', 'Photo', {'2': [1]}, lambda missing: (_object('2', '1', b'aa'),))
+    assert cache.size == 2
+    cache.get_object('Property', 'Photo', {'1': [1]}, MagicMock())
+
+    cache.get_object('Property', 'Photo', {'3': [1]}, lambda missing: (_object('3', '1', b'ccc'),))
+    assert cache.size == 3
+
+    fetch = MagicMock(return_value=())
+    cache.get_object('Property', 'Photo', {'3': [1]}, fetch)
+    fetch.assert_not_called()
+    cache.get_object('Property', 'Photo', {'1': [1]}, fetch)
+    fetch.assert_called_once_with({'1': [1]})
+
+
+def test_eviction_in_batches_keeps_the_size(tmpdir, monkeypatch):
+    monkeypatch.setattr('rets.http.object_cache._EVICT_BATCH_SIZE', 1)
+    cache = ObjectCache(str(tmpdir), max_bytes=3)
+    for key in ('1', '2', '3'):
+        cache.get_object('Property', 'Photo', {key: [1]}, lambda missing: (_object(key, '1', key.encode()),))
+    assert cache.size == 3
+
+    cache.get_object('Property', 'Photo', {'4': [1]}, lambda missing: (_object('4', '1', b'ddd'),))
+    assert cache.size == 3
+    assert ObjectCache(str(tmpdir)).size == 3
+    fetch = MagicMock(return_value=())
+    cache.get_object('Property', 'Photo', {'3': [1]}, fetch)
+    fetch.assert_called_once_with({'3': [1]})
+
+    cache.clear()
+    assert cache.size == 0
+
+
+def test_invalidate_and_ttl(tmpdir):
+    cache = ObjectCache(str(tmpdir))
+    cache.get_object('Property', 'Photo', ['1', '2'],
+                     lambda missing: (_object('1', '1', b'a'), _object('2', '1', b'b')))
+
+    cache.invalidate('Property', 'Photo', ['1'])
+    fetch = MagicMock(return_value=(_object('1', '1', b'c'),))
+    objects = cache.get_object('Property', 'Photo', ['1', '2'], fetch)
+    fetch.assert_called_once_with({'1': '*'})
+    assert [bytes(o.data) for o in objects] == [b'c', b'b']
+    assert cache.size == 2
+
+    expiring = ObjectCache(str(tmpdir), ttl=0)
+    fetch = MagicMock(return_value=())
+    expiring.get_object('Property', 'Photo', {'2': [1]}, fetch)
+    fetch.assert_called_once_with({'2': [1]})
+
+
+def test_empty_sets_are_not_cached(tmpdir):
+    cache = ObjectCache(str(tmpdir))
+    cache.get_object('Property', 'Photo', '1', lambda missing: ())
+    fetch = MagicMock(return_value=(_object('1', '1', b'a'),))
+    assert len(cache.get_object('Property', 'Photo', '1', fetch)) == 1
+    fetch.assert_called_once_with({'1': '*'})
+
+
+def test_shared_between_instances(tmpdir):
+    ObjectCache(str(tmpdir)).get_object('Property', 'Photo', {'1': [1]}, lambda missing: (_object('1', '1', b'a'),))
+    fetch = MagicMock()
+    objects = ObjectCache(str(tmpdir)).get_object('Property', 'Photo', {'1': [1]}, fetch)
+    assert [bytes(o.data) for o in objects] == [b'a']
+    fetch.assert_not_called()
+
+
+def test_http_client_get_object(tmpdir):
+    transport = MagicMock(spec=Transport)
+    transport.send.return_value = make_response(200, b'a', {
+        'content-type': 'image/jpeg',
+        'content-id': '1',
+        'object-id': '1',
+    })
+    client = RetsHttpClient('http://rets.server/rets/Login', capability_urls={'GetObject': '/rets/GetObject'},
+                            transport=transport, object_cache=ObjectCache(str(tmpdir)))
+
+    assert client.get_object('Property', 'Photo', {'1': [1]})[0].data == b'a'
+    assert client.get_object('Property', 'Photo', {'1': [1]})[0].data == b'a'
+    client.get_object('Property', 'Photo', {'1': [1]}, location=True)
+    assert transport.send.call_count == 2
@@ -0,0 +1,24 @@
+from rets.http.parsers.parse import parse_metadata
+from tests.utils import make_response
+
+METADATA_BODY = b'''<RETS ReplyCode="0" ReplyText="Success">
+<METADATA-LOOKUP_TYPE Resource="Property" Lookup="STATUS" Version="1.0" Date="2017-01-01T00:00:00Z">
+<COLUMNS>\tValue\tLongValue\t</COLUMNS>
+<DATA>\tA\tActive\t</DATA>
+</METADATA-LOOKUP_TYPE>
+<METADATA-CLASS Resource="Property" Version="1.0" Date="2017-01-01T00:00:00Z">
+<COLUMNS>\tClassName\t</COLUMNS>
+<DATA>\tA\t</DATA>
+</METADATA-CLASS>
+</RETS>
+'''
+
+
+def test_parse_metadata_lookup_type():
+    lookup_type, class_ = parse_metadata(make_response(200, METADATA_BODY))
+
+    type_, resource, _, data = lookup_type
+    assert (type_, resource, lookup_type.lookup) == ('LOOKUP_TYPE', 'Property', 'STATUS')
+    assert data == ({'Value': 'A', 'LongValue': 'Active'},)
+    assert len(class_) == 4
+    assert not hasattr(class_, 'lookup')
@@ -0,0 +1,123 @@
+from collections import OrderedDict
+
+import pytest
+
+from rets.errors import RetsApiError
+from rets.http import SearchBatch
+from rets.http.parsers import iter_search_batches, iter_standard_xml, parse_count, parse_search, split_data_line
+from tests.utils import make_response
+
+SEARCH_BODY = b'''<?xml version="1.0" ?>
+<RETS ReplyCode="0" ReplyText="Operation Successful">
+<COUNT Records="2" />
+<DELIMITER value="09"/>
+<COLUMNS>\tLIST_1\tLIST_105\t</COLUMNS>
+<DATA>\t1\t5489015\t</DATA>
+<DATA>\t2\t5497756\t</DATA>
+</RETS>
+'''
+
+
+def test_parse_search():
+    result = parse_search(make_response(200, SEARCH_BODY))
+
+    assert result.count == 2
+    assert result.max_rows is False
+    assert result.data == (
+        OrderedDict((('LIST_1', '1'), ('LIST_105', '5489015'))),
+        OrderedDict((('LIST_1', '2'), ('LIST_105', '5497756'))),
+    )
+    assert not hasattr(result, 'row_hashes')
+
+
+def test_parse_search_hash_records():
+    result = parse_search(make_response(200, SEARCH_BODY), hash_records=True)
+    # The hashes are not fields, so the result unpacks like any other
+    assert len(result) == 3
+    assert len(result.row_hashes) == 2
+    assert result.row_hashes[0] != result.row_hashes[1]
+
+    same = parse_search(make_response(200, SEARCH_BODY), hash_records=True)
+    assert same.row_hashes == result.row_hashes
+
+    changed = parse_search(make_response(200, SEARCH_BODY.replace(b'5497756', b'5497757')), hash_records=True)
+    assert changed.row_hashes[0] == result.row_hashes[0]
+    assert changed.row_hashes[1] != result.row_hashes[1]
+
+
+def test_parse_search_no_records():
+    body = b'<RETS ReplyCode="20201" ReplyText="No Records Found" />'
+    result = parse_search(make_response(200, body), hash_records=True)
+    assert result.count == 0
+    assert result.data == ()
+
+
+def test_iter_search_batches():
+    response = make_response(200, SEARCH_BODY)
+
+    batches = list(iter_search_batches(response, batch_size=1, chunk_size=16))
+
+    assert batches == [
+        SearchBatch(('LIST_1', 'LIST_105'), '\t', ['\t1\t5489015\t']),
+        SearchBatch(('LIST_1', 'LIST_105'), '\t', ['\t2\t5497756\t']),
+    ]
+    assert split_data_line(batches[0].lines[0]) == ['1', '5489015']
+
+
+def test_iter_search_batches_no_records():
+    body = b'<RETS ReplyCode="20201" ReplyText="No Records Found" />'
+    assert list(iter_search_batches(make_response(200, body))) == []
+
+
+def test_iter_search_batches_error():
+    body = b'<RETS ReplyCode="20203" ReplyText="Miscellaneous search error" />'
+    with pytest.raises(RetsApiError):
+        list(iter_search_batches(make_response(200, body)))
+
+
+STANDARD_XML_BODY = b'''<?xml version="1.0" ?>
+<RETS ReplyCode="0" ReplyText="Operation Successful">
+<COUNT Records="2"/>
+<REData><REProperties><ResidentialProperty>
+<Listing>
+<StreetAddress><StreetNumber>123</StreetNumber><StreetName>Main</StreetName></StreetAddress>
+<ListingID>5489015</ListingID>
+<Photo>a.jpg</Photo><Photo>b.jpg</Photo>
+</Listing>
+<Listing>
+<ListingID>5497756</ListingID>
+</Listing>
+</ResidentialProperty></REProperties></REData>
+</RETS>
+'''
+
+
+def test_iter_standard_xml():
+    rows = list(iter_standard_xml(make_response(200, STANDARD_XML_BODY), 'Listing', chunk_size=32))
+
+    assert rows == [{
+        'StreetAddress/StreetNumber': '123',
+        'StreetAddress/StreetName': 'Main',
+        'ListingID': '5489015',
+        'Photo': 'a.jpg,b.jpg',
+    }, {
+        'ListingID': '5497756',
+    }]
+
+
+def test_iter_standard_xml_mapping():
+    mapping = {'ListingID': 'LIST_1', 'StreetAddress/StreetNumber': 'LIST_31'}
+    rows = list(iter_standard_xml(make_response(200, STANDARD_XML_BODY), 'Listing', mapping))
+
+    assert rows == [
+        OrderedDict((('LIST_1', '5489015'), ('LIST_31', '123'))),
+        OrderedDict((('LIST_1', '5497756'), ('LIST_31', ''))),
+    ]
+
+
+def test_parse_count():
+    body = b'<RETS ReplyCode="0" ReplyText="Operation Successful"><COUNT Records="11941" /></RETS>'
+    assert parse_count(make_response(200, body)) == 11941
+
+    body = b'<RETS ReplyCode="20201" ReplyText="No Records Found" />'
+    assert parse_count(make_response(200, body)) == 0
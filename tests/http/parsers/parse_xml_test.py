@@ -0,0 +1,35 @@
+import pytest
+
+from rets.errors import RetsApiError
+from rets.http.parsers.parse import parse_xml
+from tests.utils import make_response
+
+BODY = '<RETS ReplyCode="0" ReplyText="Operation Successful"><COUNT Records="1"/><DATA>Cañon</DATA></RETS>'
+
+
+def test_parse_xml_declared_encoding():
+    body = ('<?xml version="1.0" encoding="ISO-8859-1"?>\n' + BODY).encode('latin-1')
+    # The declaration takes precedence over the charset of the header
+    response = make_response(200, body, {'content-type': 'text/xml; charset=utf-8'})
+    assert parse_xml(response).find('DATA').text == 'Cañon'
+
+
+def test_parse_xml_header_encoding():
+    response = make_response(200, BODY.encode('latin-1'), {'content-type': 'text/xml; charset=ISO-8859-1'})
+    assert parse_xml(response).find('DATA').text == 'Cañon'
+
+    response = make_response(200, BODY.encode('utf-8'), {'content-type': 'text/xml; charset=utf-8'})
+    assert parse_xml(response).find('DATA').text == 'Cañon'
+
+
+def test_parse_xml_encoding_override():
+    body = ('<?xml version="1.0" encoding="utf-8"?>\n' + BODY).encode('latin-1')
+    response = make_response(200, body, {'content-type': 'text/xml; charset=utf-8'})
+    assert parse_xml(response, encoding='ISO-8859-1').find('DATA').text == 'Cañon'
+
+
+def test_parse_xml_error():
+    response = make_response(200, b'<RETS ReplyCode="20203" ReplyText="Miscellaneous search error" />')
+    with pytest.raises(RetsApiError) as e:
+        parse_xml(response)
+    assert e.value.reply_code == 20203
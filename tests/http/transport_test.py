@@ -0,0 +1,42 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from rets.errors import RetsClientError
+from rets.http import RecordingTransport, ReplayTransport, RetsHttpClient, Transport
+from tests.utils import make_response
+
+CAPABILITIES = b'''<RETS ReplyCode="0" ReplyText="Success">
+<RETS-RESPONSE>
+Login=/rets/Login
+Search=/rets/Search
+</RETS-RESPONSE>
+</RETS>'''
+
+SEARCH = b'''<RETS ReplyCode="0" ReplyText="Success">
+<COUNT Records="1"/>
+<COLUMNS>\tLIST_1\t</COLUMNS>
+<DATA>\t1\t</DATA>
+</RETS>'''
+
+
+def test_record_replay(tmpdir):
+    path = str(tmpdir.join('traffic.zip'))
+    network = MagicMock(spec=Transport)
+    network.send.side_effect = [
+        make_response(200, CAPABILITIES, {'content-type': 'text/xml'}),
+        make_response(200, SEARCH, {'content-type': 'text/xml'}),
+    ]
+
+    with RecordingTransport(path, network) as transport:
+        client = RetsHttpClient('http://rets.server/rets/Login', transport=transport)
+        client.login()
+        recorded = client.search('Property', 'A', '(LIST_1=1)')
+
+    client = RetsHttpClient('http://rets.server/rets/Login', transport=ReplayTransport(path))
+    client.login()
+    assert client.search('Property', 'A', '(LIST_1=1)') == recorded
+    assert recorded.data == ({'LIST_1': '1'},)
+
+    with pytest.raises(RetsClientError):
+        client.search('Property', 'A', '(LIST_1=2)')
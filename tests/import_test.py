@@ -0,0 +1,53 @@
+import json
+import subprocess
+import sys
+
+# Dependencies that must only be loaded once a transaction or parse needs them.
+HEAVY_MODULES = ('requests', 'requests_toolbelt', 'lxml', 'udatetime', 'cgi', 'multiprocessing')
+
+# A generous budget for the import time of rets, to catch eager imports creeping back. The fastest
+# of a few runs is compared, so that a loaded runner does not fail the test.
+IMPORT_TIME_BUDGET_US = 250000
+IMPORT_TIME_RUNS = 5
+
+
+def _run(code: str, *options: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable] + list(options) + ['-c', code],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+
+def test_import_is_lazy():
+    result = _run(
+        'import json, sys\n'
+        'import rets, rets.client, rets.http, rets.http.parsers\n'
+        'from rets.client import RetsClient, QueryBuilder\n'
+        'print(json.dumps(sorted(m for m in %r if m in sys.modules)))' % (HEAVY_MODULES,)
+    )
+    assert json.loads(result.stdout) == []
+
+
+def test_lazy_attributes():
+    import rets
+    import rets.http
+
+    assert rets.RetsHttpClient is rets.http.RetsHttpClient
+    assert 'SearchResult' in dir(rets)
+
+
+def _import_time_us() -> int:
+    result = _run('import rets.client.client', '-X', 'importtime')
+    total = 0
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.split('|')
+        # Only count the modules imported at the top level by the import of rets, which include
+        # everything they import in turn, and skip the header and the interpreter start up.
+        if cumulative.strip().isdigit() and name.startswith(' rets'):
+            total += int(cumulative)
+    return total
+
+
+def test_import_time(record_property):
+    import_time = min(_import_time_us() for _ in range(IMPORT_TIME_RUNS))
+    # Recorded in the JUnit XML report, e.g. with --junitxml, to track the import time over time
+    record_property('import_time_us', import_time)
+    assert 0 < import_time < IMPORT_TIME_BUDGET_US
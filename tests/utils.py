@@ -1,3 +1,5 @@
+from typing import Sequence
+
 from requests import Response
 from requests.structures import CaseInsensitiveDict
 from requests.utils import get_encoding_from_headers
@@ -17,3 +19,17 @@ def make_response(status_code: int = 200,
     response.encoding = encoding or get_encoding_from_headers(headers or {})
     response.reason = reason
     return response
+
+
+def make_compact_response(columns: Sequence[str], rows: Sequence[Sequence[str]], max_rows: bool = False) -> Response:
+    """ Builds the response of a COMPACT Search transaction with the given rows. """
+    def line(values: Sequence[str]) -> str:
+        return '\t%s\t' % '\t'.join(values)
+
+    return make_response(200, (
+        '<RETS ReplyCode="0" ReplyText="Success">'
+        '<DELIMITER value="09"/>'
+        '<COLUMNS>%s</COLUMNS>%s%s'
+        '</RETS>' % (line(columns), ''.join('<DATA>%s</DATA>' % line(row) for row in rows),
+                     '<MAXROWS/>' if max_rows else '')
+    ).encode())